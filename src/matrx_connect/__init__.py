@@ -1,6 +1,7 @@
 from .socket.app import sio, clients
 from .socket.core.user_sessions import get_user_session_namespace
 from .core.task_queue import get_task_queue, Task
+from .core.task_handle import TaskHandle
 from .socket.core.app_factory import configure_factory, get_app_factory
 
-__all__ = ["sio", "get_user_session_namespace", "clients", "get_task_queue", "Task", "configure_factory", "get_app_factory"]
\ No newline at end of file
+__all__ = ["sio", "get_user_session_namespace", "clients", "get_task_queue", "Task", "TaskHandle", "configure_factory", "get_app_factory"]
\ No newline at end of file
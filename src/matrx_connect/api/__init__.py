@@ -1,30 +1,39 @@
 import logging
+import math
 import time
 from contextlib import asynccontextmanager, AsyncExitStack
 from typing import Callable
 from typing import Dict, Any, Optional
 
-from fastapi import FastAPI
-from fastapi.responses import StreamingResponse
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
 from matrx_utils import vcprint, settings
 from pydantic import BaseModel
 
 from ..socket.schema import get_runtime_schema
 from ..mcp_server.http_server import mcp as mcp_bridge
 from matrx_connect import get_task_queue
+from ..exceptions.task_queue_errors import TaskRejectedError
 from .http_executor import HTTPExecutor
+from ..socket.response.wire import negotiate
+from ..socket.core.user_sessions import user_id_from_token
 
 logger = logging.getLogger('app')
 _fast_api_app = None
 
 
-def create_app(app_name, app_description, app_version, startup: Callable = None, shutdown: Callable = None) -> FastAPI:
-    """Create and configure the FastAPI application"""
+def create_app(app_name, app_description, app_version, startup: Callable = None, shutdown: Callable = None,
+               task_queue_options: Optional[Dict[str, Any]] = None) -> FastAPI:
+    """
+    Create and configure the FastAPI application. `task_queue_options` are TaskQueue arguments
+    (store, transport, lane sizes, ...) for the queue created at startup; they override the
+    TASK_QUEUE_* settings.
+    """
 
     @asynccontextmanager
     async def app_lifespan(app: FastAPI):
 
-        task_queue = get_task_queue()
+        task_queue = get_task_queue(**(task_queue_options or {}))
         logger.info("[Matrx Connect] Task Queue Initialized.")
         vcprint("[Matrx Connect] All Core Services Starting...", color="green")
 
@@ -74,6 +83,10 @@ def create_app(app_name, app_description, app_version, startup: Callable = None,
             "schema": "/schema"
         }
 
+    @main_app.get("/metrics", include_in_schema=False)
+    async def metrics():
+        return PlainTextResponse(get_task_queue().render_metrics(), media_type="text/plain; version=0.0.4")
+
     @main_app.middleware("http")
     async def log_requests(request, call_next):
         logger = logging.getLogger("app")
@@ -98,11 +111,12 @@ def create_app(app_name, app_description, app_version, startup: Callable = None,
     return main_app
 
 
-def get_app(app_name=None, app_description=None, app_version=None, startup: Callable = None, shutdown: Callable = None):
+def get_app(app_name=None, app_description=None, app_version=None, startup: Callable = None, shutdown: Callable = None,
+            task_queue_options: Optional[Dict[str, Any]] = None):
     global _fast_api_app
     if not _fast_api_app:
         _fast_api_app = create_app(app_name=app_name, app_description=app_description, app_version=app_version,
-                                   startup=startup, shutdown=shutdown)
+                                   startup=startup, shutdown=shutdown, task_queue_options=task_queue_options)
         return _fast_api_app
 
     return _fast_api_app
@@ -116,10 +130,26 @@ class TaskPayload(BaseModel):
     taskData: Optional[Dict[str, Any]] = {}
 
 
+def _rejected_response(error: TaskRejectedError) -> JSONResponse:
+    headers = {}
+    if error.retry_after is not None:
+        headers["Retry-After"] = str(max(1, math.ceil(error.retry_after)))
+    return JSONResponse(status_code=429, content=error.to_dict(), headers=headers)
+
+
+async def _release_when_done(stream, admission):
+    try:
+        async for chunk in stream:
+            yield chunk
+    finally:
+        admission.release()
+
+
 @app.post("/execute-direct/{service_name}")
 async def execute_direct(
         service_name: str,
         payload: TaskPayload,
+        request: Request,
 ):
     """
     Direct execution bypassing schema validation.
@@ -127,8 +157,16 @@ async def execute_direct(
 
     Response streams in real-time with same format as socket responses.
     """
+    admission = get_task_queue().admission
+    try:
+        admission.admit(request.client.host if request.client else "anonymous", service_name)
+    except TaskRejectedError as e:
+        return _rejected_response(e)
+
+    # Clients that send Accept: application/x-msgpack get binary frames; everyone else gets SSE JSON.
+    wire_format = negotiate(request.headers.get("accept"))
     headers = {
-        "Content-Type": "text/event-stream",
+        "Content-Type": wire_format.stream_media_type,
         "Cache-Control": "no-cache",
         "Connection": "keep-alive",
         "Access-Control-Allow-Origin": "*",
@@ -136,12 +174,13 @@ async def execute_direct(
     }
     http_executor = HTTPExecutor()
     return StreamingResponse(
-        http_executor.execute_direct(
+        _release_when_done(http_executor.execute_direct(
             service_name=service_name,
             task_name=payload.taskName,
-            task_data=payload.taskData or {}
-        ),
-        media_type="text/event-stream",
+            task_data=payload.taskData or {},
+            wire_format=wire_format,
+        ), admission),
+        media_type=wire_format.stream_media_type,
         headers=headers
     )
 
@@ -150,9 +189,17 @@ async def execute_direct(
 async def execute_validated(
         service_name: str,
         payload: TaskPayload,
+        request: Request,
 ):
+    admission = get_task_queue().admission
+    try:
+        admission.admit(request.client.host if request.client else "anonymous", service_name)
+    except TaskRejectedError as e:
+        return _rejected_response(e)
+
+    wire_format = negotiate(request.headers.get("accept"))
     headers = {
-        "Content-Type": "text/event-stream",
+        "Content-Type": wire_format.stream_media_type,
         "Cache-Control": "no-cache",
         "Connection": "keep-alive",
         "Access-Control-Allow-Origin": "*",
@@ -161,16 +208,37 @@ async def execute_validated(
     http_executor = HTTPExecutor()
 
     return StreamingResponse(
-        http_executor.execute_validated(
+        _release_when_done(http_executor.execute_validated(
             service_name=service_name,
             task_name=payload.taskName,
-            task_data=payload.taskData or {}
-        ),
-        media_type="text/event-stream",
+            task_data=payload.taskData or {},
+            wire_format=wire_format,
+        ), admission),
+        media_type=wire_format.stream_media_type,
         headers=headers
     )
 
 
+def _request_user_id(request: Request) -> Optional[str]:
+    """User id from an `Authorization: Bearer <token>` header, the same token sockets connect with."""
+    scheme, _, token = request.headers.get("authorization", "").partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return None
+    return user_id_from_token(token.strip())
+
+
+@app.post("/cancel/{task_id}")
+async def cancel_task(task_id: str, request: Request):
+    """Cancel one of the caller's queued or running tasks by task_id or response_listener_event."""
+    user_id = _request_user_id(request)
+    if not user_id:
+        return JSONResponse(status_code=401, content={"status": "unauthorized", "message": "A valid bearer token is required"})
+    state = await get_task_queue().cancel_task(task_id, user_id=user_id)
+    if state is None:
+        return JSONResponse(status_code=404, content={"status": "not_found", "task_id": task_id})
+    return {"status": "cancelled", "state": state, "task_id": task_id}
+
+
 @app.get("/schema")
 async def app_schema():
     try:
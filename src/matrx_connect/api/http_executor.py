@@ -5,6 +5,7 @@ from ..socket.core import get_app_factory
 from ..socket.core.request_base import validate_object_structure
 from ..socket.schema import get_schema_validator
 from .http_stream_handler import HTTPStreamHandler
+from ..socket.response.wire import JSON, WireFormat
 
 
 class HTTPExecutor:
@@ -54,7 +55,7 @@ class HTTPExecutor:
             )
             return None
 
-    async def execute_direct(self, service_name: str, task_name: str, task_data: Dict[str, Any]):
+    async def execute_direct(self, service_name: str, task_name: str, task_data: Dict[str, Any], wire_format: WireFormat = JSON):
         """
         Direct execution bypassing schema validation.
         Service factory → Service instance → Set attributes → Execute method directly.
@@ -63,13 +64,14 @@ class HTTPExecutor:
             service_name: Name of the service
             task_name: Method name to call on the service
             task_data: Data to set as attributes on service instance
+            wire_format: Negotiated frame encoding (SSE JSON by default)
 
         Yields:
             SSE-formatted HTTP stream chunks
         """
         # Create stream handler
         stream_handler = HTTPStreamHandler(
-            event_name=f"direct_{service_name}_{task_name}"
+            event_name=f"direct_{service_name}_{task_name}", wire_format=wire_format
         )
 
         try:
@@ -129,7 +131,7 @@ class HTTPExecutor:
         async for chunk in stream_handler.get_stream():
             yield chunk
 
-    async def execute_validated(self, service_name: str, task_name: str, task_data: Dict[str, Any]):
+    async def execute_validated(self, service_name: str, task_name: str, task_data: Dict[str, Any], wire_format: WireFormat = JSON):
         """
         Full pipeline execution with schema validation, conversion, etc.
         Exact same process as socket system but streaming via HTTP.
@@ -138,12 +140,13 @@ class HTTPExecutor:
             service_name: Name of the service
             task_name: Task method name
             task_data: Task data for validation
+            wire_format: Negotiated frame encoding (SSE JSON by default)
 
         Yields:
             SSE-formatted HTTP stream chunks
         """
         stream_handler = HTTPStreamHandler(
-            event_name=f"validated_{service_name}_{task_name}"
+            event_name=f"validated_{service_name}_{task_name}", wire_format=wire_format
         )
 
         try:
@@ -238,7 +241,7 @@ class HTTPExecutor:
         async for chunk in stream_handler.get_stream():
             yield chunk
 
-    async def execute_with_mode(self, mode: str, service_name: str, task_name: str, task_data: Dict[str, Any]):
+    async def execute_with_mode(self, mode: str, service_name: str, task_name: str, task_data: Dict[str, Any], wire_format: WireFormat = JSON):
         """
         Convenience method to execute with specified mode
 
@@ -252,14 +255,14 @@ class HTTPExecutor:
             SSE-formatted HTTP stream chunks
         """
         if mode == "direct":
-            async for chunk in self.execute_direct(service_name, task_name, task_data):
+            async for chunk in self.execute_direct(service_name, task_name, task_data, wire_format):
                 yield chunk
         elif mode == "validated":
-            async for chunk in self.execute_validated(service_name, task_name, task_data):
+            async for chunk in self.execute_validated(service_name, task_name, task_data, wire_format):
                 yield chunk
         else:
             # Create temporary stream handler for error
-            stream_handler = HTTPStreamHandler(event_name=f"error_{service_name}_{task_name}")
+            stream_handler = HTTPStreamHandler(event_name=f"error_{service_name}_{task_name}", wire_format=wire_format)
             await stream_handler.fatal_error(
                 error_type="invalid_execution_mode",
                 message=f"Invalid execution mode: {mode}. Must be 'direct' or 'validated'"
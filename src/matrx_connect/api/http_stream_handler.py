@@ -1,11 +1,9 @@
-import json
 import asyncio
-from typing import Any, Dict, List, Optional, AsyncGenerator
-from datetime import datetime
+from typing import Any, Dict, List, Optional, AsyncGenerator, Union
 import uuid
-import enum
-import dataclasses
 from ..socket.response.response_types import BrokerResponse
+from ..socket.utils.serialization import serialize
+from ..socket.response.wire import JSON, WireFormat
 
 
 class HTTPStreamHandler:
@@ -14,9 +12,10 @@ class HTTPStreamHandler:
     but streams via HTTP Server-Sent Events. NO accumulation logic.
     """
 
-    def __init__(self, event_name: str, request_id: str = None):
+    def __init__(self, event_name: str, request_id: str = None, wire_format: WireFormat = JSON):
         self.event_name = event_name
         self.request_id = request_id or str(uuid.uuid4())
+        self.wire = wire_format  # JSON as SSE, or a negotiated binary frame stream
         self._stream_queue = asyncio.Queue()
         self._ended = False
 
@@ -39,8 +38,7 @@ class HTTPStreamHandler:
         else:
             response_data = data
 
-        sse_message = f"data: {json.dumps(response_data)}\n\n"
-        await self._stream_queue.put(sse_message)
+        await self._stream_queue.put(self.wire.http_frame(response_data))
 
     async def send_chunk(self, chunk: str):
         """Send text chunk - matches SocketEmitter interface"""
@@ -152,11 +150,11 @@ class HTTPStreamHandler:
         for broker in brokers:
             await self.send_broker(broker)
 
-    async def send_cancelled(self):
+    async def send_cancelled(self, message: Optional[str] = None):
         """Send cancellation - matches SocketEmitter interface"""
         await self.fatal_error(
             error_type="task_cancelled",
-            message="Task was cancelled due to system constraints",
+            message=message or "Task was cancelled due to system constraints",
             user_visible_message="Your request was cancelled. Please try again."
         )
 
@@ -164,7 +162,7 @@ class HTTPStreamHandler:
         """Compatibility method - does nothing for HTTP"""
         pass
 
-    async def get_stream(self) -> AsyncGenerator[str, None]:
+    async def get_stream(self) -> AsyncGenerator[Union[str, bytes], None]:
         """Get the HTTP stream for FastAPI StreamingResponse"""
         while True:
             try:
@@ -174,32 +172,9 @@ class HTTPStreamHandler:
                 yield message
             except asyncio.TimeoutError:
                 # Send keepalive
-                keepalive = \
-                    {"keepalive": True},
-                yield f"data: {json.dumps(keepalive)}\n\n"
+                yield self.wire.http_frame({"keepalive": True})
             except Exception as e:
-                error_event = {"error": {"type": "stream_error", "message": str(e)}},
-                yield f"data: {json.dumps(error_event)}\n\n"
+                yield self.wire.http_frame({"error": {"type": "stream_error", "message": str(e)}})
                 break
 
-    def _serialize(self, data):
-        """Serialize data - same logic as SocketResponse"""
-        if data is None or isinstance(data, (bool, int, float, str)):
-            return data
-        elif isinstance(data, datetime):
-            return data.isoformat()
-        elif isinstance(data, uuid.UUID):
-            return str(data)
-        elif isinstance(data, enum.Enum):
-            return data.name
-        elif dataclasses.is_dataclass(data) and not isinstance(data, type):
-            return self._serialize(dataclasses.asdict(data))
-        elif isinstance(data, (set, tuple)):
-            return [self._serialize(item) for item in data]
-        elif isinstance(data, dict):
-            return {key: self._serialize(value) for key, value in data.items()}
-        elif isinstance(data, list):
-            return [self._serialize(item) for item in data]
-        elif hasattr(data, "__str__"):
-            return str(data)
-        return data
\ No newline at end of file
+    _serialize = staticmethod(serialize)
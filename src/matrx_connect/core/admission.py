@@ -0,0 +1,146 @@
+import time
+from collections import Counter
+from typing import Optional
+
+from matrx_utils import vcprint
+
+from ..exceptions.task_queue_errors import TaskRejectedError
+
+info = True
+debug = False
+verbose = False
+
+
+class TokenBucket:
+    """Classic token bucket: `rate` tokens per second, holding at most `capacity`."""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def retry_after(self, cost: float = 1.0) -> float:
+        """Seconds until `cost` tokens are available (0.0 if they already are)."""
+        self._refill()
+        if self.tokens >= cost:
+            return 0.0
+        if self.rate <= 0:
+            return float("inf")
+        return (cost - self.tokens) / self.rate
+
+    def consume(self, cost: float = 1.0):
+        self._refill()
+        self.tokens -= cost
+
+
+class AdmissionController:
+    """
+    Decides whether a request may enter the TaskQueue.
+
+    Each user and each service can get its own token bucket, and a global ceiling caps how
+    many admitted tasks may be queued or running at once. Rejections raise TaskRejectedError
+    with a retry_after hint instead of silently dropping the request.
+
+    Every limit is off unless configured: a rate of None means no bucket (set_user_rate and
+    set_service_rate still apply per user or service), a burst of None defaults to the rate,
+    and max_in_flight=0 means no ceiling.
+    """
+
+    def __init__(
+        self,
+        user_rate: Optional[float] = None,
+        user_burst: Optional[float] = None,
+        service_rate: Optional[float] = None,
+        service_burst: Optional[float] = None,
+        max_in_flight: int = 0,
+        ceiling_retry_after: float = 1.0,
+    ):
+        self.user_rate = user_rate
+        self.user_burst = user_burst
+        self.service_rate = service_rate
+        self.service_burst = service_burst
+        self.max_in_flight = max_in_flight
+        self.ceiling_retry_after = ceiling_retry_after
+        self.in_flight = 0
+        self.closed = False  # Set while the server drains for shutdown; everything is refused
+        self.rejections = 0
+        self.rejections_by_reason = Counter()
+        self._user_buckets = {}
+        self._service_buckets = {}
+        self._user_overrides = {}
+        self._service_overrides = {}
+
+    def set_user_rate(self, user_id: str, rate: float, burst: Optional[float] = None):
+        self._user_overrides[user_id] = (rate, burst if burst is not None else rate)
+        self._user_buckets.pop(user_id, None)
+
+    def set_service_rate(self, service_name: str, rate: float, burst: Optional[float] = None):
+        self._service_overrides[service_name] = (rate, burst if burst is not None else rate)
+        self._service_buckets.pop(service_name, None)
+
+    def _user_bucket(self, user_id: str) -> Optional[TokenBucket]:
+        bucket = self._user_buckets.get(user_id)
+        if bucket is None:
+            rate, burst = self._user_overrides.get(user_id, (self.user_rate, self.user_burst))
+            if rate is None:
+                return None
+            bucket = self._user_buckets[user_id] = TokenBucket(rate, rate if burst is None else burst)
+        return bucket
+
+    def _service_bucket(self, service_name: str) -> Optional[TokenBucket]:
+        bucket = self._service_buckets.get(service_name)
+        if bucket is None:
+            rate, burst = self._service_overrides.get(service_name, (self.service_rate, self.service_burst))
+            if rate is None:
+                return None
+            bucket = self._service_buckets[service_name] = TokenBucket(rate, rate if burst is None else burst)
+        return bucket
+
+    def admit(self, user_id: str, service_name: Optional[str]):
+        """Take one slot for this request or raise TaskRejectedError. Pair every admit with release()."""
+        if self.closed:
+            self._reject("shutting_down", self.ceiling_retry_after, user_id, service_name)
+        if self.max_in_flight and self.in_flight >= self.max_in_flight:
+            self._reject("overloaded", self.ceiling_retry_after, user_id, service_name)
+
+        buckets = []
+        if user_id and user_id != "system":
+            buckets.append(("user_rate_limited", self._user_bucket(user_id)))
+        if service_name:
+            buckets.append(("service_rate_limited", self._service_bucket(service_name)))
+
+        buckets = [(reason, bucket) for reason, bucket in buckets if bucket is not None]
+        for reason, bucket in buckets:
+            wait = bucket.retry_after()
+            if wait > 0:
+                self._reject(reason, wait, user_id, service_name)
+
+        for _, bucket in buckets:
+            bucket.consume()
+        self.in_flight += 1
+
+    def close(self):
+        """Refuse every new request from now on (graceful shutdown)."""
+        self.closed = True
+
+    def release(self):
+        self.in_flight = max(0, self.in_flight - 1)
+
+    def count_rejection(self, reason: str):
+        """Record a rejection decided outside the controller (e.g. a full lane)."""
+        self.rejections += 1
+        self.rejections_by_reason[reason] += 1
+
+    def _reject(self, reason: str, retry_after: float, user_id, service_name):
+        self.count_rejection(reason)
+        vcprint(f"[ADMISSION] Rejected | Reason: {reason} | User: {user_id} | Service: {service_name} | Retry after: {retry_after:.2f}s", verbose=info, color="yellow")
+        raise TaskRejectedError(reason=reason, retry_after=retry_after)
+
+    def stats(self) -> dict:
+        return {"in_flight": self.in_flight, "max_in_flight": self.max_in_flight, "rejections": self.rejections, "closed": self.closed}
@@ -0,0 +1,137 @@
+import heapq
+import itertools
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+from matrx_utils import vcprint
+
+info = True
+debug = False
+verbose = False
+
+
+class Bulkhead:
+    """
+    Concurrency cap and optional dedicated thread pool for one service.
+
+    A task takes a slot when it is handed to a lane and gives it back when it completes, so
+    at most `max_concurrency` of the service's tasks occupy workers at once (0 = no cap).
+    Tasks over the cap are parked here in priority order, holding no worker, and move to
+    their lane as slots free up. With `max_threads`, the service's sync work runs on its own
+    pool instead of the shared executor, so it can't starve other services of threads.
+    """
+
+    def __init__(self, service_name: str, max_concurrency: int = 0, max_threads: int = 0):
+        self.service_name = service_name
+        self.max_concurrency = max_concurrency
+        self.max_threads = max_threads
+        self.active = 0  # Tasks holding a slot: queued in a lane or running
+        self.parked_total = 0
+        self._parked = []  # (priority, submit_time, sequence, task, lane, background)
+        self._sequence = itertools.count()
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    def configure(self, max_concurrency: int = 0, max_threads: int = 0):
+        self.max_concurrency = max(0, max_concurrency)
+        if max_threads != self.max_threads and self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+        self.max_threads = max(0, max_threads)
+
+    @property
+    def executor(self) -> Optional[ThreadPoolExecutor]:
+        """The dedicated pool, created on first use, or None to use the queue's shared executor."""
+        if not self.max_threads:
+            return None
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.max_threads, thread_name_prefix=f"bulkhead-{self.service_name}")
+        return self._executor
+
+    def parked(self) -> int:
+        return len(self._parked)
+
+    def try_acquire(self) -> bool:
+        if self.max_concurrency and self.active >= self.max_concurrency:
+            return False
+        self.active += 1
+        return True
+
+    def park(self, task, lane, background: bool = False):
+        heapq.heappush(self._parked, (task.priority, task.submit_time, next(self._sequence), task, lane, background))
+        self.parked_total += 1
+        vcprint(f"[BULKHEAD] Parked task | Service: {self.service_name} | Active: {self.active}/{self.max_concurrency} | Parked: {len(self._parked)}", verbose=info, color="yellow")
+
+    def release(self):
+        self.active -= 1
+
+    def unpark(self):
+        """Take a free slot for the next parked task. Returns (task, lane, background) or None."""
+        if self.max_concurrency and self.active >= self.max_concurrency:
+            return None
+        while self._parked:
+            task, lane, background = heapq.heappop(self._parked)[3:]
+            if getattr(task, "cancelled", False):
+                continue
+            self.active += 1
+            return task, lane, background
+        return None
+
+    def remove(self, task) -> bool:
+        """Drop a parked task (e.g. it was cancelled). Returns False when it isn't parked here."""
+        for index, entry in enumerate(self._parked):
+            if entry[3] is task:
+                self._parked[index] = self._parked[-1]
+                self._parked.pop()
+                heapq.heapify(self._parked)
+                return True
+        return False
+
+    def drain(self) -> list:
+        tasks = [entry[3] for entry in sorted(self._parked, key=lambda entry: entry[:3])]
+        self._parked.clear()
+        return tasks
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+    def stats(self) -> dict:
+        return {
+            "max_concurrency": self.max_concurrency,
+            "max_threads": self.max_threads,
+            "active": self.active,
+            "parked": len(self._parked),
+            "parked_total": self.parked_total,
+        }
+
+
+# SERVICE_NAME -> Bulkhead
+_bulkheads = {}
+
+
+def register_bulkhead(service_name: str, max_concurrency: int = 0, max_threads: int = 0) -> Optional[Bulkhead]:
+    """
+    Declare a service's concurrency cap and dedicated thread count. Registering again (every
+    ServiceFactory instance registers its services) updates the existing bulkhead in place.
+    """
+    key = service_name.upper()
+    bulkhead = _bulkheads.get(key)
+    if bulkhead is None:
+        if not max_concurrency and not max_threads:
+            return None
+        bulkhead = _bulkheads[key] = Bulkhead(key, max_concurrency, max_threads)
+        vcprint(f"[BULKHEAD] Registered {key} | Max concurrency: {max_concurrency or 'unlimited'} | Threads: {max_threads or 'shared'}", verbose=info, color="yellow")
+    elif (bulkhead.max_concurrency, bulkhead.max_threads) != (max_concurrency, max_threads):
+        bulkhead.configure(max_concurrency, max_threads)
+    return bulkhead
+
+
+def get_bulkhead(service_name: Optional[str]) -> Optional[Bulkhead]:
+    if not service_name:
+        return None
+    return _bulkheads.get(service_name.upper())
+
+
+def get_bulkheads() -> dict:
+    return dict(_bulkheads)
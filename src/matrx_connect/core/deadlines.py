@@ -0,0 +1,93 @@
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterable, Optional
+
+from ..exceptions.task_queue_errors import TaskDeadlineExceeded
+
+DEFAULT_TASK_DEADLINE = 600.0
+
+
+class Deadline:
+    """Absolute time.monotonic() by which a task must finish, shared with every coroutine it spawns."""
+
+    __slots__ = ("at", "exceeded")
+
+    def __init__(self, at: Optional[float]):
+        self.at = at
+        self.exceeded = False  # Set once a service observed the deadline through check_deadline()
+
+    def remaining(self) -> Optional[float]:
+        if self.at is None:
+            return None
+        return max(0.0, self.at - time.monotonic())
+
+
+_task_deadline: ContextVar[Optional[Deadline]] = ContextVar("matrx_task_deadline", default=None)
+
+# SERVICE_NAME -> {TASK_NAME or "*": seconds}
+_deadlines = {}
+
+
+def register_deadline(service_name: str, seconds: float, task_name: Optional[str] = None):
+    """Declare how long a service (or one of its tasks) may run before it is cancelled."""
+    _deadlines.setdefault(service_name.upper(), {})[(task_name or "*").upper()] = float(seconds)
+
+
+def register_schema_deadlines(deadlines: dict):
+    """
+    Load deadlines from a schema's optional "deadlines" section:
+    {"SERVICE": 30} or {"SERVICE": {"TASK": 120, "*": 30}}.
+    """
+    for service_name, value in (deadlines or {}).items():
+        if isinstance(value, dict):
+            for task_name, seconds in value.items():
+                register_deadline(service_name, seconds, task_name)
+        else:
+            register_deadline(service_name, value)
+
+
+def resolve_deadline(service_name: Optional[str], task_names: Iterable[str] = ()) -> float:
+    """Deadline in seconds for a service call, taking the most generous of its tasks' deadlines."""
+    declared = _deadlines.get((service_name or "").upper(), {})
+    candidates = [declared[name.upper()] for name in task_names if name and name.upper() in declared]
+    if candidates:
+        return max(candidates)
+    return declared.get("*", DEFAULT_TASK_DEADLINE)
+
+
+@contextmanager
+def deadline_scope(seconds: Optional[float]):
+    """Run the enclosed block with a deadline `seconds` from now (never extending an outer one)."""
+    at = time.monotonic() + seconds if seconds is not None else None
+    outer = _task_deadline.get()
+    if outer is not None and outer.at is not None and (at is None or outer.at < at):
+        at = outer.at
+    deadline = Deadline(at)
+    token = _task_deadline.set(deadline)
+    try:
+        yield deadline
+    finally:
+        _task_deadline.reset(token)
+
+
+def get_deadline() -> Optional[Deadline]:
+    return _task_deadline.get()
+
+
+def time_remaining() -> Optional[float]:
+    """Seconds left before the current task's deadline, or None when it has none."""
+    deadline = _task_deadline.get()
+    return deadline.remaining() if deadline is not None else None
+
+
+def deadline_exceeded() -> bool:
+    remaining = time_remaining()
+    return remaining is not None and remaining <= 0
+
+
+def check_deadline():
+    """Cooperative cancellation point for services: raises TaskDeadlineExceeded once time is up."""
+    if deadline_exceeded():
+        _task_deadline.get().exceeded = True
+        raise TaskDeadlineExceeded("Task deadline exceeded")
@@ -0,0 +1,189 @@
+import asyncio
+import json
+import os
+import sqlite3
+import time
+from abc import ABC, abstractmethod
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterable, Optional
+
+from matrx_utils import vcprint
+
+from .deadlines import DEFAULT_TASK_DEADLINE
+
+info = True
+debug = False
+verbose = False
+
+
+class TaskTransport(ABC):
+    """
+    Shared broker that TaskQueue nodes publish overflow work to and steal work from.
+
+    Records are the plain dicts produced by task_store.task_record(). A claimed record stays
+    owned by the claiming node until it is acked, released, or its claim is older than the
+    transport's visibility timeout (the node is presumed dead and the record goes back up).
+    Nodes renew their claims while the work is queued or running, so the timeout bounds how
+    long a dead node's work stays hidden, not how long a task may run.
+    """
+
+    visibility_timeout: Optional[float] = None  # None: claims never expire, renew() is a no-op
+
+    @abstractmethod
+    async def publish(self, record: dict):
+        pass
+
+    @abstractmethod
+    async def claim(self, node_id: str, lane: str, limit: int) -> list:
+        pass
+
+    @abstractmethod
+    async def ack(self, task_id: str):
+        pass
+
+    @abstractmethod
+    async def release(self, task_ids: Iterable[str]):
+        """Hand claimed records back without running them (e.g. on shutdown)."""
+        pass
+
+    async def renew(self, node_id: str, task_ids: Iterable[str]):
+        """Restart the visibility timeout of records `node_id` still holds."""
+        pass
+
+    @abstractmethod
+    async def depth(self, lane: Optional[str] = None) -> int:
+        pass
+
+    async def close(self):
+        pass
+
+
+class LocalTransport(TaskTransport):
+    """In-process transport for tests and single-process setups with several TaskQueues."""
+
+    def __init__(self):
+        self._queues = {}  # lane -> deque of records
+        self._claimed = {}  # task_id -> record
+
+    async def publish(self, record: dict):
+        self._queues.setdefault(record["lane"], deque()).append(record)
+
+    async def claim(self, node_id: str, lane: str, limit: int) -> list:
+        queue = self._queues.get(lane)
+        claimed = []
+        while queue and len(claimed) < limit:
+            record = queue.popleft()
+            self._claimed[record["task_id"]] = record
+            claimed.append(record)
+        return claimed
+
+    async def ack(self, task_id: str):
+        self._claimed.pop(task_id, None)
+
+    async def release(self, task_ids: Iterable[str]):
+        for task_id in task_ids:
+            record = self._claimed.pop(task_id, None)
+            if record is not None:
+                self._queues.setdefault(record["lane"], deque()).appendleft(record)
+
+    async def depth(self, lane: Optional[str] = None) -> int:
+        if lane is not None:
+            return len(self._queues.get(lane, ()))
+        return sum(len(queue) for queue in self._queues.values())
+
+
+class SQLiteTransport(TaskTransport):
+    """
+    File-backed transport: every node on the host opens the same WAL-mode database.
+
+    Claims run in a BEGIN IMMEDIATE transaction so two nodes never take the same record.
+    Good for several uvicorn workers or containers sharing a volume; a networked broker
+    can implement the same five methods.
+    """
+
+    def __init__(self, path: str, visibility_timeout: float = DEFAULT_TASK_DEADLINE + 60):
+        self.path = path
+        self.visibility_timeout = visibility_timeout
+        self._io = ThreadPoolExecutor(max_workers=1, thread_name_prefix="task-transport")
+        self._connection: Optional[sqlite3.Connection] = None
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._connection is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            connection = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None, timeout=30)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS shared_tasks ("
+                "task_id TEXT PRIMARY KEY, lane TEXT NOT NULL, priority INTEGER NOT NULL, submit_time REAL NOT NULL, "
+                "payload TEXT NOT NULL, claimed_by TEXT, claimed_at REAL)"
+            )
+            connection.execute("CREATE INDEX IF NOT EXISTS shared_tasks_lane ON shared_tasks (lane, priority, submit_time)")
+            self._connection = connection
+        return self._connection
+
+    async def _run(self, fn, *args):
+        return await asyncio.get_running_loop().run_in_executor(self._io, fn, *args)
+
+    async def publish(self, record: dict):
+        await self._run(self._publish_sync, record)
+
+    def _publish_sync(self, record: dict):
+        self._connect().execute(
+            "INSERT OR REPLACE INTO shared_tasks (task_id, lane, priority, submit_time, payload) VALUES (?, ?, ?, ?, ?)",
+            (record["task_id"], record["lane"], record["priority"], record["submit_time"], json.dumps(record, default=str)),
+        )
+
+    async def claim(self, node_id: str, lane: str, limit: int) -> list:
+        return await self._run(self._claim_sync, node_id, lane, limit)
+
+    def _claim_sync(self, node_id: str, lane: str, limit: int) -> list:
+        connection = self._connect()
+        now = time.time()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            rows = connection.execute(
+                "SELECT task_id, payload FROM shared_tasks WHERE lane = ? AND (claimed_by IS NULL OR claimed_at < ?) "
+                "ORDER BY priority, submit_time LIMIT ?",
+                (lane, now - self.visibility_timeout, limit),
+            ).fetchall()
+            if rows:
+                connection.executemany("UPDATE shared_tasks SET claimed_by = ?, claimed_at = ? WHERE task_id = ?", [(node_id, now, task_id) for task_id, _ in rows])
+            connection.execute("COMMIT")
+        except Exception:
+            connection.execute("ROLLBACK")
+            raise
+        return [json.loads(payload) for _, payload in rows]
+
+    async def ack(self, task_id: str):
+        await self._run(lambda: self._connect().execute("DELETE FROM shared_tasks WHERE task_id = ?", (task_id,)))
+
+    async def release(self, task_ids: Iterable[str]):
+        rows = [(task_id,) for task_id in task_ids]
+        if rows:
+            await self._run(lambda: self._connect().executemany("UPDATE shared_tasks SET claimed_by = NULL, claimed_at = NULL WHERE task_id = ?", rows))
+
+    async def renew(self, node_id: str, task_ids: Iterable[str]):
+        now = time.time()
+        rows = [(now, task_id, node_id) for task_id in task_ids]
+        if rows:
+            await self._run(lambda: self._connect().executemany("UPDATE shared_tasks SET claimed_at = ? WHERE task_id = ? AND claimed_by = ?", rows))
+
+    async def depth(self, lane: Optional[str] = None) -> int:
+        return await self._run(self._depth_sync, lane)
+
+    def _depth_sync(self, lane: Optional[str]) -> int:
+        query = "SELECT COUNT(*) FROM shared_tasks WHERE claimed_by IS NULL"
+        if lane is not None:
+            return self._connect().execute(query + " AND lane = ?", (lane,)).fetchone()[0]
+        return self._connect().execute(query).fetchone()[0]
+
+    async def close(self):
+        if self._connection is not None:
+            connection, self._connection = self._connection, None
+            await self._run(connection.close)
+        self._io.shutdown(wait=False)
+        vcprint(f"[TASK TRANSPORT] Closed {self.path}", verbose=info, color="yellow")
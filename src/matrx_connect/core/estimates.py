@@ -0,0 +1,114 @@
+import json
+import os
+from collections import deque
+from typing import Optional, Tuple
+
+from matrx_utils import vcprint
+
+info = True
+debug = False
+verbose = False
+
+
+class RuntimeStats:
+    """EWMA of one service/task's runtime plus a window of recent samples for quantiles."""
+
+    __slots__ = ("ewma", "count", "samples", "_sorted")
+
+    def __init__(self, ewma: float = 0.0, count: int = 0, samples=(), window: int = 128):
+        self.ewma = ewma
+        self.count = count
+        self.samples = deque(samples, maxlen=window)
+        self._sorted = None
+
+    def observe(self, seconds: float, alpha: float):
+        self.ewma = seconds if self.count == 0 else alpha * seconds + (1 - alpha) * self.ewma
+        self.count += 1
+        self.samples.append(seconds)
+        self._sorted = None
+
+    def quantile(self, q: float) -> Optional[float]:
+        if not self.samples:
+            return None
+        if self._sorted is None:
+            self._sorted = sorted(self.samples)
+        return self._sorted[min(len(self._sorted) - 1, int(q * len(self._sorted)))]
+
+
+class RuntimeEstimator:
+    """
+    Moving runtime estimates per (service, task), used to classify work as long or short,
+    order interactive work shortest-expected-first, and estimate completion times.
+
+    Estimates are saved as JSON to `path` and loaded on start so the scheduler starts warm.
+    """
+
+    def __init__(self, path: Optional[str] = None, alpha: float = 0.2, long_threshold: float = 5.0, min_samples: int = 5, window: int = 128):
+        self.path = path
+        self.alpha = alpha
+        self.long_threshold = long_threshold  # p90 seconds above which a service/task goes to the long lane
+        self.min_samples = min_samples
+        self.window = window
+        self.stats = {}  # (service, task) -> RuntimeStats
+        self._dirty = False
+
+    def observe(self, key: Tuple[str, str], seconds: float):
+        stats = self.stats.get(key)
+        if stats is None:
+            stats = self.stats[key] = RuntimeStats(window=self.window)
+        stats.observe(seconds, self.alpha)
+        self._dirty = True
+
+    def expected(self, key: Tuple[str, str]) -> Optional[float]:
+        """EWMA runtime in seconds, or None until the key has been seen."""
+        stats = self.stats.get(key)
+        return stats.ewma if stats is not None and stats.count else None
+
+    def quantile(self, key: Tuple[str, str], q: float) -> Optional[float]:
+        stats = self.stats.get(key)
+        return stats.quantile(q) if stats is not None else None
+
+    def is_long(self, key: Tuple[str, str]) -> bool:
+        stats = self.stats.get(key)
+        if stats is None or stats.count < self.min_samples:
+            return False
+        return stats.quantile(0.9) >= self.long_threshold
+
+    def snapshot(self) -> dict:
+        return {
+            f"{service}/{task}": {"ewma": stats.ewma, "count": stats.count, "p50": stats.quantile(0.5), "p90": stats.quantile(0.9), "p99": stats.quantile(0.99)}
+            for (service, task), stats in self.stats.items()
+        }
+
+    def load(self):
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r") as f:
+                saved = json.load(f)
+        except Exception as e:
+            vcprint(f"[RUNTIME ESTIMATES] Could not load {self.path}: {str(e)}", verbose=True, color="red")
+            return
+        for entry in saved.get("stats", []):
+            key = (entry["service"], entry["task"])
+            self.stats[key] = RuntimeStats(entry["ewma"], entry["count"], entry.get("samples", ()), window=self.window)
+        vcprint(f"[RUNTIME ESTIMATES] Loaded {len(self.stats)} estimates from {self.path}", verbose=info, color="yellow")
+
+    def save(self):
+        """Write estimates if anything changed since the last save. Blocking; call off the event loop."""
+        if not self.path or not self._dirty:
+            return
+        self._dirty = False
+        payload = {
+            "stats": [
+                {"service": service, "task": task, "ewma": stats.ewma, "count": stats.count, "samples": list(stats.samples)}
+                for (service, task), stats in list(self.stats.items())
+            ]
+        }
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        temp_path = f"{self.path}.tmp"
+        with open(temp_path, "w") as f:
+            json.dump(payload, f)
+        os.replace(temp_path, self.path)
@@ -0,0 +1,82 @@
+import asyncio
+import importlib
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Iterable, Optional
+
+from matrx_utils import vcprint
+
+info = True
+debug = False
+verbose = False
+
+
+def _warm_worker(modules):
+    """Process initializer: import service modules once so the first real task pays nothing."""
+    for module in modules:
+        try:
+            importlib.import_module(module)
+        except Exception as e:
+            vcprint(f"[PROCESS POOL] Failed to preload {module} in worker {os.getpid()}: {str(e)}", verbose=True, color="red")
+
+
+def _ping():
+    return os.getpid()
+
+
+def _run_callback(callback: Callable, data):
+    return callback(data)
+
+
+def _run_service(service_class, data: dict, context: dict):
+    service = service_class()
+    return service.process_task(data, context=context)
+
+
+class ProcessPoolLane:
+    """
+    Opt-in execution lane that runs CPU-bound sync work in a pool of worker processes.
+
+    Workers are started with the spawn context (the parent runs a thread pool and an event loop,
+    neither of which survive a fork cleanly) and are pre-warmed on start by importing
+    `preload_modules` in every process. Callables and service classes are sent by reference,
+    so only the task data and the result cross the process boundary; the pickling happens on
+    the executor's feeder thread, off the event loop.
+    """
+
+    def __init__(self, workers: Optional[int] = None, preload_modules: Iterable[str] = ()):
+        self.workers = workers or os.cpu_count() or 1
+        self.preload_modules = tuple(preload_modules)
+        self.executor: Optional[ProcessPoolExecutor] = None
+
+    def start(self) -> ProcessPoolExecutor:
+        if self.executor is None:
+            self.executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_warm_worker,
+                initargs=(self.preload_modules,),
+            )
+            vcprint(f"[PROCESS POOL] Started {self.workers} workers | Preload: {list(self.preload_modules)}", verbose=info, color="yellow")
+        return self.executor
+
+    async def warm(self):
+        """Spawn every worker now rather than on first use."""
+        executor = self.start()
+        loop = asyncio.get_running_loop()
+        pids = await asyncio.gather(*(loop.run_in_executor(executor, _ping) for _ in range(self.workers)))
+        vcprint(f"[PROCESS POOL] Warm | PIDs: {sorted(set(pids))}", verbose=info, color="yellow")
+
+    async def run_callback(self, callback: Callable, data):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.start(), _run_callback, callback, data)
+
+    async def run_service(self, service_class, data: dict, context: dict):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.start(), _run_service, service_class, data, context)
+
+    def shutdown(self):
+        if self.executor is not None:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            self.executor = None
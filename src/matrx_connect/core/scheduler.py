@@ -0,0 +1,362 @@
+import asyncio
+import heapq
+import itertools
+import time
+from collections import Counter, defaultdict, deque
+from typing import Optional
+
+
+class FairQueue:
+    """
+    Deficit round robin across user_ids, with each user's own tasks kept in priority order.
+
+    Every turn a user is credited their weight and may dispatch one task per whole unit of
+    credit, so a user with weight 2 gets twice the share of a user with weight 1 no matter
+    how many tasks either has queued. Users already running their limit of tasks are
+    parked until `unpark` is called for them.
+
+    Within a user's queue, priorities age: a task's effective priority drops by
+    `aging_rate` per second waited. Every task ages at the same rate, so the heap key
+    priority + aging_rate * enqueued_at orders tasks by effective priority without reheaping.
+    With `sjf_weight`, each expected second of runtime (task.expected_runtime, capped at
+    `sjf_cap`) costs that many priority points, so shorter jobs go first.
+    """
+
+    def __init__(self, weights: dict = None, limits: dict = None, running: Counter = None, aging_rate: float = 0.0, sjf_weight: float = 0.0, sjf_cap: float = 30.0):
+        self.weights = weights if weights is not None else {}
+        self.limits = limits if limits is not None else defaultdict(int)
+        self.running = running if running is not None else Counter()
+        self.aging_rate = aging_rate
+        self.sjf_weight = sjf_weight
+        self.sjf_cap = sjf_cap
+        self._sequence = itertools.count()
+        self._fifo = deque()  # Tasks in arrival order, for the oldest wait; dispatched ones are skipped lazily
+        self._queues = {}
+        self._deficits = {}
+        self._active = deque()
+        self._parked = set()
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def ready(self) -> bool:
+        return bool(self._active)
+
+    def push(self, task):
+        user_id = task.user_id
+        queue = self._queues.get(user_id)
+        if queue is None:
+            queue = self._queues[user_id] = []
+            self._deficits[user_id] = 0.0
+            if self._at_limit(user_id):
+                self._parked.add(user_id)
+            else:
+                self._activate(user_id)
+        enqueued_at = getattr(task, "enqueued_at", None) or time.monotonic()
+        key = task.priority + self.aging_rate * enqueued_at
+        if self.sjf_weight:
+            key += self.sjf_weight * min(getattr(task, "expected_runtime", 0.0), self.sjf_cap)
+        heapq.heappush(queue, (key, next(self._sequence), task))
+        task.dispatched = False
+        self._fifo.append(task)
+        self._size += 1
+
+    def pop(self):
+        """Dispatch the next task. Raises IndexError when no user has eligible work."""
+        while self._active:
+            user_id = self._active[0]
+            if self._at_limit(user_id):
+                self._active.popleft()
+                self._parked.add(user_id)
+                self._grant_head()
+                continue
+            if self._deficits[user_id] < 1:
+                self._active.rotate(-1)
+                self._grant_head()
+                continue
+            queue = self._queues[user_id]
+            task = heapq.heappop(queue)[-1]
+            task.dispatched = True
+            self._size -= 1
+            self._deficits[user_id] -= 1
+            self.running[user_id] += 1
+            if not queue:
+                self._active.popleft()
+                del self._queues[user_id]
+                del self._deficits[user_id]
+                self._grant_head()
+            return task
+        raise IndexError("No eligible task")
+
+    def remove(self, task) -> bool:
+        """Take a queued task out (e.g. it was cancelled). Returns False when it isn't queued here."""
+        user_id = task.user_id
+        queue = self._queues.get(user_id)
+        index = next((i for i, entry in enumerate(queue) if entry[-1] is task), None) if queue else None
+        if index is None:
+            return False
+        queue[index] = queue[-1]
+        queue.pop()
+        heapq.heapify(queue)
+        task.dispatched = True  # Skipped in the arrival-order list like a dispatched task
+        self._size -= 1
+        if not queue:
+            del self._queues[user_id]
+            del self._deficits[user_id]
+            self._parked.discard(user_id)
+            if user_id in self._active:
+                was_head = self._active[0] == user_id
+                self._active.remove(user_id)
+                if was_head:
+                    self._grant_head()
+        return True
+
+    def unpark(self, user_id) -> bool:
+        if user_id not in self._parked or self._at_limit(user_id):
+            return False
+        self._parked.discard(user_id)
+        self._activate(user_id)
+        return True
+
+    def oldest_enqueued_at(self) -> Optional[float]:
+        """Enqueue time of the longest-waiting queued task, or None when empty."""
+        while self._fifo and self._fifo[0].dispatched:
+            self._fifo.popleft()
+        return getattr(self._fifo[0], "enqueued_at", None) if self._fifo else None
+
+    def drain(self) -> list:
+        tasks = [entry[-1] for entry in sorted(entry for queue in self._queues.values() for entry in queue)]
+        self._fifo.clear()
+        self._queues.clear()
+        self._deficits.clear()
+        self._active.clear()
+        self._parked.clear()
+        self._size = 0
+        return tasks
+
+    def _activate(self, user_id):
+        self._active.append(user_id)
+        if len(self._active) == 1:
+            self._grant_head()
+
+    def _grant_head(self):
+        if self._active:
+            user_id = self._active[0]
+            self._deficits[user_id] += max(self.weights.get(user_id, 1.0), 0.01)
+
+    def _at_limit(self, user_id) -> bool:
+        if user_id == "system":
+            return False
+        limit = self.limits[user_id]
+        return bool(limit) and self.running[user_id] >= limit
+
+
+class TaskScheduler:
+    """
+    Event-driven scheduler over a foreground and a background fair queue.
+
+    Idle workers park on a future and are woken one at a time as work arrives, so an
+    empty scheduler costs no timer wakeups and a put is picked up on the next loop
+    iteration. A single get() chooses between both queues, foreground first, except that:
+
+    - background work is guaranteed `background_share` of dispatches while it is waiting;
+    - a queue whose oldest task has waited longer than its SLO (`slos`) is served first.
+    """
+
+    def __init__(
+        self,
+        maxsize: int = 1000,
+        background_maxsize: int = 1000,
+        weights: dict = None,
+        limits: dict = None,
+        running: Counter = None,
+        aging_rate: float = 0.0,
+        background_share: float = 0.0,
+        slos: dict = None,
+        sjf_weight: float = 0.0,
+    ):
+        self.maxsize = maxsize
+        self.background_maxsize = background_maxsize
+        # Shortest-expected-job preference only applies to interactive (foreground) work.
+        self._foreground = FairQueue(weights, limits, running, aging_rate, sjf_weight=sjf_weight)
+        self._background = FairQueue(weights, limits, running, aging_rate)
+        self.background_share = background_share
+        self.slos = {"foreground": None, "background": None, **(slos or {})}  # Max wait in seconds per queue
+        self.slo_breaches = Counter()  # Dispatches that had waited past their queue's SLO
+        self._background_credit = 0.0
+        self._waiters = deque()
+        self._closed = False
+
+    def qsize(self, background: Optional[bool] = None) -> int:
+        if background is None:
+            return len(self._foreground) + len(self._background)
+        return len(self._background) if background else len(self._foreground)
+
+    def empty(self) -> bool:
+        return not self._foreground and not self._background
+
+    def ready(self) -> bool:
+        return self._foreground.ready() or self._background.ready()
+
+    def full(self, background: bool = False) -> bool:
+        if background:
+            return 0 < self.background_maxsize <= len(self._background)
+        return 0 < self.maxsize <= len(self._foreground)
+
+    def put_nowait(self, task, background: bool = False, force: bool = False):
+        """Queue `task`. `force` skips the size check for work that was already admitted."""
+        if self._closed:
+            raise RuntimeError("Scheduler is closed")
+        if not force and self.full(background):
+            raise asyncio.QueueFull
+        (self._background if background else self._foreground).push(task)
+        self._wakeup_next()
+
+    def get_nowait(self):
+        now = time.monotonic()
+        for name, queue in self._dispatch_order(now):
+            try:
+                task = queue.pop()
+            except IndexError:
+                continue
+            self._account(name, task, now)
+            return task
+        raise asyncio.QueueEmpty
+
+    def _dispatch_order(self, now: float):
+        foreground, background = ("foreground", self._foreground), ("background", self._background)
+        if not self._background.ready():
+            return foreground, background
+        if self._past_slo("foreground", now):
+            return foreground, background
+        if self._past_slo("background", now) or self._background_credit >= 1:
+            return background, foreground
+        return foreground, background
+
+    def _past_slo(self, name: str, now: float) -> bool:
+        slo = self.slos.get(name)
+        if slo is None:
+            return False
+        oldest = (self._background if name == "background" else self._foreground).oldest_enqueued_at()
+        return oldest is not None and now - oldest >= slo
+
+    def _account(self, name: str, task, now: float):
+        if name == "background":
+            self._background_credit = max(0.0, self._background_credit - 1)
+        elif self.background_share > 0:
+            # Earn share / (1 - share) background dispatches per foreground dispatch, banked up to one.
+            share = min(self.background_share, 0.99)
+            self._background_credit = min(1.0, self._background_credit + share / (1 - share))
+        slo = self.slos.get(name)
+        if slo is not None and now - getattr(task, "enqueued_at", now) > slo:
+            self.slo_breaches[name] += 1
+
+    async def get(self):
+        """Wait for the next eligible task. Returns None once the scheduler is closed."""
+        while True:
+            try:
+                return self.get_nowait()
+            except asyncio.QueueEmpty:
+                pass
+            if self._closed:
+                return None
+            waiter = asyncio.get_running_loop().create_future()
+            self._waiters.append(waiter)
+            try:
+                await waiter
+            except BaseException:
+                waiter.cancel()
+                try:
+                    self._waiters.remove(waiter)
+                except ValueError:
+                    pass
+                # We may have been handed a wakeup just before being cancelled; pass it on.
+                if self.ready() and not waiter.cancelled():
+                    self._wakeup_next()
+                raise
+
+    def remove(self, task) -> bool:
+        return self._foreground.remove(task) or self._background.remove(task)
+
+    def unpark(self, user_id):
+        """Re-admit a user's queued tasks after one of their running tasks finished."""
+        woken = self._foreground.unpark(user_id)
+        woken = self._background.unpark(user_id) or woken
+        if woken:
+            self._wakeup_next()
+
+    def drain(self) -> list:
+        """Remove and return every queued task, foreground first."""
+        return self._foreground.drain() + self._background.drain()
+
+    def close(self):
+        """Stop accepting work and release every parked waiter."""
+        self._closed = True
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+
+    def _wakeup_next(self):
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                break
+
+
+class TaskLane:
+    """A worker lane: its own scheduler, worker bounds and dequeue wait-time stats."""
+
+    def __init__(self, name: str, max_workers: int, min_workers: int = 1, maxsize: int = 1000, background_maxsize: int = 1000, weights: dict = None, limits: dict = None, running: Counter = None, **scheduling):
+        self.name = name
+        self.max_workers = max_workers
+        self.min_workers = min(min_workers, max_workers)
+        self.workers = 0  # Live worker coroutines
+        self.idle = 0  # Workers currently parked waiting for a task
+        self.scheduler = TaskScheduler(maxsize=maxsize, background_maxsize=background_maxsize, weights=weights, limits=limits, running=running, **scheduling)
+        self.dequeued = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self.wait_last = 0.0
+
+    def put_nowait(self, task, background: bool = False, force: bool = False):
+        task.enqueued_at = time.monotonic()
+        self.scheduler.put_nowait(task, background=background, force=force)
+
+    async def get(self):
+        task = await self.scheduler.get()
+        if task is not None:
+            self._record_wait(time.monotonic() - getattr(task, "enqueued_at", time.monotonic()))
+        return task
+
+    def _record_wait(self, wait: float):
+        self.dequeued += 1
+        self.wait_total += wait
+        self.wait_last = wait
+        if wait > self.wait_max:
+            self.wait_max = wait
+
+    def remove(self, task) -> bool:
+        return self.scheduler.remove(task)
+
+    def backlog(self) -> int:
+        """Queued tasks that a worker could pick up right now (parked users excluded)."""
+        return self.scheduler.qsize() if self.scheduler.ready() else 0
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.workers,
+            "idle_workers": self.idle,
+            "min_workers": self.min_workers,
+            "max_workers": self.max_workers,
+            "depth": self.scheduler.qsize(),
+            "foreground_depth": self.scheduler.qsize(background=False),
+            "background_depth": self.scheduler.qsize(background=True),
+            "dequeued": self.dequeued,
+            "wait_avg": self.wait_total / self.dequeued if self.dequeued else 0.0,
+            "wait_max": self.wait_max,
+            "wait_last": self.wait_last,
+            "slo_breaches": dict(self.scheduler.slo_breaches),
+        }
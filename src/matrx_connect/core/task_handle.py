@@ -0,0 +1,103 @@
+import asyncio
+import time
+from typing import Any, Optional
+
+FINAL_STATES = ("done", "failed", "timeout", "cancelled", "offloaded")
+
+
+class TaskHandle:
+    """
+    Future-like view of a task submitted to the TaskQueue.
+
+    `await handle` (or `await handle.wait()`) returns the task's result, or raises its
+    exception, asyncio.CancelledError if it was cancelled, or TaskDeadlineExceeded if it ran
+    out of time. Waiter futures are only created when someone awaits, so fire-and-forget
+    submissions cost nothing and failed ones never log "exception was never retrieved".
+
+    status: queued -> running -> done | failed | timeout | cancelled, or "offloaded" when
+    the task was handed to another node (its result stays there).
+    """
+
+    __slots__ = ("task_id", "status", "submitted_at", "started_at", "finished_at", "_queue", "_result", "_error", "_waiters")
+
+    def __init__(self, task_id: str, queue=None):
+        self.task_id = task_id
+        self.status = "queued"
+        self.submitted_at = time.monotonic()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self._queue = queue
+        self._result = None
+        self._error: Optional[BaseException] = None
+        self._waiters = []
+
+    def __repr__(self):
+        return f"<TaskHandle {self.task_id} {self.status}>"
+
+    def done(self) -> bool:
+        return self.status in FINAL_STATES
+
+    def cancelled(self) -> bool:
+        return self.status == "cancelled"
+
+    def result(self) -> Any:
+        if not self.done():
+            raise asyncio.InvalidStateError("Task has not finished")
+        if self.status == "cancelled":
+            raise asyncio.CancelledError()
+        if self._error is not None:
+            raise self._error
+        return self._result
+
+    def exception(self) -> Optional[BaseException]:
+        if not self.done():
+            raise asyncio.InvalidStateError("Task has not finished")
+        if self.status == "cancelled":
+            raise asyncio.CancelledError()
+        return self._error
+
+    async def wait(self) -> Any:
+        if not self.done():
+            waiter = asyncio.get_running_loop().create_future()
+            self._waiters.append(waiter)
+            try:
+                await waiter
+            finally:
+                if waiter in self._waiters:
+                    self._waiters.remove(waiter)
+        return self.result()
+
+    def __await__(self):
+        return self.wait().__await__()
+
+    async def cancel(self) -> bool:
+        """Cancel the task through the queue. Returns False if it already finished."""
+        if self.done() or self._queue is None:
+            return False
+        return await self._queue.cancel_task(self.task_id) is not None
+
+    @property
+    def wait_time(self) -> Optional[float]:
+        """Seconds between submission and a worker starting the task."""
+        return self.started_at - self.submitted_at if self.started_at is not None else None
+
+    @property
+    def run_time(self) -> Optional[float]:
+        if self.started_at is None or self.finished_at is None:
+            return None
+        return self.finished_at - self.started_at
+
+    def _start(self):
+        self.status = "running"
+        self.started_at = time.monotonic()
+
+    def _finish(self, status: str, result: Any = None, error: Optional[BaseException] = None):
+        if self.done():
+            return
+        self.status = status
+        self._result = result
+        self._error = error
+        self.finished_at = time.monotonic()
+        for waiter in self._waiters:
+            if not waiter.done():
+                waiter.set_result(None)
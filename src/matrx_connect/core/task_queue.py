@@ -1,25 +1,85 @@
 import asyncio
+import contextvars
+import math
+import os
+import socket
 import threading
 import time
 import traceback
+import uuid
 import warnings
-from collections import Counter, defaultdict
-from concurrent.futures import ThreadPoolExecutor
-from dataclasses import dataclass
-from typing import Callable, Optional
+from collections import Counter, defaultdict, deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Callable, Optional, Union
 
-from matrx_utils import vcprint
+from matrx_utils import settings, vcprint
+
+from .admission import AdmissionController
+from .bulkheads import get_bulkhead, get_bulkheads
+from .deadlines import deadline_scope, resolve_deadline
+from .distributed import SQLiteTransport, TaskTransport
+from .estimates import RuntimeEstimator
+from .metrics import MetricsRegistry
+from .process_pool import ProcessPoolLane
+from .scheduler import TaskLane
+from .task_handle import TaskHandle
+from .task_store import SQLiteTaskStore, TaskStore, resolve_callable, task_record
+from .timing_wheel import Timer, TimingWheel
+from ..exceptions.task_queue_errors import TaskDeadlineExceeded, TaskRejectedError
 
 # Ensure warnings are shown
 warnings.filterwarnings("always")
 
 LONG_RUNNING_SERVICES = {}
+PROCESS_POOL_SERVICES = {}  # Services whose sync tasks run in the process pool
+PROCESS_POOL_PRELOAD_MODULES = []  # Modules imported by every process pool worker on startup
 
 info = True
 debug = False
 verbose = False
 
 
+# TaskQueue option -> (setting, type) for everything configurable from settings
+_SETTINGS_OPTIONS = {
+    "short_running_workers": ("TASK_QUEUE_SHORT_WORKERS", int),
+    "long_running_workers": ("TASK_QUEUE_LONG_WORKERS", int),
+    "min_workers": ("TASK_QUEUE_MIN_WORKERS", int),
+    "lane_maxsize": ("TASK_QUEUE_LANE_MAXSIZE", int),
+    "process_pool_workers": ("TASK_QUEUE_PROCESS_POOL_WORKERS", int),
+    "autoscale": ("TASK_QUEUE_AUTOSCALE", bool),
+    "target_wait": ("TASK_QUEUE_TARGET_WAIT", float),
+    "node_id": ("TASK_QUEUE_NODE_ID", str),
+    "drain_timeout": ("TASK_QUEUE_DRAIN_TIMEOUT", float),
+}
+
+
+def _setting(name: str, cast: Callable = float):
+    """Setting `name` as `cast`, or None when it is unset. Settings from the environment arrive as strings."""
+    value = getattr(settings, name, None)
+    if value is None or value == "":
+        return None
+    if cast is bool and isinstance(value, str):
+        return value.strip().lower() in ("1", "true", "yes", "on")
+    return cast(value)
+
+
+def task_queue_options_from_settings() -> dict:
+    """
+    TaskQueue options from TASK_QUEUE_* settings, for the queue the app creates at startup.
+    TASK_QUEUE_STORE_PATH makes the queue durable (SQLiteTaskStore) and TASK_QUEUE_TRANSPORT_PATH
+    shares work between nodes (SQLiteTransport); unset options keep the constructor defaults.
+    """
+    options = {option: _setting(name, cast) for option, (name, cast) in _SETTINGS_OPTIONS.items()}
+    store_path = _setting("TASK_QUEUE_STORE_PATH", str)
+    if store_path:
+        options["store"] = SQLiteTaskStore(store_path)
+    transport_path = _setting("TASK_QUEUE_TRANSPORT_PATH", str)
+    if transport_path:
+        options["transport"] = SQLiteTransport(transport_path)
+    return {option: value for option, value in options.items() if value is not None}
+
 
 @dataclass
 class Task:
@@ -32,6 +92,10 @@ class Task:
     stream_handler: Optional[Callable] = None
     is_sync: bool = False
     callback: Optional[Callable] = None
+    use_process_pool: bool = False
+    deadline: Optional[float] = None  # Seconds the task may run; defaults to the service's declared deadline
+    wire_format: Optional[str] = None  # Format the sid's client negotiated, for a node the sid isn't connected to
+    task_id: str = field(default_factory=lambda: uuid.uuid4().hex)
 
     def __post_init__(self):
         self.submit_time = getattr(self, "submit_time", time.time())
@@ -57,13 +121,13 @@ class TaskQueue:
         return await loop.run_in_executor(None, cls.get_instance)
 
     @classmethod
-    def initialize(cls, user_sessions=None):
+    def initialize(cls, user_sessions=None, **lane_options):
         from matrx_connect import get_user_session_namespace
 
         with cls._lock:
             if cls._instance is None:
                 user_sessions = user_sessions or get_user_session_namespace()
-                cls._instance = cls(user_sessions)
+                cls._instance = cls(user_sessions, **lane_options)
                 loop = asyncio.get_event_loop()
                 asyncio.create_task(cls._instance.start())
             return cls._instance
@@ -78,165 +142,653 @@ class TaskQueue:
             vcprint("[TASK QUEUE] Reset", verbose=info, color="yellow")
         return cls._instance
 
-    def __init__(self, user_sessions):
+    def __init__(
+        self,
+        user_sessions,
+        short_running_workers: int = 50,
+        long_running_workers: int = 50,
+        lane_maxsize: int = 1000,
+        process_pool_workers: Optional[int] = None,
+        min_workers: int = 2,
+        autoscale: bool = True,
+        autoscale_interval: float = 0.5,
+        scale_down_after: float = 5.0,
+        target_wait: float = 0.25,
+        max_loop_lag: float = 0.1,
+        store: Optional[TaskStore] = None,
+        transport: Optional[TaskTransport] = None,
+        node_id: Optional[str] = None,
+        steal_interval: float = 0.05,
+        aging_rate: float = 1.0,
+        background_share: float = 0.1,
+        foreground_slo: Optional[float] = None,
+        background_slo: Optional[float] = 30.0,
+        sjf_weight: float = 1.0,
+        runtime_estimates_path: Optional[str] = None,
+        timer_tick: float = 0.1,
+        drain_timeout: float = 30.0,
+    ):
         self.user_sessions = user_sessions
-        self.queue = asyncio.PriorityQueue(maxsize=1000)
-        self.background_queue = asyncio.PriorityQueue(maxsize=1000)
-        self.user_tasks = Counter()
-        self.user_limits = defaultdict(lambda: 5)
+        self.user_tasks = Counter()  # Running tasks per user
+        self.user_limits = defaultdict(lambda: 5)  # Max concurrently running tasks per user, 0 = unlimited
+        self.user_weights = {}  # Fair-share weight per user, default 1.0
+        fairness = {"weights": self.user_weights, "limits": self.user_limits, "running": self.user_tasks}
+        # Priority drops by aging_rate per second waited; background gets at least background_share of dispatches.
+        fairness.update(aging_rate=aging_rate, background_share=background_share, slos={"foreground": foreground_slo, "background": background_slo}, sjf_weight=sjf_weight)
+        self.lanes = {
+            "short": TaskLane("short", max_workers=short_running_workers, min_workers=min_workers, maxsize=lane_maxsize, background_maxsize=lane_maxsize, **fairness),
+            "long": TaskLane("long", max_workers=long_running_workers, min_workers=min_workers, maxsize=lane_maxsize, background_maxsize=lane_maxsize, **fairness),
+        }
+        self.autoscale = autoscale
+        self.autoscale_interval = autoscale_interval
+        self.scale_down_after = scale_down_after
+        self.target_wait = target_wait  # Queue wait (s) the autoscaler grows a lane to stay under
+        self.max_loop_lag = max_loop_lag
+        self.loop_lag = 0.0
+        # Rate limits and the in-flight ceiling are opt-in, from settings (see AdmissionController).
+        self.admission = AdmissionController(
+            user_rate=_setting("TASK_QUEUE_USER_RATE"),
+            user_burst=_setting("TASK_QUEUE_USER_BURST"),
+            service_rate=_setting("TASK_QUEUE_SERVICE_RATE"),
+            service_burst=_setting("TASK_QUEUE_SERVICE_BURST"),
+            max_in_flight=_setting("TASK_QUEUE_MAX_IN_FLIGHT", int) or 0,
+        )
+        self.estimator = RuntimeEstimator(path=runtime_estimates_path or os.path.join(settings.TEMP_DIR, "task_queue", "runtime_estimates.json"))
+        self.store = store or TaskStore()  # The base TaskStore keeps nothing: plain in-memory queueing
+        self.transport = transport  # Shared broker for distributed mode, None = this node only
+        self.node_id = node_id or f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:6]}"
+        self.steal_interval = steal_interval
+        self._claimed = set()  # task_ids this node took from the transport and hasn't acked
+        self._remote_factories = {}  # user_id -> ServiceFactory for stolen socket tasks
+        self._remote_sids = Counter()  # sid -> running stolen tasks whose wire format this node adopted
+        self._registry = {}  # task_id, and (user_id, response_listener_event) for each listener -> queued or running Task
+        self.loop: Optional[asyncio.AbstractEventLoop] = None  # The loop start() ran on; all queue state lives there
+        self._handoff = deque()  # (task, background, Future) submitted from other threads
+        self._handoff_scheduled = False
+        self.timers = TimingWheel(tick=timer_tick)  # schedule_at / schedule_every
+        self._timer_wakeup: Optional[asyncio.Event] = None
+        self._init_metrics()
         self.system_service_factory = None
-        self.short_running_workers = 50
-        self.long_running_workers = 50
         self.running = True
+        self.draining = False
+        self.drain_timeout = drain_timeout  # Seconds shutdown() lets running tasks finish
         self.executor = ThreadPoolExecutor(max_workers=50)
-        self._worker_ids = {}  # Track worker IDs
-        self._user_task_queues = defaultdict(list)  # Track tasks per user
+        self.process_pool = ProcessPoolLane(workers=process_pool_workers, preload_modules=PROCESS_POOL_PRELOAD_MODULES)
+        self._process_pool_requested = process_pool_workers is not None
+        self._worker_ids = {}  # worker_id -> "idle" | "busy"
+        self._worker_handles = {}  # worker_id -> asyncio.Task
+        self._worker_tasks = set()
+
+    @property
+    def short_running_workers(self) -> int:
+        return self.lanes["short"].max_workers
+
+    @property
+    def long_running_workers(self) -> int:
+        return self.lanes["long"].max_workers
+
+    def lane_for(self, task: Task) -> TaskLane:
+        is_long_running = task.service_name in LONG_RUNNING_SERVICES if task.service_name else False
+        if not is_long_running:
+            # Services not declared long-running are classified from their observed runtimes.
+            is_long_running = self.estimator.is_long(self.runtime_key(task))
+        return self.lanes["long" if is_long_running else "short"]
+
+    def runtime_key(self, task: Task) -> tuple:
+        """(service, task name) that runtime estimates are kept under."""
+        service = task.service_name or getattr(task.callback, "__qualname__", None) or "callback"
+        task_name = "*"
+        if isinstance(task.data, list) and task.data and isinstance(task.data[0], dict):
+            task_name = task.data[0].get("task") or task.data[0].get("taskName") or "*"
+        return service, task_name
+
+    def estimate_completion(self, task: Task) -> Optional[float]:
+        """Expected seconds until `task` would finish if enqueued now: recent lane wait plus expected runtime."""
+        expected = self.estimator.expected(self.runtime_key(task))
+        if expected is None:
+            return None
+        return self.lane_for(task).stats()["wait_avg"] + expected
+
+    def get_runtime_estimates(self) -> dict:
+        return self.estimator.snapshot()
+
+    def _route(self, task: Task) -> TaskLane:
+        task.expected_runtime = self.estimator.expected(self.runtime_key(task)) or 0.0
+        return self.lane_for(task)
+
+    def uses_process_pool(self, task: Task) -> bool:
+        return task.is_sync and (task.use_process_pool or task.service_name in PROCESS_POOL_SERVICES)
+
+    def deadline_for(self, task: Task) -> float:
+        if task.deadline is not None:
+            return task.deadline
+        task_names = [item.get("task") or item.get("taskName") for item in task.data if isinstance(item, dict)] if isinstance(task.data, list) else []
+        return resolve_deadline(task.service_name, task_names)
+
+    def get_lane_stats(self) -> dict:
+        return {name: lane.stats() for name, lane in self.lanes.items()}
+
+    def get_bulkhead_stats(self) -> dict:
+        return {name: bulkhead.stats() for name, bulkhead in get_bulkheads().items()}
+
+    def _executor_for(self, task: Task) -> ThreadPoolExecutor:
+        """The service's dedicated bulkhead pool if it declared one, else the shared executor."""
+        bulkhead = get_bulkhead(task.service_name)
+        return (bulkhead.executor if bulkhead is not None else None) or self.executor
+
+    def _init_metrics(self):
+        self.metrics = MetricsRegistry()
+        self._metric_enqueued = self.metrics.counter("task_queue_enqueued_total", "Tasks accepted onto a lane.", ("lane", "service"))
+        self._metric_rejected = self.metrics.counter("task_queue_rejected_total", "Requests refused by admission control or a full lane.", ("reason",))
+        self._metric_timeouts = self.metrics.counter("task_queue_timeouts_total", "Tasks cancelled for exceeding their deadline.", ("lane", "service"))
+        self._metric_cancelled = self.metrics.counter("task_queue_cancelled_total", "Tasks cancelled by id.", ("state",))
+        self._metric_errors = self.metrics.counter("task_queue_errors_total", "Tasks that raised out of the worker.", ("lane", "service"))
+        self._metric_wait = self.metrics.histogram("task_queue_wait_seconds", "Time from enqueue to a worker starting the task.", ("lane", "service"))
+        self._metric_run = self.metrics.histogram("task_queue_run_seconds", "Time from a worker starting the task to it finishing.", ("lane", "service"))
+        self._metric_slo_breaches = self.metrics.counter("task_queue_slo_breaches_total", "Tasks that started after waiting longer than their queue's SLO.", ("lane", "queue"))
+        self._metric_depth = self.metrics.gauge("task_queue_depth", "Tasks waiting in a lane.", ("lane", "queue"))
+        self._metric_workers = self.metrics.gauge("task_queue_workers", "Worker coroutines by state.", ("lane", "state"))
+        self._metric_max_workers = self.metrics.gauge("task_queue_max_workers", "Autoscaling ceiling per lane.", ("lane",))
+        self._metric_in_flight = self.metrics.gauge("task_queue_in_flight", "Admitted tasks queued or running.")
+        self._metric_loop_lag = self.metrics.gauge("task_queue_loop_lag_seconds", "Event loop lag seen by the autoscaler.")
+        self._metric_timers = self.metrics.gauge("task_queue_scheduled_timers", "Pending schedule_at / schedule_every timers.")
+        self._metric_bulkhead_active = self.metrics.gauge("task_queue_bulkhead_active", "Tasks holding a bulkhead slot, queued or running.", ("service",))
+        self._metric_bulkhead_parked = self.metrics.gauge("task_queue_bulkhead_parked", "Tasks parked because their service is at its concurrency limit.", ("service",))
+
+    def render_metrics(self) -> str:
+        """Prometheus text exposition of the queue. Gauges are sampled now; everything else is cumulative."""
+        for name, lane in self.lanes.items():
+            self._metric_depth.set(name, "foreground", value=lane.scheduler.qsize(background=False))
+            self._metric_depth.set(name, "background", value=lane.scheduler.qsize(background=True))
+            self._metric_max_workers.set(name, value=lane.max_workers)
+            for queue, count in lane.scheduler.slo_breaches.items():
+                self._metric_slo_breaches.values[(name, queue)] = count
+            states = Counter(state for worker_id, state in list(self._worker_ids.items()) if worker_id.startswith(f"{name}-"))
+            for state in ("busy", "idle", "retiring"):
+                self._metric_workers.set(name, state, value=states[state])
+        self._metric_in_flight.set(value=self.admission.in_flight)
+        self._metric_loop_lag.set(value=self.loop_lag)
+        self._metric_timers.set(value=len(self.timers))
+        for name, bulkhead in get_bulkheads().items():
+            self._metric_bulkhead_active.set(name, value=bulkhead.active)
+            self._metric_bulkhead_parked.set(name, value=bulkhead.parked())
+        for reason, count in self.admission.rejections_by_reason.items():
+            self._metric_rejected.values[(reason,)] = count
+        return self.metrics.render()
 
     def set_user_limit(self, user_id: str, limit: int):
         vcprint(f"[TASK QUEUE] Setting user limit for {user_id}: {limit}", verbose=info, color="yellow")
         self.user_limits[user_id] = max(0, limit)
+        self._unpark_user(user_id)
 
-    async def _cancel_user_tasks(self, user_id: str):
-        vcprint(f"[TASK QUEUE] Cancelling all tasks for user {user_id}", verbose=info, color="yellow")
-        tasks = self._user_task_queues.get(user_id, [])
-        for task in tasks:
-            if not task.done():
-                task.cancel()
-        self._user_task_queues[user_id].clear()
-        self.user_tasks[user_id] = 0
-
-    async def add_task(self, task: Task):
-        if self.queue.full():
-            vcprint(f"[TASK QUEUE] Queue full, rejecting task | Service: {task.service_name} | User: {task.user_id}", verbose=info, color="yellow")
-            raise ValueError("Task queue full")
-        if task.user_id != "system" and self.user_tasks[task.user_id] >= self.user_limits[task.user_id]:
-            vcprint(f"[TASK QUEUE] User {task.user_id} exceeded task limit, cancelling all their tasks", verbose=info, color="yellow")
-            await self._cancel_user_tasks(task.user_id)
-            raise ValueError(f"User {task.user_id} exceeded task limit; all tasks cancelled")
-        await self.queue.put(task)
-        self.user_tasks[task.user_id] += 1
-        self._user_task_queues[task.user_id].append(asyncio.current_task())
-        vcprint(f"[TASK QUEUE] Task added | Service: {task.service_name} | User: {task.user_id} | Priority: {task.priority}", verbose=info, color="blue")
-
-    def add_task_sync(self, task: Task):
-        vcprint(f"[TASK QUEUE] Adding sync task | Service: {task.service_name} | User: {task.user_id}", verbose=info, color="yellow")
-        loop = asyncio.get_event_loop()
+    def set_user_weight(self, user_id: str, weight: float):
+        vcprint(f"[TASK QUEUE] Setting user weight for {user_id}: {weight}", verbose=info, color="yellow")
+        if weight <= 0:
+            raise ValueError("User weight must be positive")
+        self.user_weights[user_id] = weight
+
+    def set_queue_slo(self, queue: str, seconds: Optional[float]):
+        """Maximum wait for the "foreground" or "background" queue; a queue past it is served first."""
+        if queue not in ("foreground", "background"):
+            raise ValueError(f"Unknown queue: {queue}")
+        vcprint(f"[TASK QUEUE] Setting {queue} SLO: {seconds}", verbose=info, color="yellow")
+        for lane in self.lanes.values():
+            lane.scheduler.slos[queue] = seconds
+
+    def _unpark_user(self, user_id: str):
+        for lane in self.lanes.values():
+            lane.scheduler.unpark(user_id)
+
+    def _admit(self, task: Task, lane, background: bool = False):
+        in_use = next((event_name for event_name in self._response_listener_events(task) if (task.user_id, event_name) in self._registry), None)
+        if in_use is not None:
+            # Two live tasks on one listener event would interleave their streams and shadow each other.
+            self.admission.count_rejection("duplicate_listener")
+            raise TaskRejectedError(reason="duplicate_listener", retry_after=None, message=f"response_listener_event {in_use} is already in use by a queued or running task")
+        if lane.scheduler.full(background=background):
+            vcprint(f"[TASK QUEUE] Queue full, rejecting task | Lane: {lane.name} | Service: {task.service_name} | User: {task.user_id}", verbose=info, color="yellow")
+            lane_stats = lane.stats()
+            message = "Background queue full" if background else "Task queue full"
+            self.admission.count_rejection("queue_full")
+            raise TaskRejectedError(reason="queue_full", retry_after=max(1.0, lane_stats["wait_avg"]), message=message)
+        self.admission.admit(task.user_id, task.service_name)
+        task.admitted = True
+
+    def _release(self, task: Task):
+        if getattr(task, "admitted", False):
+            task.admitted = False
+            self.admission.release()
+
+    async def add_task(self, task: Task) -> TaskHandle:
+        """Enqueue `task` and return a handle that can be awaited for its result."""
+        return await self._add_task(task)
+
+    async def _add_task(self, task: Task, background: bool = False) -> TaskHandle:
+        lane = self._route(task)
+        self._admit(task, lane, background=background)
+        handle = task.handle = TaskHandle(task.task_id, self)
+        if await self._offload(task, lane, background=background):
+            handle._finish("offloaded")
+            return handle
+        self._enqueue(task, lane, background=background)
+        self._register(task)
+        self._metric_enqueued.inc(lane.name, task.service_name or "callback")
+        task.persisted = self.store.add(task, background=background)
+        self._absorb_burst(lane)
+        vcprint(f"[TASK QUEUE] {'Background task' if background else 'Task'} added | Lane: {lane.name} | Service: {task.service_name} | User: {task.user_id} | Priority: {task.priority}", verbose=info, color="blue")
+        return handle
+
+    def _enqueue(self, task: Task, lane: TaskLane, background: bool = False):
+        """Put `task` on its lane, or park it when its service is at its bulkhead limit."""
+        task.background = background
+        bulkhead = get_bulkhead(task.service_name)
+        if bulkhead is None:
+            lane.put_nowait(task, background=background)
+        elif bulkhead.try_acquire():
+            try:
+                lane.put_nowait(task, background=background)
+            except BaseException:
+                bulkhead.release()
+                raise
+            task.bulkhead = bulkhead
+        else:
+            # Parked tasks hold no worker; they take the slot of the next task of theirs to finish.
+            bulkhead.park(task, lane, background)
+
+    def _release_bulkhead(self, task: Task):
+        bulkhead = getattr(task, "bulkhead", None)
+        if bulkhead is None:
+            return
+        task.bulkhead = None
+        bulkhead.release()
+        if not self.running:
+            return
+        successor = bulkhead.unpark()
+        if successor is not None:
+            parked, lane, background = successor
+            lane.put_nowait(parked, background=background, force=True)
+            parked.bulkhead = bulkhead
+            self._absorb_burst(lane)
+
+    def submit_threadsafe(self, task: Task, background: bool = False) -> Future:
+        """
+        Enqueue `task` from any thread, including sync services running in the thread pool.
+
+        The task is appended to a deque (append/popleft are atomic, so producers never take a
+        lock) and the queue's loop is woken once per batch with call_soon_threadsafe. Returns a
+        concurrent.futures.Future that resolves to the task's TaskHandle once it is accepted,
+        or raises TaskRejectedError if it was refused.
+        """
+        loop = self.loop
+        if loop is None or loop.is_closed():
+            raise RuntimeError("TaskQueue is not running; start() it on the server loop first")
+        future = Future()
+        self._handoff.append((task, background, future))
+        # Append before checking the flag so a drain that is already running can't miss the task.
+        if not self._handoff_scheduled:
+            self._handoff_scheduled = True
+            loop.call_soon_threadsafe(self._drain_handoff)
+        return future
+
+    def _drain_handoff(self):
+        self._handoff_scheduled = False
+        while self._handoff:
+            task, background, future = self._handoff.popleft()
+            if not future.set_running_or_notify_cancel():
+                continue
+            submission = self.loop.create_task(self._add_task(task, background))
+            submission.add_done_callback(lambda done, future=future: self._settle(done, future))
+
+    @staticmethod
+    def _settle(submission: asyncio.Task, future: Future):
+        if submission.cancelled():
+            future.cancel()
+        elif submission.exception() is not None:
+            future.set_exception(submission.exception())
+        else:
+            future.set_result(submission.result())
+
+    def _on_loop_thread(self) -> bool:
         try:
-            if loop.is_running():
-                future = asyncio.run_coroutine_threadsafe(self.add_task(task), loop)
-                future.result()
-            else:
-                asyncio.run(self.add_task(task))
-        except Exception as e:
-            vcprint(f"[TASK QUEUE] Error in add_task_sync: {str(e)}", verbose=True, color="red")
-            traceback.print_exc()
-            raise
+            return asyncio.get_running_loop() is self.loop
+        except RuntimeError:
+            return False
+
+    def add_task_sync(self, task: Task, wait: bool = True, timeout: Optional[float] = None):
+        """
+        Enqueue from sync code. From another thread, `wait` blocks until the task is accepted and
+        raises TaskRejectedError if it isn't. On the loop's own thread blocking would deadlock,
+        so the task is handed off and the Future is returned without waiting.
+        """
+        vcprint(f"[TASK QUEUE] Adding sync task | Service: {task.service_name} | User: {task.user_id}", verbose=info, color="yellow")
+        future = self.submit_threadsafe(task)
+        if wait and not self._on_loop_thread():
+            return future.result(timeout=timeout)
+        return future
+
+    def schedule_at(self, when: Union[float, datetime], background: bool = False, **task_kwargs) -> Timer:
+        """
+        Enqueue Task(**task_kwargs) at `when` (epoch seconds or a datetime). When the timer fires
+        the task goes through add_task like any other, so priority, fairness and admission apply.
+        Returns the Timer; call .cancel() on it to drop the task. Call from the queue's loop.
+        """
+        if isinstance(when, datetime):
+            when = when.timestamp()
+        return self._schedule(when - time.time(), None, background, task_kwargs)
+
+    def schedule_every(self, interval: float, first_delay: Optional[float] = None, background: bool = False, **task_kwargs) -> Timer:
+        """
+        Enqueue a fresh Task(**task_kwargs) every `interval` seconds, first after `first_delay`
+        (default one interval), until the returned Timer is cancelled. Call from the queue's loop.
+        """
+        if interval <= 0:
+            raise ValueError("Interval must be positive")
+        return self._schedule(interval if first_delay is None else first_delay, interval, background, task_kwargs)
+
+    def _schedule(self, delay: float, interval: Optional[float], background: bool, task_kwargs: dict) -> Timer:
+        if background:
+            task_kwargs.setdefault("priority", 100)
+        timer = self.timers.schedule(delay, payload=(background, task_kwargs), interval=interval)
+        if self._timer_wakeup is not None:
+            self._timer_wakeup.set()
+        return timer
+
+    async def _timer_loop(self):
+        while self.running:
+            self._timer_wakeup.clear()
+            delay = self.timers.next_delay()
+            if delay is None:
+                # Nothing scheduled: sleep until schedule_at / schedule_every adds a timer.
+                await self._timer_wakeup.wait()
+                continue
+            if delay:
+                # Sleep until the earliest timer, or less if a sooner one is scheduled meanwhile.
+                try:
+                    await asyncio.wait_for(self._timer_wakeup.wait(), timeout=delay)
+                except asyncio.TimeoutError:
+                    pass
+            for timer in self.timers.advance():
+                background, task_kwargs = timer.payload
+                try:
+                    await self._add_task(Task(**task_kwargs), background)
+                except TaskRejectedError as e:
+                    vcprint(f"[TASK QUEUE] Scheduled task rejected | Reason: {e.reason} | Timer: {timer}", verbose=info, color="yellow")
+                except Exception as e:
+                    vcprint(f"[TASK QUEUE] Error enqueueing scheduled task | Timer: {timer} | Error: {str(e)}", verbose=True, color="red")
 
-    async def add_background_task(self, **kwargs):
+    async def add_background_task(self, **kwargs) -> TaskHandle:
         vcprint(f"[TASK QUEUE] Adding background task | kwargs: {kwargs}", verbose=info, color="yellow")
-        if self.background_queue.full():
-            vcprint(f"[TASK QUEUE] Background queue full, rejecting task | kwargs: {kwargs}", verbose=info, color="yellow")
-            raise ValueError("Background queue full")
-        task = Task(priority=100, **kwargs)
-        if task.user_id != "system" and self.user_tasks[task.user_id] >= self.user_limits[task.user_id]:
-            vcprint(f"[TASK QUEUE] User {task.user_id} exceeded task limit, cancelling all their tasks", verbose=info, color="yellow")
-            await self._cancel_user_tasks(task.user_id)
-            raise ValueError(f"User {task.user_id} exceeded task limit; all tasks cancelled")
-        await self.background_queue.put(task)
-        self.user_tasks[task.user_id] += 1
-        self._user_task_queues[task.user_id].append(asyncio.current_task())
-        vcprint(f"[TASK QUEUE] Background task added | Service: {task.service_name} | User: {task.user_id}", verbose=info, color="yellow")
-
-    def add_background_task_sync(self, **kwargs):
+        return await self._add_task(Task(priority=100, **kwargs), background=True)
+
+    def add_background_task_sync(self, wait: bool = True, timeout: Optional[float] = None, **kwargs):
         vcprint(f"[TASK QUEUE] Adding sync background task | kwargs: {kwargs}", verbose=info, color="yellow")
-        loop = asyncio.get_event_loop()
+        future = self.submit_threadsafe(Task(priority=100, **kwargs), background=True)
+        if wait and not self._on_loop_thread():
+            return future.result(timeout=timeout)
+        return future
+
+    @staticmethod
+    def _settle_handle(task: Task, status: str, result=None, error: Optional[BaseException] = None):
+        handle = getattr(task, "handle", None)
+        if handle is not None:
+            handle._finish(status, result, error)
+
+    def _registry_keys(self, task: Task) -> list:
+        return [task.task_id, *((task.user_id, event_name) for event_name in self._response_listener_events(task))]
+
+    def _register(self, task: Task):
+        for key in self._registry_keys(task):
+            # Never shadow a live task; new submissions reusing its listener event are refused in _admit.
+            self._registry.setdefault(key, task)
+
+    def _unregister(self, task: Task):
+        for key in self._registry_keys(task):
+            if self._registry.get(key) is task:
+                del self._registry[key]
+
+    def find_task(self, key: str, user_id: Optional[str] = None) -> Optional[Task]:
+        """Look up a queued or running task by task_id, or by `user_id`'s response_listener_event."""
+        task = self._registry.get(key)
+        if task is None and user_id is not None:
+            task = self._registry.get((user_id, key))
+        return task
+
+    async def cancel_task(self, key: str, user_id: Optional[str] = None) -> Optional[str]:
+        """
+        Cancel the task registered under `key` (a task_id or response_listener_event).
+
+        A queued task is taken out of its lane (or its bulkhead's parking), releasing its
+        admission and bulkhead slots now. A running task has its deadline expired, so check_deadline() stops sync work,
+        and its execution cancelled. Listeners get send_cancelled() either way. Returns
+        "queued" or "running", or None when there is no such task (or it belongs to another
+        user). A socket request with several tasks is cancelled as a whole.
+        """
+        task = self.find_task(key, user_id)
+        if task is None or getattr(task, "cancelled", False) or (user_id is not None and task.user_id != user_id):
+            return None
+        task.cancelled = True
+        execution = getattr(task, "execution", None)
+        if execution is None:
+            self._release(task)
+            self.store.ack(task)
+            self._unregister(task)
+            # A worker that already popped it skips it and cleans up; otherwise no worker ever will.
+            await self._withdraw(task)
+            self._settle_handle(task, "cancelled")
+            state = "queued"
+            await self._notify_cancelled(task, "Task was cancelled before it started")
+        else:
+            self._cancel_running(task, "Task was cancelled by request")
+            state = "running"
+        self._metric_cancelled.inc(state)
+        vcprint(f"[TASK QUEUE] Task cancelled | Key: {key} | State: {state} | Service: {task.service_name} | User: {task.user_id}", verbose=info, color="yellow")
+        return state
+
+    async def _withdraw(self, task: Task) -> bool:
+        """Take a queued task out of its lane or bulkhead parking. False once a worker has it."""
+        bulkhead = get_bulkhead(task.service_name)
+        if not any(lane.remove(task) for lane in self.lanes.values()):
+            if bulkhead is None or not bulkhead.remove(task):
+                return False
+        self._release_bulkhead(task)
+        if getattr(task, "remote", False):
+            self._claimed.discard(task.task_id)
+            try:
+                await self.transport.ack(task.task_id)
+            except Exception as e:
+                vcprint(f"[TASK QUEUE] Error acking shared task {task.task_id}: {str(e)}", verbose=True, color="red")
+        return True
+
+    async def get_task(self, lane: str = "short") -> Optional[Task]:
+        if not self.running:
+            return None
         try:
-            if loop.is_running():
-                future = asyncio.run_coroutine_threadsafe(self.add_background_task(**kwargs), loop)
-                future.result()
-            else:
-                asyncio.run(self.add_background_task(**kwargs))
+            task = await self.lanes[lane].get()
+        except asyncio.CancelledError:
+            raise
         except Exception as e:
-            vcprint(f"[TASK QUEUE] Error in add_background_task_sync: {str(e)}", verbose=True, color="red")
+            vcprint(f"[TASK QUEUE] Error in get_task: {str(e)}", verbose=True, color="red")
             traceback.print_exc()
             raise
-
-    async def get_task(self) -> Optional[Task]:
-        while self.running:
-            try:
-                task = await asyncio.wait_for(self.queue.get(), timeout=1.0)
-                return task
-            except asyncio.TimeoutError:
-                try:
-                    task = await asyncio.wait_for(self.background_queue.get(), timeout=1.0)
-                    self.user_tasks[task.user_id] += 1
-                    vcprint(f"[TASK QUEUE] Got background task | Service: {task.service_name} | User: {task.user_id}", verbose=info, color="yellow")
-                    return task
-                except asyncio.TimeoutError:
-                    continue
-            except Exception as e:
-                vcprint(f"[TASK QUEUE] Error in get_task: {str(e)}", verbose=True, color="red")
-                traceback.print_exc()
-                raise
-        vcprint("[TASK QUEUE] No task available, exiting get_task", verbose=info, color="yellow")
-        return None
+        if task is None:
+            vcprint("[TASK QUEUE] No task available, exiting get_task", verbose=info, color="yellow")
+        return task
 
     async def complete_task(self, task: Task):
         vcprint(f"[TASK QUEUE] Completing task | Service: {task.service_name} | User: {task.user_id}", verbose=info, color="yellow")
         self.user_tasks[task.user_id] -= 1
         if self.user_tasks[task.user_id] <= 0:
             del self.user_tasks[task.user_id]
-            self._user_task_queues[task.user_id].clear()
+        self._release(task)
+        self._release_bulkhead(task)
+        self.store.ack(task)
+        self._unregister(task)
+        if getattr(task, "remote", False):
+            self._claimed.discard(task.task_id)
+            self._release_remote_sid(task)
+            try:
+                await self.transport.ack(task.task_id)
+            except Exception as e:
+                vcprint(f"[TASK QUEUE] Error acking shared task {task.task_id}: {str(e)}", verbose=True, color="red")
+        self._unpark_user(task.user_id)
         vcprint(f"[TASK QUEUE] Task completed | Service: {task.service_name} | User: {task.user_id}", verbose=info, color="yellow")
 
     async def worker(self, worker_type: str):
         worker_id = f"{worker_type}-{self._worker_id_counter}"
         with self._lock:
             self._worker_id_counter += 1
-            self._worker_ids[worker_id] = True
+            self._worker_ids[worker_id] = "idle"
+            self._worker_handles[worker_id] = asyncio.current_task()
+        lane = self.lanes[worker_type]
+        idle = True  # _spawn_workers already counted this worker as live and idle
         loop = asyncio.get_running_loop()
-        while self.running:
-            task = await self.get_task()
-            if not task:
-                break
-            vcprint(f"[TASK QUEUE] Worker busy | ID: {worker_id} | Service: {task.service_name} | User: {task.user_id} | Sync: {task.is_sync}", verbose=info, color="yellow")
-            try:
-                is_long_running = task.service_name in LONG_RUNNING_SERVICES if task.service_name else False
-                if worker_type == "short" and is_long_running:
-                    vcprint(f"[TASK QUEUE] Requeuing long task in short worker | ID: {worker_id} | Service: {task.service_name}", verbose=info, color="yellow")
-                    await self.queue.put(task)
-                    await asyncio.sleep(0.1)
-                    self.user_tasks[task.user_id] -= 1
-                    continue
-                elif worker_type == "long" and not is_long_running and task.service_name:
-                    vcprint(f"[TASK QUEUE] Requeuing short task in long worker | ID: {worker_id} | Service: {task.service_name}", verbose=info, color="yellow")
-                    await self.queue.put(task)
-                    await asyncio.sleep(0.1)
-                    self.user_tasks[task.user_id] -= 1
-                    continue
+        try:
+            while self.running:
+                task = await self.get_task(worker_type)
+                if not task:
+                    break
+                idle = False
+                lane.idle -= 1
+                self._worker_ids[worker_id] = "busy"
+                vcprint(f"[TASK QUEUE] Worker busy | ID: {worker_id} | Service: {task.service_name} | User: {task.user_id} | Sync: {task.is_sync}", verbose=info, color="yellow")
+                deadline = self.deadline_for(task)
+                service_label = task.service_name or "callback"
+                started = time.monotonic()
+                self._metric_wait.observe(started - getattr(task, "enqueued_at", started), worker_type, service_label)
+                status, result, error = "failed", None, None
                 try:
-                    await asyncio.wait_for(self._process_task(task, loop), timeout=600)
+                    if getattr(task, "cancelled", False):
+                        # Cancelled while queued: drop it without running.
+                        status = "cancelled"
+                        continue
+                    if getattr(task, "handle", None) is not None:
+                        task.handle._start()
+                    with deadline_scope(deadline) as scope:
+                        task.scope = scope
+                        task.execution = asyncio.ensure_future(self._process_task(task, loop))
+                        result = await asyncio.wait_for(task.execution, timeout=deadline)
+                    error = getattr(task, "error", None)
+                    status = "failed" if error is not None else "done"
+                    if scope.exceeded:
+                        # The service noticed the deadline itself and stopped early.
+                        status, error = "timeout", TaskDeadlineExceeded(f"Task exceeded its {deadline:g}s deadline")
+                        self._metric_timeouts.inc(worker_type, service_label)
+                        await self._notify_cancelled(task, f"Task exceeded its {deadline:g}s deadline")
+                except asyncio.CancelledError:
+                    if not getattr(task, "cancelled", False):
+                        raise
+                    status = "cancelled"
+                    await self._notify_cancelled(task, getattr(task, "cancel_message", None) or "Task was cancelled by request")
                 except asyncio.TimeoutError:
-                    vcprint(f"[TASK QUEUE] Task timed out | ID: {worker_id} | Service: {task.service_name} | User: {task.user_id}", verbose=info, color="yellow")
-                    traceback.print_exc()
+                    status, error = "timeout", TaskDeadlineExceeded(f"Task exceeded its {deadline:g}s deadline")
+                    self._metric_timeouts.inc(worker_type, service_label)
+                    vcprint(f"[TASK QUEUE] Task timed out | ID: {worker_id} | Service: {task.service_name} | User: {task.user_id} | Deadline: {deadline:g}s", verbose=info, color="yellow")
+                    await self._notify_cancelled(task, f"Task exceeded its {deadline:g}s deadline")
                 except Exception as e:
+                    error = e
+                    self._metric_errors.inc(worker_type, service_label)
                     vcprint(f"[TASK QUEUE] Error in task execution | ID: {worker_id} | Service: {task.service_name} | User: {task.user_id} | Error: {str(e)}", verbose=info, color="yellow")
                     traceback.print_exc()
-            except Exception as e:
-                vcprint(f"[TASK QUEUE] Error processing task | ID: {worker_id} | Service: {task.service_name} | User: {task.user_id} | Error: {str(e)}", verbose=info, color="yellow")
-                traceback.print_exc()
-            finally:
-                await self.complete_task(task)
-                vcprint(f"[TASK QUEUE] Worker idle | ID: {worker_id}", verbose=info, color="yellow")
-        vcprint(f"[TASK QUEUE] Worker stopped | ID: {worker_id}", verbose=info, color="yellow")
-        with self._lock:
-            del self._worker_ids[worker_id]
+                finally:
+                    self._settle_handle(task, "cancelled" if getattr(task, "cancelled", False) else status, result, error)
+                    elapsed = time.monotonic() - started
+                    self._metric_run.observe(elapsed, worker_type, service_label)
+                    if not getattr(task, "cancelled", False):
+                        self.estimator.observe(self.runtime_key(task), elapsed)
+                    await self.complete_task(task)
+                    self._worker_ids[worker_id] = "idle"
+                    lane.idle += 1
+                    idle = True
+                    vcprint(f"[TASK QUEUE] Worker idle | ID: {worker_id}", verbose=info, color="yellow")
+        finally:
+            lane.workers -= 1
+            if idle:
+                lane.idle -= 1
+            vcprint(f"[TASK QUEUE] Worker stopped | ID: {worker_id}", verbose=info, color="yellow")
+            with self._lock:
+                self._worker_ids.pop(worker_id, None)
+                self._worker_handles.pop(worker_id, None)
+
+    def _spawn_workers(self, lane: TaskLane, count: int):
+        for i in range(count):
+            worker = asyncio.create_task(self.worker(lane.name))
+            self._worker_tasks.add(worker)
+            worker.add_done_callback(self._worker_tasks.discard)
+        # Count them immediately so back-to-back scaling decisions see the new workers.
+        lane.workers += count
+        lane.idle += count
+
+    def _retire_idle_workers(self, lane: TaskLane, count: int):
+        retired = 0
+        for worker_id, state in list(self._worker_ids.items()):
+            if retired >= count:
+                break
+            if state == "idle" and worker_id.startswith(f"{lane.name}-"):
+                handle = self._worker_handles.get(worker_id)
+                if handle and not handle.done():
+                    handle.cancel()
+                    self._worker_ids[worker_id] = "retiring"
+                    retired += 1
+        if retired:
+            vcprint(f"[TASK QUEUE] Scaled down | Lane: {lane.name} | Retired: {retired} | Workers: {lane.workers - retired}", verbose=info, color="yellow")
+
+    def _absorb_burst(self, lane: TaskLane):
+        """Add a worker straight away when more tasks are waiting than there are idle workers to take them."""
+        if not self.autoscale or not self.running or lane.workers >= lane.max_workers or lane.backlog() <= lane.idle:
+            return
+        if self.loop_lag > self.max_loop_lag:
+            return
+        self._spawn_workers(lane, 1)
+
+    async def _autoscaler(self):
+        last = {name: (lane.dequeued, lane.wait_total) for name, lane in self.lanes.items()}
+        idle_since = {}
+        while self.running:
+            started = time.monotonic()
+            await asyncio.sleep(self.autoscale_interval)
+            now = time.monotonic()
+            self.loop_lag = max(0.0, now - started - self.autoscale_interval)
+            for name, lane in self.lanes.items():
+                dequeued, wait_total = lane.dequeued - last[name][0], lane.wait_total - last[name][1]
+                last[name] = (lane.dequeued, lane.wait_total)
+                recent_wait = wait_total / dequeued if dequeued else 0.0
+                backlog = lane.backlog()
+                # Tasks waiting longer than target_wait mean the lane is short of workers even when
+                # the backlog at this instant is small (bursts that come and go between ticks).
+                slow = self.target_wait and recent_wait > self.target_wait
+
+                if (backlog or slow) and lane.idle == 0 and lane.workers < lane.max_workers:
+                    idle_since.pop(name, None)
+                    if self.loop_lag > self.max_loop_lag:
+                        # The loop itself is saturated; more coroutines would only add to the lag.
+                        continue
+                    grow = max(1, min(backlog, lane.workers))
+                    if slow:
+                        # Grow in proportion to how far over target the wait is, at most doubling.
+                        grow = max(grow, min(lane.workers, math.ceil(lane.workers * (recent_wait / self.target_wait - 1))))
+                    self._spawn_workers(lane, min(lane.max_workers - lane.workers, grow))
+                    vcprint(f"[TASK QUEUE] Scaled up | Lane: {name} | Backlog: {backlog} | Recent wait: {recent_wait:.3f}s | Workers: {lane.workers}", verbose=info, color="yellow")
+                elif not backlog and not slow and lane.idle > 0 and lane.workers > lane.min_workers:
+                    since = idle_since.setdefault(name, now)
+                    if now - since >= self.scale_down_after:
+                        self._retire_idle_workers(lane, min(max(1, lane.idle // 2), lane.workers - lane.min_workers))
+                        idle_since[name] = now
+                else:
+                    idle_since.pop(name, None)
 
     async def _process_task(self, task: Task, loop: asyncio.AbstractEventLoop):
         vcprint(f"[TASK QUEUE] Starting task | Service: {task.service_name} | User: {task.user_id} | Sync: {task.is_sync}", verbose=info, color="yellow")
         try:
             if task.callback:
-                if task.is_sync:
+                if self.uses_process_pool(task):
+                    try:
+                        return await self.process_pool.run_callback(task.callback, task.data)
+                    except Exception as e:
+                        vcprint(f"[TASK QUEUE] Error in process pool callback | Service: {task.service_name} | User: {task.user_id} | Error: {str(e)}", verbose=True, color="yellow")
+                        traceback.print_exc()
+                        task.error = e
+                        return None
+                elif task.is_sync:
 
                     def sync_callback():
                         try:
@@ -244,21 +796,28 @@ class TaskQueue:
                         except Exception as e:
                             vcprint(f"[TASK QUEUE] Error in sync callback | Service: {task.service_name} | User: {task.user_id} | Error: {str(e)}", verbose=True, color="yellow")
                             traceback.print_exc()
+                            task.error = e
                             return None
 
-                    future = loop.run_in_executor(self.executor, sync_callback)
-                    return await asyncio.wait_for(future, timeout=30)
+                    # The worker's deadline bounds the wait; the copied context lets the callback check it too.
+                    return await loop.run_in_executor(self._executor_for(task), contextvars.copy_context().run, sync_callback)
                 else:
                     try:
                         return await task.callback(task.data)
                     except Exception as e:
                         vcprint(f"[TASK QUEUE] Error in async callback | Service: {task.service_name} | User: {task.user_id} | Error: {str(e)}", verbose=True, color="yellow")
                         traceback.print_exc()
+                        task.error = e
                         return None
             elif task.service_name:
                 if task.sid:
                     try:
-                        user_id, service_factory = await self.user_sessions.get_user_factory_and_id(task.sid)
+                        if getattr(task, "remote", False):
+                            # The sid is connected to another node; responses reach it through the shared socket.io manager.
+                            user_id, service_factory = task.user_id, self._factory_for_remote(task.user_id)
+                            self._adopt_remote_sid(task)
+                        else:
+                            user_id, service_factory = await self.user_sessions.get_user_factory_and_id(task.sid)
                         if not service_factory:
                             vcprint(f"[TASK QUEUE] No ServiceFactory for SID {task.sid}", verbose=info, color="yellow")
                             return None
@@ -267,6 +826,7 @@ class TaskQueue:
                     except Exception as e:
                         vcprint(f"[TASK QUEUE] Error processing SID task | Service: {task.service_name} | SID: {task.sid} | Error: {str(e)}", verbose=True, color="yellow")
                         traceback.print_exc()
+                        task.error = e
                         return None
                 else:
                     try:
@@ -282,6 +842,9 @@ class TaskQueue:
                             vcprint(f"[TASK QUEUE] No ServiceFactory for user {task.user_id}", verbose=info, color="yellow")
                             return None
 
+                        if self.uses_process_pool(task):
+                            return await self._process_service_in_pool(task, service_factory)
+
                         service = service_factory.create_service(task.service_name)
                         if hasattr(service, "stream_handler"):
                             service.stream_handler = task.stream_handler
@@ -296,61 +859,370 @@ class TaskQueue:
                                 except Exception as e:
                                     vcprint(f"[TASK QUEUE] Error in sync service process | Service: {task.service_name} | User: {task.user_id} | Error: {str(e)}", verbose=True, color="yellow")
                                     traceback.print_exc()
+                                    task.error = e
                                     return None
 
-                            future = loop.run_in_executor(self.executor, sync_process)
-                            return await asyncio.wait_for(future, timeout=30)
+                            return await loop.run_in_executor(self._executor_for(task), contextvars.copy_context().run, sync_process)
                         else:
                             try:
                                 return await service.process_task(task.data or {}, context={"namespace": task.namespace})
                             except Exception as e:
                                 vcprint(f"[TASK QUEUE] Error in async service process | Service: {task.service_name} | User: {task.user_id} | Error: {str(e)}", verbose=True, color="yellow")
                                 traceback.print_exc()
+                                task.error = e
                                 return None
                     except Exception as e:
                         vcprint(f"[TASK QUEUE] Error setting up service | Service: {task.service_name} | User: {task.user_id} | Error: {str(e)}", verbose=True, color="yellow")
                         traceback.print_exc()
+                        task.error = e
                         return None
         except Exception as e:
             vcprint(f"[TASK QUEUE] Error in _process_task | Service: {task.service_name} | User: {task.user_id} | Error: {str(e)}", verbose=True, color="yellow")
             traceback.print_exc()
+            task.error = e
+            return None
+
+    async def _process_service_in_pool(self, task: Task, service_factory):
+        """
+        Run a sync service in a worker process. The service is rebuilt there from its class, so
+        it cannot stream; its return value is sent to the task's stream handler instead.
+        """
+        if task.service_name not in service_factory.services:
+            raise ValueError(f"Unknown service type: {task.service_name}")
+        service_class = service_factory.services[task.service_name]
+        try:
+            result = await self.process_pool.run_service(service_class, task.data or {}, {"namespace": task.namespace})
+        except Exception as e:
+            vcprint(f"[TASK QUEUE] Error in process pool service | Service: {task.service_name} | User: {task.user_id} | Error: {str(e)}", verbose=True, color="yellow")
+            traceback.print_exc()
+            task.error = e
+            return None
+        if result is not None and task.stream_handler:
+            await task.stream_handler.send_data_final(result)
+        return result
+
+    async def _notify_cancelled(self, task: Task, message: str):
+        """Tell whoever is listening for this task that it was cancelled."""
+        if task.stream_handler:
+            handlers = [task.stream_handler]
+        elif task.sid and isinstance(task.data, list):
+            from ..socket.response import SocketEmitter
+            from ..socket.response.response_base import get_live_response
+
+            namespace = task.namespace or "/UserSession"
+            handlers = []
+            for event_name in self._response_listener_events(task):
+                # End the stream through the task's own emitter, so chunks it still has buffered
+                # are flushed before the cancellation instead of arriving after the end frame.
+                live = get_live_response(event_name, task.sid)
+                if live is not None and hasattr(live, "send_cancelled"):
+                    handlers.append(live)
+                    continue
+                if live is not None:
+                    live.discard_pending()
+                handlers.append(SocketEmitter(event_name=event_name, sid=task.sid, namespace=namespace))
+        else:
+            handlers = []
+        for handler in handlers:
+            if not hasattr(handler, "send_cancelled"):
+                continue
+            try:
+                await handler.send_cancelled(message)
+            except Exception as e:
+                vcprint(f"[TASK QUEUE] Error sending cancellation | Service: {task.service_name} | User: {task.user_id} | Error: {str(e)}", verbose=True, color="red")
+
+    @staticmethod
+    def _response_listener_events(task: Task) -> list:
+        """The event names SocketRequestBase streams a socket task's responses on."""
+        events = []
+        for item in task.data if task.sid and isinstance(task.data, list) else []:
+            if not isinstance(item, dict):
+                continue
+            task_data = item.get("taskData") if isinstance(item.get("taskData"), dict) else {}
+            events.append(task_data.get("response_listener_event") or f"{task.sid}_{item.get('task') or item.get('taskName')}_{item.get('index', 0)}")
+        return events
+
+    async def _offload(self, task: Task, lane: TaskLane, background: bool = False) -> bool:
+        """Publish a task to the shared transport when this node has no capacity left to start it."""
+        if self.transport is None or lane.workers < lane.max_workers or lane.backlog() < lane.idle:
+            return False
+        record = self._shared_record(task, lane.name, background)
+        if record is None:
+            return False
+        try:
+            await self.transport.publish(record)
+        except Exception as e:
+            vcprint(f"[TASK QUEUE] Error publishing task, keeping it local | Service: {task.service_name} | Error: {str(e)}", verbose=True, color="red")
+            return False
+        # Whichever node claims it owns it now.
+        self._release(task)
+        vcprint(f"[TASK QUEUE] Task offloaded | Lane: {lane.name} | Service: {task.service_name} | User: {task.user_id} | Node: {self.node_id}", verbose=info, color="blue")
+        return True
+
+    def _shared_record(self, task: Task, lane_name: str, background: bool) -> Optional[dict]:
+        """
+        task_record() for the shared transport, or None when no other node could run the task.
+        A socket task can only go when socket.io has a shared client manager (SOCKET_MESSAGE_QUEUE);
+        without one, another node's emits never reach the sid.
+        """
+        if task.sid:
+            from ..socket.app import has_shared_client_manager
+            from ..socket.response.wire import get_sid_format
+
+            if not has_shared_client_manager():
+                return None
+            task.wire_format = task.wire_format or get_sid_format(task.sid).name
+        record = task_record(task, include_sid=True)
+        if record is not None:
+            record.update(lane=lane_name, background=background)
+        return record
+
+    def _adopt_remote_sid(self, task: Task):
+        """Answer a stolen socket task's sid in the wire format its client negotiated on its own node."""
+        from ..socket.response.wire import JSON, get_sid_format, negotiate, set_sid_format
+
+        if not self._remote_sids[task.sid]:
+            if get_sid_format(task.sid) is not JSON:
+                return  # Connected to this node, which already knows its format
+            set_sid_format(task.sid, negotiate(task.wire_format))
+        self._remote_sids[task.sid] += 1
+        task.adopted_sid = True
+
+    def _release_remote_sid(self, task: Task):
+        if not getattr(task, "adopted_sid", False):
+            return
+        task.adopted_sid = False
+        self._remote_sids[task.sid] -= 1
+        if self._remote_sids[task.sid] <= 0:
+            from ..socket.response.wire import forget_sid
+
+            del self._remote_sids[task.sid]
+            forget_sid(task.sid)
+
+    async def _steal_loop(self):
+        """Pull shared work into lanes that can start it right away, and keep claims on it alive."""
+        renewed = time.monotonic()
+        while self.running:
+            timeout = self.transport.visibility_timeout
+            if timeout and self._claimed and time.monotonic() - renewed >= timeout / 3:
+                # Long tasks outlive the visibility timeout; renewing stops other nodes re-running them.
+                renewed = time.monotonic()
+                try:
+                    await self.transport.renew(self.node_id, list(self._claimed))
+                except Exception as e:
+                    vcprint(f"[TASK QUEUE] Error renewing shared task claims | Node: {self.node_id} | Error: {str(e)}", verbose=True, color="red")
+            for lane in self.lanes.values():
+                capacity = lane.idle + (lane.max_workers - lane.workers if self.autoscale else 0) - lane.backlog()
+                if capacity <= 0:
+                    continue
+                try:
+                    records = await self.transport.claim(self.node_id, lane.name, capacity)
+                except Exception as e:
+                    vcprint(f"[TASK QUEUE] Error claiming shared tasks | Lane: {lane.name} | Error: {str(e)}", verbose=True, color="red")
+                    continue
+                for record in records:
+                    task = self._task_from_record(record)
+                    if task is None:
+                        await self.transport.ack(record["task_id"])
+                        continue
+                    task.remote = True
+                    try:
+                        self._enqueue(task, lane, background=record.get("background", False))
+                    except asyncio.QueueFull:
+                        await self.transport.release([task.task_id])
+                        continue
+                    self._register(task)
+                    self._claimed.add(task.task_id)
+                if records:
+                    vcprint(f"[TASK QUEUE] Stole {len(records)} tasks | Lane: {lane.name} | Node: {self.node_id}", verbose=info, color="blue")
+                    self._absorb_burst(lane)
+            await asyncio.sleep(self.steal_interval)
+
+    def _factory_for_remote(self, user_id: str):
+        """ServiceFactory for a socket task whose sid is connected to another node."""
+        factory = self.user_sessions.user_service_factories.get(user_id) if self.user_sessions else None
+        if factory is None:
+            factory = self._remote_factories.get(user_id)
+        if factory is None:
+            from matrx_connect import get_app_factory
+
+            factory = self._remote_factories[user_id] = get_app_factory()
+        return factory
+
+    @staticmethod
+    def _task_from_record(record: dict) -> Optional[Task]:
+        record = dict(record)
+        submit_time = record.pop("submit_time")
+        callback = record.pop("callback")
+        record.pop("background", None)
+        record.pop("lane", None)
+        try:
+            task = Task(callback=resolve_callable(callback) if callback else None, **record)
+        except Exception as e:
+            vcprint(f"[TASK QUEUE] Dropping unrecoverable task {record.get('task_id')} | Service: {record.get('service_name')} | Error: {str(e)}", verbose=True, color="red")
             return None
+        task.submit_time = submit_time
+        return task
+
+    async def _recover(self):
+        """Re-enqueue tasks the store accepted in a previous run but never saw complete."""
+        records = await self.store.open()
+        recovered = 0
+        for record in records:
+            task = self._task_from_record(record)
+            if task is None:
+                self.store.ack(Task(task_id=record["task_id"]))
+                continue
+            lane = self._route(task)
+            try:
+                self._enqueue(task, lane, background=record["background"])
+            except asyncio.QueueFull:
+                # Still in the store, so it will be offered again on the next start.
+                vcprint(f"[TASK QUEUE] Lane {lane.name} full while recovering, leaving task {task.task_id} in the store", verbose=info, color="yellow")
+                continue
+            task.persisted = True
+            self._register(task)
+            recovered += 1
+        if records:
+            vcprint(f"[TASK QUEUE] Recovered {recovered}/{len(records)} unfinished tasks", verbose=info, color="yellow")
+
+    async def _persist_estimates(self, interval: float = 60.0):
+        loop = asyncio.get_running_loop()
+        while self.running:
+            await asyncio.sleep(interval)
+            try:
+                await loop.run_in_executor(None, self.estimator.save)
+            except Exception as e:
+                vcprint(f"[TASK QUEUE] Error saving runtime estimates: {str(e)}", verbose=True, color="red")
 
     async def start(self):
-        short_tasks = []
-        for i in range(self.short_running_workers):
-            short_tasks.append(asyncio.create_task(self.worker("short")))
-        long_tasks = []
-        for i in range(self.long_running_workers):
-            long_tasks.append(asyncio.create_task(self.worker("long")))
-        self._worker_tasks = short_tasks + long_tasks
-
-    async def shutdown(self):
-        vcprint("[TASK QUEUE] Initiating shutdown", verbose=info, color="yellow")
+        loop = self.loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, self.estimator.load)
+        self._worker_tasks.add(asyncio.create_task(self._persist_estimates()))
+        await self._recover()
+        for lane in self.lanes.values():
+            self._spawn_workers(lane, lane.min_workers if self.autoscale else lane.max_workers)
+        if self.autoscale:
+            self._worker_tasks.add(asyncio.create_task(self._autoscaler()))
+        if self._process_pool_requested or PROCESS_POOL_SERVICES:
+            self._worker_tasks.add(asyncio.create_task(self.process_pool.warm()))
+        if self.transport is not None:
+            self._worker_tasks.add(asyncio.create_task(self._steal_loop()))
+        self._timer_wakeup = asyncio.Event()
+        self._worker_tasks.add(asyncio.create_task(self._timer_loop()))
+
+    async def shutdown(self, drain_timeout: Optional[float] = None):
+        """
+        Drain and stop the queue.
+
+        New work is refused straight away (admission closes, timers and work stealing stop) and
+        queued tasks are handed off: published to the shared transport when there is one, left
+        in the durable store when they were persisted, and otherwise dropped with a
+        send_cancelled() to their listeners so clients can retry elsewhere. Running tasks get up
+        to `drain_timeout` seconds (default: the queue's drain_timeout) to finish; whatever is
+        still running then is cancelled and its listeners are told why.
+        """
+        drain_timeout = self.drain_timeout if drain_timeout is None else drain_timeout
+        vcprint(f"[TASK QUEUE] Initiating shutdown | Drain timeout: {drain_timeout:g}s", verbose=info, color="yellow")
         self.running = False
-        if hasattr(self, "_worker_tasks"):
-            for task in self._worker_tasks:
+        self.draining = True
+        self.admission.close()
+        workers = [handle for handle in self._worker_handles.values() if not handle.done()]
+        for task in list(self._worker_tasks):
+            if task not in workers:
                 task.cancel()
+        # Closing the schedulers releases idle workers; busy ones exit after their current task.
+        queued = []
+        for lane in self.lanes.values():
+            lane.scheduler.close()
+            queued.extend(lane.scheduler.drain())
+        for bulkhead in get_bulkheads().values():
+            queued.extend(bulkhead.drain())
+        await self._hand_off_queued([task for task in queued if not getattr(task, "cancelled", False)])
+
+        if workers:
+            _, pending = await asyncio.wait(workers, timeout=drain_timeout)
+            if pending:
+                # The registry lists a socket task under each of its listener events; dedupe by identity.
+                registered = {id(task): task for task in self._registry.values()}.values()
+                running = [task for task in registered if getattr(task, "execution", None) is not None and not task.execution.done()]
+                vcprint(f"[TASK QUEUE] Drain timeout reached, cancelling {len(running)} running tasks", verbose=info, color="yellow")
+                for task in running:
+                    self._cancel_running(task, "Task was cancelled because the server is shutting down")
+                # Give cancelled workers a moment to notify their listeners and clean up.
+                _, pending = await asyncio.wait(pending, timeout=1.0)
+                for worker in pending:
+                    worker.cancel()
+
         self.executor.shutdown(wait=False)
-        while not self.queue.empty():
-            try:
-                self.queue.get_nowait()
-            except asyncio.QueueEmpty:
-                break
-        while not self.background_queue.empty():
-            try:
-                self.queue.get_nowait()
-            except asyncio.QueueEmpty:
-                break
+        self.process_pool.shutdown()
+        for bulkhead in get_bulkheads().values():
+            bulkhead.shutdown()
+        self._registry.clear()
+        await self.store.close()
+        try:
+            await asyncio.get_running_loop().run_in_executor(None, self.estimator.save)
+        except Exception as e:
+            vcprint(f"[TASK QUEUE] Error saving runtime estimates: {str(e)}", verbose=True, color="red")
+        if self.transport is not None:
+            if self._claimed:
+                # Hand unfinished shared work straight back instead of waiting out the visibility timeout.
+                await self.transport.release(list(self._claimed))
+                vcprint(f"[TASK QUEUE] Released {len(self._claimed)} shared tasks | Node: {self.node_id}", verbose=info, color="yellow")
+                self._claimed.clear()
+            await self.transport.close()
         vcprint("[TASK QUEUE] Shutdown complete", verbose=info, color="yellow")
 
+    async def _hand_off_queued(self, tasks: list):
+        """Move tasks that never started somewhere they can still run, or tell their clients they won't."""
+        handed_off = persisted = dropped = 0
+        for task in tasks:
+            self._release(task)
+            self._unregister(task)
+            if getattr(task, "remote", False):
+                continue  # Released back to the transport with the rest of _claimed
+            if self.transport is not None:
+                record = self._shared_record(task, self.lane_for(task).name, getattr(task, "background", False))
+                if record is not None:
+                    try:
+                        await self.transport.publish(record)
+                    except Exception as e:
+                        vcprint(f"[TASK QUEUE] Error handing off task {task.task_id}: {str(e)}", verbose=True, color="red")
+                    else:
+                        self.store.ack(task)
+                        self._settle_handle(task, "offloaded")
+                        handed_off += 1
+                        continue
+            if getattr(task, "persisted", False):
+                # Still in the durable store, so the next start picks it up.
+                self._settle_handle(task, "offloaded")
+                persisted += 1
+                continue
+            self._settle_handle(task, "cancelled")
+            await self._notify_cancelled(task, "Task was cancelled because the server is shutting down; please retry")
+            dropped += 1
+        if tasks:
+            vcprint(f"[TASK QUEUE] Queued tasks at shutdown | Handed off: {handed_off} | Left in store: {persisted} | Cancelled: {dropped}", verbose=info, color="yellow")
+
+    def _cancel_running(self, task: Task, message: str):
+        task.cancelled = True
+        task.cancel_message = message
+        scope = getattr(task, "scope", None)
+        if scope is not None:
+            scope.at = time.monotonic()
+        task.execution.cancel()
+
 
 _task_queue_instance = None
 
 
-def get_task_queue():
+def get_task_queue(**options):
+    """
+    Return the process-wide TaskQueue. Options (e.g. lane sizes) only apply on first creation,
+    on top of those from TASK_QUEUE_* settings (see task_queue_options_from_settings).
+    """
     global _task_queue_instance
     with threading.Lock():
         if _task_queue_instance is None:
-            _task_queue_instance = TaskQueue.initialize()
+            _task_queue_instance = TaskQueue.initialize(**{**task_queue_options_from_settings(), **options})
         return _task_queue_instance
@@ -0,0 +1,242 @@
+import asyncio
+import importlib
+import inspect
+import json
+import os
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Optional
+
+from matrx_utils import vcprint
+
+info = True
+debug = False
+verbose = False
+
+
+def callable_ref(fn: Callable) -> Optional[str]:
+    """'module:qualname' for a module-level function, or None when it can't be re-imported later."""
+    if not inspect.isfunction(fn) or "<" in fn.__qualname__:
+        return None
+    return f"{fn.__module__}:{fn.__qualname__}"
+
+
+def resolve_callable(ref: str) -> Callable:
+    module_name, _, qualname = ref.partition(":")
+    target = importlib.import_module(module_name)
+    for part in qualname.split("."):
+        target = getattr(target, part)
+    return target
+
+
+def task_record(task, include_sid: bool = False) -> Optional[dict]:
+    """
+    Plain-dict form of a task that can be rebuilt in another process or after a restart, or
+    None when it can't: live stream handlers never survive, and socket tasks only make sense
+    where the owning sid is still reachable (`include_sid`).
+    """
+    if task.stream_handler is not None or (task.sid and not include_sid):
+        return None
+    callback = None
+    if task.callback is not None:
+        callback = callable_ref(task.callback)
+        if callback is None:
+            return None
+    elif not task.service_name:
+        return None
+    return {
+        "task_id": task.task_id,
+        "service_name": task.service_name,
+        "user_id": task.user_id,
+        "priority": task.priority,
+        "data": task.data,
+        "sid": task.sid,
+        "namespace": task.namespace,
+        "is_sync": task.is_sync,
+        "callback": callback,
+        "use_process_pool": task.use_process_pool,
+        "deadline": task.deadline,
+        "wire_format": task.wire_format,
+        "submit_time": task.submit_time,
+    }
+
+
+class TaskStore:
+    """
+    Persistence hook for the TaskQueue. The base class keeps nothing, which is the plain
+    in-memory behaviour; subclasses record accepted tasks and hand unfinished ones back on start.
+    """
+
+    durable = False
+
+    async def open(self) -> list:
+        """Prepare the store and return the records of tasks that were accepted but never acked."""
+        return []
+
+    def add(self, task, background: bool = False) -> bool:
+        """Record an accepted task. Returns False when the task can't be persisted."""
+        return False
+
+    def ack(self, task):
+        """Forget a task once it has completed (successfully or not)."""
+        pass
+
+    async def flush(self):
+        pass
+
+    async def close(self):
+        pass
+
+    def stats(self) -> dict:
+        return {"durable": self.durable}
+
+
+class SQLiteTaskStore(TaskStore):
+    """
+    Durable TaskStore backed by a local SQLite database in WAL mode.
+
+    add() and ack() only append to an in-memory batch; a background flusher writes each batch
+    in a single transaction on a dedicated thread, so the event loop never blocks on disk and
+    throughput stays close to the in-memory queue. A task acked before its insert was flushed
+    never touches the database. The trade-off is that tasks accepted within the last
+    `flush_interval` before a hard crash can be lost.
+
+    Only tasks whose work can be rebuilt after a restart are persisted: service tasks and
+    module-level callbacks without a live stream handler or socket sid.
+    """
+
+    durable = True
+
+    def __init__(self, path: str, flush_interval: float = 0.05, batch_size: int = 500):
+        self.path = path
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self._inserts = {}  # task_id -> row, waiting to be written
+        self._acks = set()  # task_ids waiting to be deleted
+        self._persisted = set()  # task_ids written and not yet acked
+        self._writing = set()  # task_ids in the batch being written, not acked since
+        self._connection: Optional[sqlite3.Connection] = None
+        self._io = ThreadPoolExecutor(max_workers=1, thread_name_prefix="task-store")
+        self._flusher: Optional[asyncio.Task] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self.written = 0
+        self.deleted = 0
+
+    async def open(self) -> list:
+        loop = asyncio.get_running_loop()
+        rows = await loop.run_in_executor(self._io, self._open_sync)
+        self._persisted.update(row["task_id"] for row in rows)
+        self._wakeup = asyncio.Event()
+        self._flusher = asyncio.create_task(self._flush_loop())
+        vcprint(f"[TASK STORE] Opened {self.path} | Unfinished tasks: {len(rows)}", verbose=info, color="yellow")
+        return rows
+
+    def _open_sync(self) -> list:
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        connection = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")
+        connection.execute(
+            "CREATE TABLE IF NOT EXISTS tasks ("
+            "task_id TEXT PRIMARY KEY, background INTEGER NOT NULL, priority INTEGER NOT NULL, "
+            "submit_time REAL NOT NULL, payload TEXT NOT NULL)"
+        )
+        self._connection = connection
+        cursor = connection.execute("SELECT task_id, background, payload FROM tasks ORDER BY priority, submit_time")
+        return [{**json.loads(payload), "task_id": task_id, "background": bool(background)} for task_id, background, payload in cursor]
+
+    def add(self, task, background: bool = False) -> bool:
+        if self._connection is None:
+            return False
+        record = task_record(task)
+        if record is None:
+            return False
+        self._inserts[task.task_id] = (task.task_id, int(background), task.priority, task.submit_time, json.dumps(record, default=str))
+        if len(self._inserts) >= self.batch_size:
+            self._wakeup.set()
+        return True
+
+    def ack(self, task):
+        task_id = getattr(task, "task_id", None)
+        if self._inserts.pop(task_id, None) is not None:
+            return
+        if task_id in self._writing:
+            # Its insert is being written right now; delete it again in the next batch.
+            self._writing.discard(task_id)
+            self._acks.add(task_id)
+        elif task_id in self._persisted:
+            self._persisted.discard(task_id)
+            self._acks.add(task_id)
+            if len(self._acks) >= self.batch_size:
+                self._wakeup.set()
+
+    async def _flush_loop(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            try:
+                await self.flush()
+            except Exception as e:
+                vcprint(f"[TASK STORE] Flush failed: {str(e)}", verbose=True, color="red")
+
+    async def flush(self):
+        if self._connection is None or not (self._inserts or self._acks):
+            return
+        inserts, self._inserts = self._inserts, {}
+        acks, self._acks = self._acks, set()
+        self._writing = set(inserts)
+        loop = asyncio.get_running_loop()
+        try:
+            await loop.run_in_executor(self._io, self._write_batch, list(inserts.values()), list(acks))
+        except BaseException:
+            # The transaction was rolled back: requeue the batch, keeping anything added since.
+            for task_id in self._writing:
+                self._inserts.setdefault(task_id, inserts[task_id])
+            self._acks |= acks
+            raise
+        else:
+            self._persisted.update(self._writing)
+        finally:
+            self._writing = set()
+
+    def _write_batch(self, inserts: list, acks: list):
+        connection = self._connection
+        connection.execute("BEGIN")
+        try:
+            if inserts:
+                connection.executemany("INSERT OR REPLACE INTO tasks (task_id, background, priority, submit_time, payload) VALUES (?, ?, ?, ?, ?)", inserts)
+            if acks:
+                connection.executemany("DELETE FROM tasks WHERE task_id = ?", [(task_id,) for task_id in acks])
+            connection.execute("COMMIT")
+        except Exception:
+            connection.execute("ROLLBACK")
+            raise
+        self.written += len(inserts)
+        self.deleted += len(acks)
+
+    async def close(self):
+        if self._flusher is not None:
+            self._flusher.cancel()
+            await asyncio.gather(self._flusher, return_exceptions=True)
+            self._flusher = None
+        await self.flush()
+        if self._connection is not None:
+            connection, self._connection = self._connection, None
+            await asyncio.get_running_loop().run_in_executor(self._io, connection.close)
+        self._io.shutdown(wait=False)
+        vcprint(f"[TASK STORE] Closed {self.path}", verbose=info, color="yellow")
+
+    def stats(self) -> dict:
+        return {
+            "durable": self.durable,
+            "path": self.path,
+            "pending_writes": len(self._inserts) + len(self._acks),
+            "persisted": len(self._persisted),
+            "written": self.written,
+            "deleted": self.deleted,
+        }
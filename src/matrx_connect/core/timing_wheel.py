@@ -0,0 +1,158 @@
+import time
+from typing import Any, List, Optional
+
+
+class Timer:
+    """One scheduled entry in a TimingWheel. `payload` is whatever the owner needs when it fires."""
+
+    __slots__ = ("expires", "interval", "payload", "cancelled", "fired", "_wheel")
+
+    def __init__(self, expires: int, interval: Optional[float], payload: Any, wheel: "TimingWheel"):
+        self.expires = expires  # Absolute tick
+        self.interval = interval  # Seconds between firings for periodic timers, None for one-shot
+        self.payload = payload
+        self.cancelled = False
+        self.fired = 0
+        self._wheel = wheel
+
+    def __repr__(self):
+        kind = f"every {self.interval:g}s" if self.interval else "once"
+        return f"<Timer {kind} in {self.remaining():.2f}s{' cancelled' if self.cancelled else ''}>"
+
+    def remaining(self) -> float:
+        return max(0.0, self._wheel.when(self) - time.monotonic())
+
+    def cancel(self) -> bool:
+        """Stop the timer. O(1): the entry is dropped when its slot comes round."""
+        if self.cancelled or (self.fired and not self.interval):
+            return False
+        self.cancelled = True
+        self._wheel.active -= 1
+        return True
+
+
+class TimingWheel:
+    """
+    Hierarchical timing wheel (as in the Linux kernel and Kafka's purgatory).
+
+    Level 0 has `wheel_size` slots of one `tick` each; every level above covers `wheel_size`
+    times the span of the one below. A timer goes into the lowest level whose span covers its
+    delay and is cascaded down a level each time the wheel reaches its slot, so adding,
+    cancelling and firing are all O(1) regardless of how many timers are pending. Timers
+    beyond the top level's span park in its slots and are re-filed each revolution.
+
+    Times are monotonic; resolution is one tick and timers never fire early.
+    """
+
+    def __init__(self, tick: float = 0.1, wheel_size: int = 64, levels: int = 4):
+        if wheel_size & (wheel_size - 1):
+            raise ValueError("wheel_size must be a power of two")
+        self.tick = tick
+        self.wheel_size = wheel_size
+        self.levels = levels
+        self._bits = wheel_size.bit_length() - 1
+        self._mask = wheel_size - 1
+        self._slots = [[[] for _ in range(wheel_size)] for _ in range(levels)]
+        self._due: List[Timer] = []  # Added at or before the current tick
+        self._origin = time.monotonic()
+        self._current = 0  # Last tick processed
+        self.active = 0
+
+    def __len__(self):
+        return self.active
+
+    def when(self, timer: Timer) -> float:
+        """Monotonic time at which `timer` fires next."""
+        return self._origin + timer.expires * self.tick
+
+    def _tick_for(self, at: float) -> int:
+        # Round up so a timer never fires before its time.
+        ticks = (at - self._origin) / self.tick
+        whole = int(ticks)
+        return whole if whole == ticks else whole + 1
+
+    def schedule(self, delay: float, payload: Any = None, interval: Optional[float] = None) -> Timer:
+        timer = Timer(self._tick_for(time.monotonic() + max(0.0, delay)), interval, payload, self)
+        self.active += 1
+        self._file(timer)
+        return timer
+
+    def _file(self, timer: Timer, cascading: bool = False):
+        delta = timer.expires - self._current
+        if delta <= 0 and not cascading:
+            self._due.append(timer)
+            return
+        bits = self._bits
+        for level in range(self.levels):
+            if delta < 1 << (bits * (level + 1)) or level == self.levels - 1:
+                self._slots[level][(timer.expires >> (bits * level)) & self._mask].append(timer)
+                return
+
+    def advance(self, now: Optional[float] = None) -> List[Timer]:
+        """
+        Move the wheel up to `now` and return the timers that expired, in firing order.
+        Periodic timers are re-filed for their next interval before being returned.
+        """
+        target = int(((time.monotonic() if now is None else now) - self._origin) / self.tick)
+        expired, self._due = [timer for timer in self._due if not timer.cancelled], []
+        if self.active - len(expired) <= 0 and target > self._current:
+            self._current = target  # Nothing pending: skip idle ticks instead of walking them
+        bits, mask = self._bits, self._mask
+        while self._current < target:
+            self._current = tick = self._current + 1
+            # Cascade higher levels whose slot boundary is this tick, top-down, before firing level 0.
+            level = 1
+            while level < self.levels and not tick & ((1 << (bits * level)) - 1):
+                level += 1
+            for cascade in range(level - 1, 0, -1):
+                index = (tick >> (bits * cascade)) & mask
+                bucket, self._slots[cascade][index] = self._slots[cascade][index], []
+                for timer in bucket:
+                    if not timer.cancelled:
+                        self._file(timer, cascading=True)
+            bucket, self._slots[0][tick & mask] = self._slots[0][tick & mask], []
+            for timer in bucket:
+                if timer.cancelled:
+                    continue
+                if timer.expires > tick:
+                    self._file(timer, cascading=True)  # Parked beyond the top level's span
+                else:
+                    expired.append(timer)
+        for timer in expired:
+            timer.fired += 1
+            if timer.interval and not timer.cancelled:
+                # Fixed rate; runs missed while the loop was blocked are skipped rather than bunched.
+                timer.expires = max(timer.expires + self._tick_for(self._origin + timer.interval), self._current + 1)
+                self._file(timer)
+            elif not timer.cancelled:
+                self.active -= 1
+        return expired
+
+    def next_delay(self) -> Optional[float]:
+        """Seconds until the earliest pending timer is due, or None when nothing is pending."""
+        if self._due:
+            return 0.0
+        if not self.active:
+            return None
+        expires = self._next_expiry()
+        if expires is None:
+            return self.tick
+        return max(0.0, self._origin + expires * self.tick - time.monotonic())
+
+    def _next_expiry(self) -> Optional[int]:
+        # Below the top level, slots taken in wheel order after the current one are in time
+        # order (the current slot comes last: it holds the next revolution), so the first
+        # occupied one holds that level's earliest timer. The top level also parks timers
+        # beyond its span, so all of its slots are checked.
+        earliest = None
+        for level in range(self.levels):
+            slots = self._slots[level]
+            start = (self._current >> (self._bits * level)) & self._mask
+            top = level == self.levels - 1
+            for offset in range(1, self.wheel_size + 1):
+                live = [timer.expires for timer in slots[(start + offset) & self._mask] if not timer.cancelled]
+                if live:
+                    earliest = min(live) if earliest is None else min(earliest, min(live))
+                    if not top:
+                        break
+        return earliest
@@ -1,4 +1,5 @@
 from .socket_errors import SocketSchemaError
+from .task_queue_errors import TaskRejectedError, TaskDeadlineExceeded
 
 
-__all__ = ["SocketSchemaError"]
\ No newline at end of file
+__all__ = ["SocketSchemaError", "TaskRejectedError", "TaskDeadlineExceeded"]
@@ -0,0 +1,27 @@
+import asyncio
+import math
+
+
+class TaskRejectedError(ValueError):
+    """
+    Raised when the TaskQueue refuses a request; carries a retry_after hint in seconds.
+    retry_after is None when waiting won't help (e.g. a user whose rate is set to 0).
+    """
+
+    def __init__(self, reason: str, retry_after: float = 1.0, message: str = None):
+        self.reason = reason
+        self.retry_after = retry_after if retry_after is not None and math.isfinite(retry_after) else None
+        super().__init__(message or f"Task rejected: {reason}")
+
+    def to_dict(self) -> dict:
+        return {
+            "status": "rejected",
+            "reason": self.reason,
+            "retry_after": None if self.retry_after is None else math.ceil(self.retry_after * 1000) / 1000,
+            "message": str(self),
+        }
+
+
+class TaskDeadlineExceeded(asyncio.TimeoutError):
+    """Raised by check_deadline() when the running task has used up its deadline."""
+    pass
@@ -1,12 +1,34 @@
-
 import socketio
+from matrx_utils.conf import settings
+
+from .utils.serialization import SocketJSON
+
+
+def _client_manager():
+    """
+    Shared client manager for multi-node deployments. With SOCKET_MESSAGE_QUEUE set (e.g.
+    redis://host:6379/0), any node can emit to a sid connected to another node, which is what
+    lets a node that stole a task stream results back to the request's owner.
+    """
+    url = getattr(settings, "SOCKET_MESSAGE_QUEUE", None)
+    if not url:
+        return None
+    return socketio.AsyncRedisManager(url)
 
 
 sio = socketio.AsyncServer(
     async_mode="asgi",
     cors_allowed_origins="*",
+    client_manager=_client_manager(),
+    json=SocketJSON,
 )
 
+
+def has_shared_client_manager() -> bool:
+    """True when emits reach sids connected to other nodes, so socket tasks may run on any node."""
+    return isinstance(sio.manager, socketio.AsyncPubSubManager)
+
+
 clients = {}
 verbose = False
 
@@ -0,0 +1,113 @@
+import asyncio
+import traceback
+from typing import Optional
+
+from matrx_utils import vcprint
+
+info = True
+
+
+class MicroBatcher:
+    """
+    Collects same-service, same-task requests for a short window and runs them in one call.
+
+    A service opts in by being registered with max_batch_size > 0 and implementing
+    `async process_batch(task_name, items)`, where each item is a dict with "task",
+    "context", "user_id" and "stream_handler". It returns one result per item, in order.
+    A result is sent to that item's stream handler with send_data_final(); None means the
+    service already answered the item itself, and an Exception is reported as a fatal error.
+
+    A batch is flushed when it reaches max_batch_size or when its window (started by the
+    first item) expires, whichever comes first. Each submitter waits for its own item, so
+    queue deadlines and concurrency limits keep applying per request.
+
+    Batches span users: every user's requests for the same service and task share a batch,
+    run on one shared service instance. process_batch must not rely on per-user service
+    state; each item carries its own user_id and stream_handler.
+    """
+
+    def __init__(self):
+        self._pending = {}  # (service_name, task_name) -> [(item, future)]
+        self._timers = {}  # (service_name, task_name) -> TimerHandle
+        self._services = {}  # service_name -> shared instance that runs its batches
+        self._running = set()
+        self.batches = 0
+        self.items = 0
+
+    async def submit(self, factory, service_name: str, task_info: dict, stream_handler):
+        max_batch_size, batch_window = factory.batched_services[service_name]
+        batch_key = (service_name, task_info["task"])
+        if service_name not in self._services:
+            self._services[service_name] = factory.create_service(service_name, force_new=True)
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        item = {"task": task_info["task"], "context": task_info["context"], "user_id": task_info.get("user_id"), "stream_handler": stream_handler}
+        batch = self._pending.setdefault(batch_key, [])
+        batch.append((item, future))
+        if len(batch) >= max_batch_size:
+            self._flush(batch_key)
+        elif len(batch) == 1:
+            self._timers[batch_key] = loop.call_later(batch_window, self._flush, batch_key)
+        return await future
+
+    def _flush(self, batch_key):
+        timer = self._timers.pop(batch_key, None)
+        if timer is not None:
+            timer.cancel()
+        batch = self._pending.pop(batch_key, None)
+        if batch:
+            runner = asyncio.create_task(self._run(batch_key, batch))
+            self._running.add(runner)
+            runner.add_done_callback(self._running.discard)
+
+    async def _run(self, batch_key, batch):
+        service_name, task_name = batch_key
+        # Submitters that were cancelled while waiting (deadline, shutdown) are left out.
+        batch = [entry for entry in batch if not entry[1].done()]
+        if not batch:
+            return
+        items = [item for item, _ in batch]
+        self.batches += 1
+        self.items += len(items)
+        vcprint(f"[MICRO BATCH] Running batch | Service: {service_name} | Task: {task_name} | Size: {len(items)}", verbose=info, color="blue")
+        try:
+            results = await self._services[service_name].process_batch(task_name, items)
+            if results is None or len(results) != len(items):
+                raise ValueError(f"process_batch returned {0 if results is None else len(results)} results for {len(items)} items")
+        except Exception as e:
+            vcprint(f"[MICRO BATCH] Batch failed | Service: {service_name} | Task: {task_name} | Error: {str(e)}", verbose=True, color="red")
+            traceback.print_exc()
+            results = [e] * len(items)
+
+        for (item, future), result in zip(batch, results):
+            if future.done():
+                continue
+            try:
+                await self._deliver(item["stream_handler"], result)
+            finally:
+                if not future.done():
+                    future.set_result(result)
+
+    @staticmethod
+    async def _deliver(stream_handler, result):
+        try:
+            if isinstance(result, Exception):
+                await stream_handler.fatal_error(
+                    error_type="batch_item_error",
+                    message=str(result),
+                    user_visible_message="Sorry. An error occurred. Please try again.",
+                )
+            elif result is not None:
+                await stream_handler.send_data_final(result)
+        except Exception as e:
+            vcprint(f"[MICRO BATCH] Error delivering result: {str(e)}", verbose=True, color="red")
+
+
+_micro_batcher: Optional[MicroBatcher] = None
+
+
+def get_micro_batcher() -> MicroBatcher:
+    global _micro_batcher
+    if _micro_batcher is None:
+        _micro_batcher = MicroBatcher()
+    return _micro_batcher
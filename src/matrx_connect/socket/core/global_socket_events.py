@@ -5,8 +5,11 @@ import uuid
 from matrx_utils import vcprint
 
 from ..app import sio, clients
+from ..response.replay import resume_stream
+from ..response.wire import forget_sid, negotiate, set_sid_format
 from ..core.user_sessions import get_user_session_namespace
 from ...core.task_queue import Task, get_task_queue
+from ...exceptions.task_queue_errors import TaskRejectedError
 
 user_sessions = get_user_session_namespace()
 
@@ -22,6 +25,8 @@ async def connect(sid, _, auth):
         color="green",
     )
     clients[sid] = {"is_connected": True, "last_acknowledged_chunk": 0}
+    # auth["wire_format"], e.g. "msgpack,json": preferred encoding for response frames.
+    set_sid_format(sid, negotiate(auth.get("wire_format")))
 
 
 @sio.event
@@ -33,6 +38,7 @@ async def disconnect(sid):
     )
     if sid in clients:
         clients[sid]["is_connected"] = False
+    forget_sid(sid)
 
 
 @sio.on("ping", namespace="/UserSession")
@@ -75,6 +81,42 @@ async def handle_ping(sid, data):
     return response
 
 
+@sio.on("cancel_task", namespace="/UserSession")
+async def handle_cancel_task(sid, data):
+    """Cancel one of this user's queued or running tasks by its response_listener_event."""
+    data = data if isinstance(data, dict) else {"response_listener_event": data}
+    key = data.get("response_listener_event") or data.get("task_id")
+    user_id = user_sessions.get_user_id(sid)
+    if not key or not user_id:
+        return {"status": "error", "message": "response_listener_event is required"}
+
+    state = await get_task_queue().cancel_task(key, user_id=user_id)
+    if state is None:
+        return {"status": "not_found", "response_listener_event": key}
+    return {"status": "cancelled", "state": state, "response_listener_event": key}
+
+
+@sio.on("resume_stream", namespace="/UserSession")
+async def handle_resume_stream(sid, data):
+    """
+    Pick a stream back up after a reconnect: replay the frames after `last_seq` (the seq of the
+    last frame the client received before it lost the connection) and send the rest of it here.
+    """
+    data = data if isinstance(data, dict) else {"response_listener_event": data}
+    key = data.get("response_listener_event")
+    user_id = user_sessions.get_user_id(sid)
+    if not key or not user_id:
+        return {"status": "error", "message": "response_listener_event is required"}
+
+    try:
+        last_seq = int(data.get("last_seq") or 0)
+    except (TypeError, ValueError):
+        return {"status": "error", "message": "last_seq must be an integer"}
+    if sid in clients:
+        clients[sid]["last_acknowledged_chunk"] = last_seq
+    return await resume_stream(key, sid, last_seq, user_id, namespace="/UserSession")
+
+
 @sio.on("*", namespace="/UserSession")
 async def generic_user_session_event_handler(event=None, sid=None, data=None):
     if verbose:
@@ -115,9 +157,15 @@ async def generic_user_session_event_handler(event=None, sid=None, data=None):
         vcprint(response, title="Response", color="green")
         return response
 
+    except TaskRejectedError as e:
+        response = {**e.to_dict(), "response_listener_events": event_names}
+        vcprint(response, title="Rejected", color="yellow")
+        return response
+
     except Exception as e:
         vcprint(e, title="Error", color="red")
-        sio.emit("error", str(e), room=sid, namespace="/UserSession")
+        await sio.emit("error", str(e), room=sid, namespace="/UserSession")
+        return {"status": "error", "message": str(e), "response_listener_events": event_names}
 
 
 @sio.event
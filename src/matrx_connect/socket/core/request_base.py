@@ -97,8 +97,13 @@ class SocketRequestBase:
                 # context["task_scope"] = task_scope # TODO: ASK
                 context["task_id"] = task_id
 
+                # Resumable only under a client-supplied per-request event name, owned by this user.
                 stream_handler = SocketEmitter(
-                    event_name=event_name, sid=self.sid, namespace=self.namespace
+                    event_name=event_name,
+                    sid=self.sid,
+                    namespace=self.namespace,
+                    resumable="response_listener_event" in context,
+                    user_id=self.user_id,
                 )
 
                 if task == "mic_check":
@@ -1,12 +1,18 @@
 from abc import ABC, abstractmethod
 from matrx_utils import vcprint
 from matrx_connect.socket.response import SocketPrinter
+from matrx_connect.core.deadlines import check_deadline, time_remaining
 from matrx_utils import FileManager, MatrixPrintLog
 
 
 local_debug = False
 
 class SocketServiceBase(ABC, FileManager, MatrixPrintLog):
+    # Token-streaming services can set a window (e.g. 0.02) so their text chunks are coalesced
+    # into fewer socket packets; see SocketResponse.set_coalescing.
+    chunk_coalesce_window = 0.0
+    chunk_coalesce_bytes = 4096
+
     def __init__(self, app_name: str, service_name: str, log_level: str, batch_print: bool, stream_handler=None, user_id=None, **kwargs):
         if not app_name:
             raise ValueError("app_name must be provided and cannot be empty")
@@ -43,6 +49,8 @@ class SocketServiceBase(ABC, FileManager, MatrixPrintLog):
 
     def add_stream_handler(self, stream_handler):
         self.stream_handler = stream_handler
+        if self.chunk_coalesce_window and hasattr(stream_handler, "set_coalescing"):
+            stream_handler.set_coalescing(self.chunk_coalesce_window, self.chunk_coalesce_bytes)
 
     def set_user_id(self, user_id):
         self.user_id = user_id
@@ -50,6 +58,14 @@ class SocketServiceBase(ABC, FileManager, MatrixPrintLog):
     def set_log_level(self, log_level):
         self.log_level = log_level
 
+    def time_remaining(self):
+        """Seconds left before this task's deadline, or None when it has none."""
+        return time_remaining()
+
+    def check_deadline(self):
+        """Raise TaskDeadlineExceeded if the task is out of time. Call between expensive steps."""
+        check_deadline()
+
     def set_session_manager(self, session_manager):
         """Set session manager for centralized broker access"""
         self.session_manager = session_manager
@@ -3,7 +3,10 @@ import traceback
 
 from matrx_utils import vcprint
 
+from matrx_connect.core.bulkheads import register_bulkhead
 from matrx_connect.socket.core import SocketRequestBase
+from matrx_connect.socket.core.batching import get_micro_batcher
+from matrx_connect.socket.core.singleflight import coalesce_key, get_singleflight
 
 
 class ServiceFactory:
@@ -11,6 +14,8 @@ class ServiceFactory:
         self.services = {}
         self.service_instances = {}
         self.multi_instance_services = set()
+        self.coalesced_services = set()  # Duplicate in-flight requests join the running execution
+        self.batched_services = {}  # service_name -> (max_batch_size, batch_window) for services with process_batch
         # self.global_broker_system = get_global_broker_system()
         self.register_default_services()
 
@@ -40,15 +45,34 @@ class ServiceFactory:
         """Clean up session when socket disconnects"""
         self.global_broker_system.cleanup_session(sid)
 
-    def register_service(self, service_name, service_class):
+    def register_service(self, service_name, service_class, coalesce=False, max_batch_size=0, batch_window=0.01, max_concurrency=0, max_threads=0):
+        """
+        max_concurrency caps how many of this service's tasks the TaskQueue runs at once (the rest
+        wait parked, holding no worker); max_threads gives its sync work a dedicated thread pool.
+        """
         self.services[service_name] = service_class
+        if coalesce:
+            self.coalesced_services.add(service_name)
+        self._register_batching(service_name, service_class, max_batch_size, batch_window)
+        register_bulkhead(service_name, max_concurrency, max_threads)
+
+    def _register_batching(self, service_name, service_class, max_batch_size, batch_window):
+        if not max_batch_size:
+            return
+        if not hasattr(service_class, "process_batch"):
+            raise ValueError(f"{service_name} asks for batching but {service_class.__name__} has no process_batch")
+        self.batched_services[service_name] = (max_batch_size, batch_window)
 
     def list_registered_service(self):
         return list(self.services.keys())
 
-    def register_multi_instance_service(self, service_name, service_class):
+    def register_multi_instance_service(self, service_name, service_class, coalesce=False, max_batch_size=0, batch_window=0.01, max_concurrency=0, max_threads=0):
         self.services[service_name] = service_class
         self.multi_instance_services.add(service_name)
+        if coalesce:
+            self.coalesced_services.add(service_name)
+        self._register_batching(service_name, service_class, max_batch_size, batch_window)
+        register_bulkhead(service_name, max_concurrency, max_threads)
 
     def create_service(self, service_name, force_new=False):
         if service_name not in self.services:
@@ -106,8 +130,26 @@ class ServiceFactory:
                 tasks = []
                 temp_instances = []
 
+                singleflight = get_singleflight()
+
                 for task_info in prepared_tasks:
                     try:
+                        key = None
+                        if service_name in self.coalesced_services:
+                            key = coalesce_key(user_id, service_name, task_info["task"], task_info["context"])
+                            joined = singleflight.join(key, task_info["stream_handler"])
+                            if joined is not None:
+                                # An identical request is already running; follow it to its end so this
+                                # request stays cancellable on its own.
+                                tasks.append(joined)
+                                continue
+
+                        if service_name in self.batched_services:
+                            stream_handler = singleflight.lead(key, task_info["stream_handler"]) if key else task_info["stream_handler"]
+                            task = get_micro_batcher().submit(self, service_name, task_info, stream_handler)
+                            tasks.append(singleflight.run(key, stream_handler, task) if key else task)
+                            continue
+
                         force_new = service_name in self.multi_instance_services
                         service_instance = self.create_service(service_name, force_new=force_new)
 
@@ -122,15 +164,21 @@ class ServiceFactory:
                         # task_info["context"]["session_manager"] = session_manager
 
                         # NO SCOPE SWITCHING HERE - that's the task's responsibility
-                        service_instance.add_stream_handler(task_info["stream_handler"])
                         service_instance.set_user_id(user_id)
 
                         if "log_level" in task_info and task_info["log_level"]:
                             service_instance.set_log_level(task_info["log_level"])
 
+                        stream_handler = task_info["stream_handler"]
+                        if key:
+                            stream_handler = singleflight.lead(key, stream_handler)
+                        service_instance.add_stream_handler(stream_handler)
+
                         task = service_instance.process_task(
                             task_info["task"], task_info["context"]
                         )
+                        if key:
+                            task = singleflight.run(key, stream_handler, task)
                         tasks.append(task)
 
                     except Exception as e:
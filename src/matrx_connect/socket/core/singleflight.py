@@ -0,0 +1,97 @@
+import asyncio
+import hashlib
+import json
+from typing import Optional
+
+from matrx_utils import vcprint
+
+from ..response.fan_out import FanOutStreamHandler
+
+info = True
+
+# Per-request fields that differ between otherwise identical submissions.
+_VOLATILE_CONTEXT_KEYS = {"task_id", "response_listener_event", "idempotency_key"}
+
+
+def coalesce_key(user_id: str, service_name: str, task_name: str, context: dict) -> str:
+    """
+    Canonical hash of a validated request. An explicit idempotency_key in the context wins;
+    otherwise every non-volatile context field takes part. Keys are scoped per user.
+    """
+    context = context or {}
+    if context.get("idempotency_key"):
+        identity = {"idempotency_key": context["idempotency_key"]}
+    else:
+        identity = {key: value for key, value in context.items() if key not in _VOLATILE_CONTEXT_KEYS}
+    payload = json.dumps([user_id, service_name, task_name, identity], sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class Singleflight:
+    """Registry of running executions, keyed by coalesce_key(), that duplicates can join."""
+
+    def __init__(self):
+        self._flights = {}  # key -> FanOutStreamHandler
+        self.coalesced = 0
+
+    def join(self, key: str, stream_handler):
+        """
+        Join the running execution for `key`, or return None when there is none. The returned
+        coroutine streams it to `stream_handler` and finishes with it, so the joiner's own task
+        stays cancellable; cancelling it detaches just this listener.
+        """
+        flight = self._flights.get(key)
+        if flight is None:
+            return None
+        self.coalesced += 1
+        return self._follow(key, flight, stream_handler)
+
+    async def _follow(self, key: str, flight: FanOutStreamHandler, stream_handler):
+        try:
+            await flight.attach(stream_handler)
+            vcprint(f"[SINGLEFLIGHT] Joined running execution | Key: {key[:12]} | Listeners: {len(flight.handlers)}", verbose=info, color="blue")
+            await flight.finished.wait()
+        finally:
+            flight.detach(stream_handler)
+
+    def lead(self, key: str, stream_handler) -> FanOutStreamHandler:
+        """Register a new execution for `key`; the returned handler streams to every joiner."""
+        flight = self._flights[key] = FanOutStreamHandler(stream_handler)
+        return flight
+
+    async def run(self, key: str, flight: FanOutStreamHandler, coro):
+        """
+        Run the leader's execution. If it is cancelled (by request, deadline or shutdown) or
+        raises, every joiner's stream is ended too; the leader's own listener is told by its task.
+        """
+        try:
+            result = await coro
+        except asyncio.CancelledError:
+            self._land(key, flight)
+            await flight.fail("send_cancelled", "The identical request this one joined was cancelled; please retry")
+            raise
+        except Exception as e:
+            self._land(key, flight)
+            await flight.fail("fatal_error", "task_failed", f"The identical request this one joined failed: {str(e)}")
+            raise
+        self._land(key, flight)
+        flight.close()
+        return result
+
+    def _land(self, key: str, flight: FanOutStreamHandler):
+        # Dropped before joiners are told, so nothing new joins a failed execution.
+        if self._flights.get(key) is flight:
+            del self._flights[key]
+
+    def in_flight(self) -> int:
+        return len(self._flights)
+
+
+_singleflight: Optional[Singleflight] = None
+
+
+def get_singleflight() -> Singleflight:
+    global _singleflight
+    if _singleflight is None:
+        _singleflight = Singleflight()
+    return _singleflight
@@ -8,6 +8,8 @@ from supabase import create_client, Client
 from matrx_utils import vcprint
 # from matrx_connect import ServiceFactory
 from matrx_connect.socket.core.app_factory import get_app_factory
+from matrx_connect.core.task_queue import get_task_queue
+from matrx_connect.socket.response.wire import forget_sid, negotiate, set_sid_format
 from matrx_utils.conf import settings
 
 supabase_url = settings.SUPABASE_AUTH_URL
@@ -21,6 +23,24 @@ info = False
 _user_session_namespace_instance = None
 
 
+def decode_token(token: str) -> dict:
+    """Verify a Supabase access token and return its claims. Raises jwt.InvalidTokenError."""
+    return jwt.decode(
+        token,
+        supabase_jwt_secret,
+        algorithms=["HS256"],
+        options={"verify_aud": False},
+    )
+
+
+def user_id_from_token(token: str):
+    """The user id (sub) of a valid token, or None."""
+    try:
+        return decode_token(token).get("sub")
+    except jwt.InvalidTokenError:
+        return None
+
+
 class UserSessionNamespace(AsyncNamespace):
     def __init__(self, namespace="/UserSession"):
         super().__init__(namespace)
@@ -39,12 +59,7 @@ class UserSessionNamespace(AsyncNamespace):
             if not token:
                 raise ConnectionRefusedError(
                     "No authentication token provided")
-            decoded_token = jwt.decode(
-                token,
-                supabase_jwt_secret,
-                algorithms=["HS256"],
-                options={"verify_aud": False},
-            )
+            decoded_token = decode_token(token)
 
             user_id = decoded_token.get("sub")
             email = decoded_token.get("email")
@@ -53,6 +68,7 @@ class UserSessionNamespace(AsyncNamespace):
                 "name") or user_metadata.get("username")
 
             self.authenticated_users[sid] = user_id
+            set_sid_format(sid, negotiate(auth.get("wire_format")))
             if user_id not in self.user_session_data:
                 self.user_session_data[user_id] = {
                     "last_connected": datetime.now().isoformat(),
@@ -107,7 +123,8 @@ class UserSessionNamespace(AsyncNamespace):
             color="blue",
         )
         if sid in self.cleanup_tasks:
-            self.cleanup_tasks[sid].cancel()
+            self.cleanup_tasks.pop(sid).cancel()
+        forget_sid(sid)
 
         # Store disconnect time
         if sid in self.authenticated_users:
@@ -210,49 +227,56 @@ class UserSessionNamespace(AsyncNamespace):
         return matrix_user_id
 
     async def schedule_session_cleanup(self, sid):
-        self.cleanup_tasks[sid] = asyncio.create_task(
-            self.cleanup_session(sid))
+        # One timing-wheel timer per sid instead of a sleeping asyncio task.
+        if sid in self.cleanup_tasks:
+            self.cleanup_tasks.pop(sid).cancel()
+        self.cleanup_tasks[sid] = get_task_queue().schedule_every(
+            60, background=True, callback=self.cleanup_session, data=sid)
+
+    def _stop_session_cleanup(self, sid):
+        timer = self.cleanup_tasks.pop(sid, None)
+        if timer is not None:
+            timer.cancel()
 
     async def cleanup_session(self, sid):
-        while True:
-            await asyncio.sleep(60)
-            if sid not in self.session_expiry:
-                break
-
-            current_time = datetime.now()
-            if current_time > self.session_expiry[sid]:
-                async with self._lock:
-                    if sid in self.authenticated_users:
-                        matrix_id = self.authenticated_users[sid]
-                        user_data = self.user_session_data.get(matrix_id, {})
-
-                        user_data["last_disconnect"] = current_time.isoformat()
-                        start_time = datetime.fromisoformat(user_data.get(
-                            "last_connected", current_time.isoformat()))
-                        user_data["session_duration"] = str(
-                            current_time - start_time)
-
-                        await self.save_instance_to_database(matrix_id, user_data)
-
-                        del self.authenticated_users[sid]
-                        del self.session_expiry[sid]
-
-                        if matrix_id in self.service_instances:
-                            del self.service_instances[matrix_id]
-                            del self.user_service_factories[matrix_id]
-                            vcprint(
-                                verbose=True,
-                                data=f"[SOCKET USER SESSION] Removed ServiceFactory for user: {matrix_id}",
-                                color="red",
-                            )
-
-                        await self.disconnect(sid)
+        if sid not in self.session_expiry:
+            self._stop_session_cleanup(sid)
+            return
+
+        current_time = datetime.now()
+        if current_time > self.session_expiry[sid]:
+            async with self._lock:
+                if sid in self.authenticated_users:
+                    matrix_id = self.authenticated_users[sid]
+                    user_data = self.user_session_data.get(matrix_id, {})
+
+                    user_data["last_disconnect"] = current_time.isoformat()
+                    start_time = datetime.fromisoformat(user_data.get(
+                        "last_connected", current_time.isoformat()))
+                    user_data["session_duration"] = str(
+                        current_time - start_time)
+
+                    await self.save_instance_to_database(matrix_id, user_data)
+
+                    del self.authenticated_users[sid]
+                    del self.session_expiry[sid]
+
+                    if matrix_id in self.service_instances:
+                        del self.service_instances[matrix_id]
+                        del self.user_service_factories[matrix_id]
                         vcprint(
-                            verbose=verbose,
-                            data=f"[Socket UserSession Cleanup Session] Cleaning Up {sid}, Matrix ID: {matrix_id}",
+                            verbose=True,
+                            data=f"[SOCKET USER SESSION] Removed ServiceFactory for user: {matrix_id}",
                             color="red",
                         )
-                break
+
+                    await self.disconnect(sid)
+                    vcprint(
+                        verbose=verbose,
+                        data=f"[Socket UserSession Cleanup Session] Cleaning Up {sid}, Matrix ID: {matrix_id}",
+                        color="red",
+                    )
+            self._stop_session_cleanup(sid)
 
     async def save_instance_to_database(self, matrix_id, data):
         try:
@@ -2,7 +2,8 @@ from .response_base import SocketResponse
 from .response_types import BrokerResponse
 from .socket_emitter import SocketEmitter
 from .socket_printer import SocketPrinter
+from .fan_out import FanOutStreamHandler
 
 
 
-__all__ = ["SocketResponse", "BrokerResponse", "SocketEmitter", "SocketPrinter"]
\ No newline at end of file
+__all__ = ["SocketResponse", "BrokerResponse", "SocketEmitter", "SocketPrinter", "FanOutStreamHandler"]
\ No newline at end of file
@@ -0,0 +1,77 @@
+import asyncio
+import inspect
+from typing import Any, List, Optional
+
+from matrx_utils import vcprint
+
+
+class FanOutStreamHandler:
+    """
+    Stream handler that forwards every send_* call to all attached handlers.
+
+    Calls are recorded while the stream is live, so a handler attached late (a duplicate
+    request joining a running execution) is first replayed everything sent so far and then
+    receives the rest live, ending up with the same stream as the original requester.
+    If the execution fails, fail() ends the stream for every joiner; the primary is told by
+    its own task.
+    """
+
+    def __init__(self, primary):
+        self.primary = primary
+        self.handlers: List[Any] = [primary]
+        self.history = []  # (method name, args, kwargs) in send order
+        self.closed = False
+        self.failure: Optional[tuple] = None  # (method name, args, kwargs) that ends a failed stream
+        self.finished = asyncio.Event()
+
+    async def attach(self, handler):
+        """Replay the stream so far to `handler`, then keep it attached for the rest."""
+        sent = 0
+        while sent < len(self.history):
+            # The primary may keep sending while we replay; catch up before going live.
+            name, args, kwargs = self.history[sent]
+            await self._call(handler, name, args, kwargs)
+            sent += 1
+        if not self.closed:
+            self.handlers.append(handler)
+        elif self.failure is not None:
+            # Failed while we were replaying: end this stream the same way as the others.
+            await self._call(handler, *self.failure)
+
+    def detach(self, handler):
+        """Stop forwarding to a joiner, e.g. one whose own request was cancelled."""
+        if handler is not self.primary and handler in self.handlers:
+            self.handlers.remove(handler)
+
+    def close(self):
+        """Mark the execution finished. The history is kept for joiners still replaying it."""
+        self.closed = True
+        self.finished.set()
+
+    async def fail(self, name: str, *args, **kwargs):
+        """Close the stream and end it for every joiner still open with the `name` send."""
+        self.failure = (name, args, kwargs)
+        self.close()
+        joiners = [handler for handler in self.handlers[1:] if not getattr(handler, "ended", False)]
+        await asyncio.gather(*(self._call(handler, name, args, kwargs) for handler in joiners))
+
+    def __getattr__(self, name):
+        attr = getattr(self.primary, name)
+        if not inspect.iscoroutinefunction(attr):
+            return attr
+
+        async def fan_out(*args, **kwargs):
+            if not self.closed:
+                self.history.append((name, args, kwargs))
+            results = await asyncio.gather(*(self._call(handler, name, args, kwargs) for handler in list(self.handlers)))
+            return results[0]
+
+        return fan_out
+
+    @staticmethod
+    async def _call(handler, name, args, kwargs):
+        try:
+            return await getattr(handler, name)(*args, **kwargs)
+        except Exception as e:
+            vcprint(f"[FAN OUT] Error forwarding {name} to {getattr(handler, 'event_name', handler)}: {str(e)}", verbose=True, color="red")
+            return None
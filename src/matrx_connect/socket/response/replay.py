@@ -0,0 +1,210 @@
+import asyncio
+from collections import OrderedDict, deque
+from itertools import islice
+from typing import Dict, List, Optional
+
+from matrx_utils import vcprint
+
+from ..app import sio
+from ..utils.serialization import dumps, loads
+from .wire import get_sid_format
+
+info = True
+debug = False
+verbose = False
+
+MAX_FRAMES = 2000  # Frames kept per stream; older ones are dropped first
+MAX_BYTES = 4_000_000  # Encoded size of the frames kept per stream
+RETENTION = 300.0  # Seconds an ended stream stays resumable
+MAX_STREAMS = 1000  # Buffers kept at once; the oldest are evicted past this
+
+
+class ReplayBuffer:
+    """
+    Bounded record of one stream's frames, numbered 1, 2, 3... in the order they were emitted
+    (the number is sent with each frame).
+
+    Runs of consecutive text chunks are compacted into a single entry as they are recorded,
+    so a token stream costs one entry rather than thousands, and is replayed as one chunk.
+    Other frames are kept JSON-encoded: a snapshot, so a service that mutates and re-sends an
+    object can't rewrite frames already sent. Past `max_frames` frames or `max_bytes` bytes
+    (UTF-8 text and encoded frames alike) the oldest frames are dropped.
+    """
+
+    def __init__(self, max_frames: int = MAX_FRAMES, max_bytes: int = MAX_BYTES):
+        self.max_frames = max_frames
+        self.max_bytes = max_bytes
+        self.seq = 0  # Last frame recorded
+        self.first_seq = 1  # Oldest frame still held
+        self._entries = deque()  # [first seq, frame]: a deque of chunks for a text run, else encoded bytes
+        self.size = 0  # Bytes held
+
+    def __len__(self):
+        return self.seq - self.first_seq + 1
+
+    def record(self, payload) -> int:
+        self.seq += 1
+        if isinstance(payload, str):
+            last = self._entries[-1] if self._entries else None
+            if last is not None and isinstance(last[1], deque):
+                last[1].append(payload)
+            else:
+                self._entries.append([self.seq, deque((payload,))])
+            self.size += len(payload.encode())
+        else:
+            frame = dumps(payload)
+            self._entries.append([self.seq, frame])
+            self.size += len(frame)
+        while len(self) > 1 and (len(self) > self.max_frames or self.size > self.max_bytes):
+            self._drop_oldest()
+        return self.seq
+
+    def _drop_oldest(self):
+        entry = self._entries[0]
+        if isinstance(entry[1], deque):
+            self.size -= len(entry[1].popleft().encode())
+            entry[0] += 1
+            if not entry[1]:
+                self._entries.popleft()
+        else:
+            self.size -= len(entry[1])
+            self._entries.popleft()
+        self.first_seq += 1
+
+    def frames_after(self, seq: int) -> Optional[List[tuple]]:
+        """
+        (seq, frame) for every frame after `seq`, a text run joined under its last chunk's seq,
+        or None when they can't all be replayed: some were dropped, or `seq` was never sent.
+        """
+        if seq < 0 or seq > self.seq or seq + 1 < self.first_seq:
+            return None
+        frames = []
+        for first, payload in self._entries:
+            if isinstance(payload, deque):
+                last = first + len(payload) - 1
+                if last > seq:
+                    frames.append((last, "".join(islice(payload, max(0, seq + 1 - first), None))))
+            elif first > seq:
+                frames.append((first, loads(payload)))
+        return frames
+
+
+class ResumableStream:
+    """
+    Replay state for one response_listener_event: its buffer and where it is currently going.
+
+    Only `user_id`, the user the stream belongs to, may resume it. `lock` serializes live
+    emits with a resume, so replayed frames and new ones never interleave.
+    """
+
+    def __init__(self, event_name: str, sid: str, namespace: str, user_id: str, buffer: Optional[ReplayBuffer] = None):
+        self.event_name = event_name
+        self.sid = sid
+        self.namespace = namespace
+        self.user_id = user_id
+        self.buffer = buffer or ReplayBuffer()
+        self.lock = asyncio.Lock()
+        self.ended = False
+        self.response = None  # The live SocketResponse, until the stream ends
+        self._expiry: Optional[asyncio.TimerHandle] = None
+
+    def end(self, retention: float = RETENTION):
+        self.ended = True
+        self.response = None
+        try:
+            self._expiry = asyncio.get_running_loop().call_later(retention, forget_stream, self.event_name, self)
+        except RuntimeError:
+            forget_stream(self.event_name, self)
+
+
+# response_listener_event -> ResumableStream, oldest first
+_streams: "OrderedDict[str, ResumableStream]" = OrderedDict()
+
+
+def register_stream(event_name: str, sid: str, namespace: str, user_id: str) -> Optional[ResumableStream]:
+    """
+    Start recording a stream owned by `user_id`. Returns None, leaving the stream unrecorded,
+    when the name is already registered to another user.
+    """
+    previous = _streams.get(event_name)
+    if previous is not None:
+        if previous.user_id != user_id:
+            vcprint(f"[REPLAY] {event_name} belongs to another user; not recording it for {user_id}", verbose=info, color="yellow")
+            return None
+        # Another response on the same stream (e.g. the cancellation notice) carries on its
+        # buffer and numbering rather than wiping the history a client may still resume from.
+        if previous._expiry is not None:
+            previous._expiry.cancel()
+            previous._expiry = None
+        previous.ended = False
+        previous.sid, previous.namespace = sid, namespace
+        _streams.move_to_end(event_name)
+        return previous
+    stream = _streams[event_name] = ResumableStream(event_name, sid, namespace, user_id)
+    while len(_streams) > MAX_STREAMS:
+        _, evicted = _streams.popitem(last=False)
+        if evicted._expiry is not None:
+            evicted._expiry.cancel()
+    return stream
+
+
+def get_stream(event_name: str) -> Optional[ResumableStream]:
+    return _streams.get(event_name)
+
+
+def forget_stream(event_name: str, stream: Optional[ResumableStream] = None):
+    if stream is None or _streams.get(event_name) is stream:
+        _streams.pop(event_name, None)
+
+
+def get_replay_stats() -> Dict[str, int]:
+    return {
+        "streams": len(_streams),
+        "live": sum(1 for stream in _streams.values() if not stream.ended),
+        "frames": sum(len(stream.buffer) for stream in _streams.values()),
+        "bytes": sum(stream.buffer.size for stream in _streams.values()),
+    }
+
+
+async def resume_stream(event_name: str, sid: str, last_seq: int, user_id: str, namespace: Optional[str] = None) -> dict:
+    """
+    Send `sid` every frame of `event_name` after `last_seq`, then point the rest of the stream
+    at `sid`. Frames carry their seq as before; a compacted text run arrives as one chunk
+    under the seq of its last piece. Returns the reply for the client: "gap" when the frames
+    it is missing can no longer all be replayed (it should re-run the task), otherwise
+    "resumed" with `last_seq`, the newest frame sent so far.
+    """
+    stream = _streams.get(event_name)
+    # Someone else's stream looks exactly like a missing one.
+    if stream is None or not user_id or stream.user_id != user_id or (namespace is not None and namespace != stream.namespace):
+        return {"status": "not_found", "response_listener_event": event_name}
+
+    async with stream.lock:
+        frames = stream.buffer.frames_after(last_seq)
+        if frames is None:
+            return {"status": "gap", "response_listener_event": event_name, "first_seq": stream.buffer.first_seq, "last_seq": stream.buffer.seq}
+        stream.sid = sid
+        response = stream.response
+        wire = get_sid_format(sid)
+        if response is not None:
+            response.sid = sid
+            response.wire = wire
+        for seq, frame in frames:
+            if wire.binary and not isinstance(frame, str):
+                frame = wire.encode(frame)
+            await sio.emit(event_name, (frame, seq), to=sid, namespace=stream.namespace)
+        last = stream.buffer.seq
+
+    vcprint(
+        f"[REPLAY] Resumed {event_name} | SID: {sid} | After: {last_seq} | Replayed: {len(frames)} | Ended: {stream.ended}",
+        verbose=info,
+        color="cyan",
+    )
+    return {
+        "status": "resumed",
+        "response_listener_event": event_name,
+        "replayed": len(frames),
+        "last_seq": last,
+        "ended": stream.ended,
+        "wire_format": wire.name,
+    }
@@ -1,94 +1,237 @@
 import asyncio
-import dataclasses
-import datetime
-import enum
-import uuid
+import weakref
+from typing import Optional
 
 from ..app import sio
 from .response_types import BrokerResponse
+from ..utils.serialization import serialize
+from .replay import register_stream
+from .wire import get_sid_format
 from matrx_utils import vcprint
 
 local_debug = False
 
+# event_name -> the SocketResponse currently streaming it, so a cancellation can end the stream
+# through the same response (and chunk buffer) the task was using rather than a second one.
+_live_responses = weakref.WeakValueDictionary()
+
+
+def get_live_response(event_name: str, sid: Optional[str] = None) -> Optional["SocketResponse"]:
+    """The unended response streaming `event_name` (to `sid`, if given), or None."""
+    response = _live_responses.get(event_name)
+    if response is None or response._ended or (sid is not None and response.sid != sid):
+        return None
+    return response
+
 
 class SocketResponse:
+    """
+    Emits one response stream to a socket client.
+
+    Chunk coalescing is opt-in (coalesce_window > 0, or set_coalescing()): text chunks are
+    buffered and sent as one emit when the window expires or the buffer reaches
+    coalesce_bytes, instead of one packet per token. Any other send (data, info, broker,
+    error, end) flushes the buffer first, so the client sees the same stream in the same order.
+
+    Resumable streams (resumable=True with the owning user_id; SocketRequestBase turns it on
+    for per-request response_listener_events) record every frame they emit in a bounded
+    replay buffer. Their frames are numbered from 1 in emit order and sent as a second event
+    argument, (frame, seq); the announcement says "resumable": true. After reconnecting, the
+    same user sends resume_stream with the last seq it got, is replayed what it missed and
+    receives the rest of the stream on its new connection. Shared event names (global_error) must not be made
+    resumable: every user's frames would land in one buffer.
+    """
+
     def __init__(
         self,
         event_name: str,
         sid: str,
         namespace: str = "/UserSession",
         debug: bool = False,
+        coalesce_window: float = 0.0,
+        coalesce_bytes: int = 0,
+        resumable: bool = False,
+        user_id: Optional[str] = None,
     ):
         self.event_name = event_name
         self.sid = sid
         self.namespace = namespace
         self._sio = sio
         self.debug = local_debug or debug
+        self.wire = get_sid_format(sid)  # Negotiated when the client connected
+        self.coalesce_window = coalesce_window  # Seconds to hold text chunks, 0 = send each immediately
+        self.coalesce_bytes = coalesce_bytes  # Flush early once this many UTF-8 bytes are buffered, 0 = window only
+        self._pending_chunks = []
+        self._pending_size = 0
+        self._flush_timer: Optional[asyncio.TimerHandle] = None
+        self._flushing: Optional[asyncio.Future] = None
+        self._ended = False  # After the end frame, buffered or late chunks are dropped
+        _live_responses[event_name] = self
+        # Only an owned stream can be resumed: the owner is who resume_stream lets read it back.
+        self._stream = register_stream(event_name, sid, namespace, user_id) if resumable and user_id else None
+        if self._stream is not None:
+            self._stream.response = self  # So a resume can retarget it
 
         self._initialize()
 
+    @property
+    def ended(self) -> bool:
+        """True once the end frame has been sent; nothing more goes out after it."""
+        return self._ended
+
+    def set_coalescing(self, window: float = 0.02, max_bytes: int = 4096):
+        """Turn chunk coalescing on (or off with window=0) for the rest of this stream."""
+        self.coalesce_window = window
+        self.coalesce_bytes = max_bytes
+
     def _initialize(self):
-        try:
-            # Use await instead of asyncio.create_task to ensure initialization completes
-            loop = asyncio.get_running_loop()
-            future = loop.run_in_executor(
-                None,
-                lambda: self._sio.emit(
+        # incoming_stream_event is sent lazily, right before this stream's first frame, so it
+        # always arrives first and streams that never emit cost nothing.
+        self._announced = False
+        self._announcement: Optional[asyncio.Future] = None
+
+    async def _announce(self):
+        if self._announcement is None:
+            announcement = {"event_name": self.event_name}
+            if self.wire.binary:
+                announcement["wire_format"] = self.wire.name
+            if self._stream is not None:
+                announcement["resumable"] = True
+            self._announcement = asyncio.ensure_future(
+                self._sio.emit(
                     "incoming_stream_event",
-                    {"event_name": self.event_name},
+                    announcement,
                     to=self.sid,
                     namespace=self.namespace,
-                ),
-            )
-            asyncio.ensure_future(future)
-            vcprint(
-                self.event_name,
-                title="[SOCKET RESPONSE] INIT With Event Name",
-                color="gold",
+                )
             )
+        try:
+            # Concurrent first sends all wait on the same announcement.
+            await self._announcement
         except Exception as e:
+            self._announcement = None  # Let the next send try again
             vcprint(
                 data=e, title="[SOCKET RESPONSE] Initialization Exception", color="red"
             )
             raise RuntimeError(f"Failed to initialize SocketResponse: {str(e)}") from e
+        self._announced = True
+        vcprint(
+            self.event_name,
+            title="[SOCKET RESPONSE] INIT With Event Name",
+            color="gold",
+        )
+
+    async def _emit(self, payload):
+        if not self._announced:
+            await self._announce()
+        stream = self._stream
+        if stream is None:
+            await self._emit_now(payload)
+            return
+        async with stream.lock:
+            # Recorded before sending: a frame lost with the connection is still replayable.
+            seq = stream.buffer.record(payload)
+            await self._emit_now(payload, seq)
+
+    async def _emit_now(self, payload, seq: Optional[int] = None):
+        if self.wire.binary and not isinstance(payload, str):
+            payload = self.wire.encode(payload)
+        await self._sio.emit(
+            self.event_name,
+            payload if seq is None else (payload, seq),
+            to=self.sid,
+            namespace=self.namespace,
+        )
 
     async def _send_chunk(self, chunk):
+        if self._ended:
+            return  # Nothing may follow the end frame (e.g. a cancelled task still streaming)
+        if not self.coalesce_window or not isinstance(chunk, str):
+            await self._flush_chunks()
+            await self._emit_chunk(chunk)
+            return
+        self._pending_chunks.append(chunk)
+        self._pending_size += len(chunk.encode())
+        if self.coalesce_bytes and self._pending_size >= self.coalesce_bytes:
+            await self._flush_chunks()
+        elif self._flush_timer is None:
+            self._flush_timer = asyncio.get_running_loop().call_later(self.coalesce_window, self._on_flush_timer)
+
+    async def _emit_chunk(self, chunk):
         try:
-            await self._sio.emit(
-                self.event_name, chunk, to=self.sid, namespace=self.namespace
-            )
+            await self._emit(chunk)
         except Exception as e:
             vcprint(data=e, title="[SOCKET RESPONSE] Send Chunk Exception", color="red")
             raise RuntimeError(f"Failed to send chunk: {str(e)}") from e
 
+    def _on_flush_timer(self):
+        self._flush_timer = None
+        # Chain onto a flush still in progress, so this one can't land ahead of it.
+        self._flushing = asyncio.ensure_future(self._flush_in_background(self._flushing))
+
+    async def _flush_in_background(self, previous: Optional[asyncio.Future] = None):
+        if previous is not None:
+            await asyncio.wait([previous])
+        if self._ended:
+            return
+        try:
+            await self._emit_pending()
+        except Exception:
+            pass  # Already logged by _emit_chunk; there is no caller to raise to
+
+    async def _flush_chunks(self):
+        """Send buffered chunks now. Every other send calls this first so ordering is kept."""
+        if self._flush_timer is not None:
+            self._flush_timer.cancel()
+            self._flush_timer = None
+        if self._flushing is not None:
+            # A window flush is already emitting; let it land before anything sent after it.
+            flushing, self._flushing = self._flushing, None
+            await flushing
+        if self._pending_chunks:
+            await self._emit_pending()
+
+    def discard_pending(self):
+        """Drop buffered chunks and stop the flush timer, for a stream that is being abandoned."""
+        if self._flush_timer is not None:
+            self._flush_timer.cancel()
+            self._flush_timer = None
+        self._pending_chunks.clear()
+        self._pending_size = 0
+
+    async def _emit_pending(self):
+        if not self._pending_chunks:
+            return
+        chunk = "".join(self._pending_chunks)
+        self._pending_chunks.clear()
+        self._pending_size = 0
+        await self._emit_chunk(chunk)
+
     async def _send_data(self, data):
+        await self._flush_chunks()
         try:
             response = {"data": self._serialize(data)}
-            await self._sio.emit(
-                self.event_name, response, to=self.sid, namespace=self.namespace
-            )
+            await self._emit(response)
             self._debug_print(response, "_send_data")
         except Exception as e:
             vcprint(data=e, title="[SOCKET RESPONSE] Send Data Exception", color="red")
             raise RuntimeError(f"Failed to send data: {str(e)}") from e
 
     async def _send_info(self, info_object):
+        await self._flush_chunks()
         try:
             response = {"info": info_object}
-            await self._sio.emit(
-                self.event_name, response, to=self.sid, namespace=self.namespace
-            )
+            await self._emit(response)
             self._debug_print(response, "_send_info")
         except Exception as e:
             vcprint(data=e, title="[SOCKET RESPONSE] Send Info Exception", color="red")
             raise RuntimeError(f"Failed to send info: {str(e)}") from e
 
     async def _send_broker(self, broker_object: BrokerResponse):
+        await self._flush_chunks()
         try:
             response = {"broker": broker_object}
-            await self._sio.emit(
-                self.event_name, response, to=self.sid, namespace=self.namespace
-            )
+            await self._emit(response)
             self._debug_print(response, "_send_broker")
         except Exception as e:
             vcprint(
@@ -97,22 +240,24 @@ class SocketResponse:
             raise RuntimeError(f"Failed to send broker: {str(e)}") from e
 
     async def _send_error(self, error_object):
+        await self._flush_chunks()
         try:
             response = {"error": error_object}
-            await self._sio.emit(
-                self.event_name, response, to=self.sid, namespace=self.namespace
-            )
+            await self._emit(response)
             self._debug_print(response, "_send_error")
         except Exception as e:
             vcprint(data=e, title="[SOCKET RESPONSE] Send Error Exception", color="red")
             raise RuntimeError(f"Failed to send error: {str(e)}") from e
 
     async def _send_end(self):
+        await self._flush_chunks()
         try:
             response = {"end": True}
-            await self._sio.emit(
-                self.event_name, response, to=self.sid, namespace=self.namespace
-            )
+            self._ended = True
+            self.discard_pending()
+            await self._emit(response)
+            if self._stream is not None:
+                self._stream.end()
             self._debug_print(response, "_send_end")
         except Exception as e:
             vcprint(data=e, title="[SOCKET RESPONSE] Send End Exception", color="red")
@@ -124,30 +269,4 @@ class SocketResponse:
         title = f"[SOCKET RESPONSE] {method_name} for event: {self.event_name}"
         vcprint(data=data, title=title, color="blue")
 
-    def _serialize(self, data):
-        if data is None or isinstance(data, (bool, int, float, str)):
-            return data
-        elif isinstance(data, (datetime.datetime, datetime.date)):
-            return data.isoformat()
-        elif isinstance(data, uuid.UUID):
-            return str(data)
-        elif isinstance(data, enum.Enum):
-            return data.name
-        elif dataclasses.is_dataclass(data) and not isinstance(data, type):
-            return self._serialize(dataclasses.asdict(data))
-        elif hasattr(data, "__dataclass_fields__") and not isinstance(data, type):
-            # Fallback for dataclass-like objects that might not be detected by is_dataclass
-            try:
-                return self._serialize(dataclasses.asdict(data))
-            except (TypeError, AttributeError):
-                # If asdict fails, fall through to other serialization methods
-                pass
-        elif isinstance(data, (set, tuple)):
-            return [self._serialize(item) for item in data]
-        elif isinstance(data, dict):
-            return {key: self._serialize(value) for key, value in data.items()}
-        elif isinstance(data, list):
-            return [self._serialize(item) for item in data]
-        elif hasattr(data, "__str__"):
-            return str(data)
-        return data
+    _serialize = staticmethod(serialize)
@@ -12,8 +12,12 @@ class SocketEmitter(SocketResponse):
         sid: str,
         namespace: str = "/UserSession",
         debug: bool = False,
+        coalesce_window: float = 0.0,
+        coalesce_bytes: int = 0,
+        resumable: bool = False,
+        user_id: Optional[str] = None,
     ):
-        super().__init__(event_name, sid, namespace, debug)
+        super().__init__(event_name, sid, namespace, debug, coalesce_window, coalesce_bytes, resumable, user_id)
 
     def print_sid(self, identifier="None Provided"):
         vcprint(
@@ -137,10 +141,10 @@ class SocketEmitter(SocketResponse):
         await self._send_error(error_object)
         await self._send_end()
 
-    async def send_cancelled(self):
+    async def send_cancelled(self, message: Optional[str] = None):
         """Notify frontend that the task was cancelled."""
         error_object = {
-            "message": "Task was cancelled due to exceeding task limit or system error.",
+            "message": message or "Task was cancelled due to exceeding task limit or system error.",
             "type": "task_cancelled",
             "user_visible_message": "Your request was cancelled. Please try again.",
         }
@@ -1,13 +1,12 @@
 import datetime
-import enum
 import json
 import os
-import uuid
 from typing import Any, Dict, List, Optional
 
 from matrx_utils import print_link, vcprint
 from matrx_utils.conf import settings
 from matrx_connect.socket.response import BrokerResponse
+from matrx_connect.socket.utils.serialization import serialize
 
 DEFAULT_SAVE_DIR = os.path.join(settings.TEMP_DIR, "socket_responses")
 
@@ -216,6 +215,13 @@ class SocketPrinter:
         if self.accumulate_responses:
             await self._save_accumulated_responses()
 
+    async def send_cancelled(self, message: Optional[str] = None):
+        await self.fatal_error(
+            error_type="task_cancelled",
+            message=message or "Task was cancelled.",
+            user_visible_message="Your request was cancelled. Please try again.",
+        )
+
     async def _save_accumulated_responses(self):
         """Save accumulated responses to a JSON file with timestamp"""
         if not self.accumulate_responses:
@@ -301,26 +307,7 @@ class SocketPrinter:
             color="red",
         )
 
-    def _serialize(self, data):
-        if data is None or isinstance(
-            data, (bool, int, float, str)
-        ):  # Preserve JSON-serializable types
-            return data
-        elif isinstance(data, (datetime.datetime, datetime.date)):
-            return data.isoformat()
-        elif isinstance(data, uuid.UUID):
-            return str(data)
-        elif isinstance(data, enum.Enum):
-            return data.name
-        elif isinstance(data, (set, tuple)):
-            return [self._serialize(item) for item in data]
-        elif isinstance(data, dict):
-            return {key: self._serialize(value) for key, value in data.items()}
-        elif isinstance(data, list):
-            return [self._serialize(item) for item in data]
-        elif hasattr(data, "__str__"):
-            return str(data)
-        return data
+    _serialize = staticmethod(serialize)
 
     async def send_broker(self, broker: BrokerResponse):
         """Send a single broker object. Expects a BrokerResponse dataclass."""
@@ -0,0 +1,88 @@
+import struct
+from typing import Dict, Optional
+
+from ..utils.serialization import dumps
+
+try:
+    import msgpack
+except ImportError:  # Optional: without it every client gets JSON
+    msgpack = None
+
+
+class WireFormat:
+    """
+    How response frames are encoded on the wire.
+
+    Socket: JSON frames are handed to socket.io as objects (it encodes them); binary formats
+    are encoded here and sent as a binary attachment. Text chunks always stay plain strings.
+    HTTP: JSON frames are Server-Sent Events; binary formats are a stream of frames, each a
+    4-byte big-endian length followed by the encoded body.
+    """
+
+    name = "json"
+    binary = False
+    content_type = "application/json"
+    stream_media_type = "text/event-stream"
+
+    def encode(self, obj):
+        return obj
+
+    def http_frame(self, obj) -> bytes:
+        return b"data: " + dumps(obj) + b"\n\n"
+
+
+class MessagePackFormat(WireFormat):
+    name = "msgpack"
+    binary = True
+    content_type = "application/x-msgpack"
+    stream_media_type = "application/vnd.matrx.msgpack-stream"
+
+    def encode(self, obj) -> bytes:
+        return msgpack.packb(obj, use_bin_type=True, default=str)
+
+    def http_frame(self, obj) -> bytes:
+        body = self.encode(obj)
+        return struct.pack(">I", len(body)) + body
+
+
+JSON = WireFormat()
+FORMATS: Dict[str, WireFormat] = {"json": JSON}
+if msgpack is not None:
+    FORMATS["msgpack"] = MessagePackFormat()
+
+_MEDIA_TYPES = {fmt.content_type: fmt for fmt in FORMATS.values()}
+_MEDIA_TYPES.update({fmt.stream_media_type: fmt for fmt in FORMATS.values()})
+
+# sid -> WireFormat negotiated at connect; sids not listed get JSON
+_sid_formats: Dict[str, WireFormat] = {}
+
+
+def negotiate(requested: Optional[str]) -> WireFormat:
+    """
+    Pick the first supported format from a client's preference list: format names
+    ("msgpack,json") or an HTTP Accept header ("application/x-msgpack, text/event-stream").
+    Anything unknown or unavailable falls back to JSON.
+    """
+    if not requested:
+        return JSON
+    for option in requested.split(","):
+        option = option.split(";")[0].strip().lower()
+        fmt = FORMATS.get(option) or _MEDIA_TYPES.get(option)
+        if fmt is not None:
+            return fmt
+    return JSON
+
+
+def set_sid_format(sid: str, fmt: WireFormat):
+    if fmt is JSON:
+        _sid_formats.pop(sid, None)
+    else:
+        _sid_formats[sid] = fmt
+
+
+def get_sid_format(sid: Optional[str]) -> WireFormat:
+    return _sid_formats.get(sid, JSON) if sid else JSON
+
+
+def forget_sid(sid: str):
+    _sid_formats.pop(sid, None)
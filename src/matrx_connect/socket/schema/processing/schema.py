@@ -1,5 +1,6 @@
 from .schema_processor import get_schema_validator as schema_validator, get_runtime_schema as runtime_schema
 from .default_schema import default_schema
+from ....core.deadlines import register_schema_deadlines
 
 def merge_schemas_with_default(user_schema, base_schema):
     merged = {
@@ -35,6 +36,7 @@ def merge_schemas_with_default(user_schema, base_schema):
 
 
 def register_schema(user_schema):
+    register_schema_deadlines(user_schema.get("deadlines", {}))
     merged_schema = merge_schemas_with_default(user_schema, default_schema)
     schema_validator(merged_schema)
     return merged_schema
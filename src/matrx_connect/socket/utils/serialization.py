@@ -0,0 +1,144 @@
+import dataclasses
+import datetime
+import enum
+import json
+import uuid
+from typing import Any, Callable, Dict, Union
+
+try:
+    import orjson
+except ImportError:  # Optional: without it the standard library json is used
+    orjson = None
+
+# Types returned as-is. Exact types only: subclasses (IntEnum, str-based enums...) are
+# looked up in the dispatch cache like anything else.
+_NATIVE = frozenset((str, int, float, bool, type(None)))
+
+# type -> converter, resolved once per type on first sight
+_converters: Dict[type, Callable[[Any], Any]] = {}
+
+
+def serialize(data: Any) -> Any:
+    """
+    Convert `data` into JSON-native values (dict, list, str, int, float, bool, None).
+
+    Datetimes become ISO strings, UUIDs strings, enums their name, dataclasses dicts of their
+    fields, sets and tuples lists, and anything else str(). Containers that are already
+    JSON-native are returned as they are, not rebuilt; a container is only copied when
+    something inside it had to change.
+    """
+    cls = type(data)
+    if cls in _NATIVE:
+        return data
+    return _converter_for(cls)(data)
+
+
+def _converter_for(cls: type) -> Callable[[Any], Any]:
+    converter = _converters.get(cls)
+    if converter is None:
+        converter = _converters[cls] = _resolve(cls)
+    return converter
+
+
+def _resolve(cls: type) -> Callable[[Any], Any]:
+    if issubclass(cls, (bool, int, float, str)):
+        return _identity
+    if issubclass(cls, (datetime.datetime, datetime.date, datetime.time)):
+        return _isoformat
+    if issubclass(cls, uuid.UUID):
+        return str
+    if issubclass(cls, enum.Enum):
+        return _enum_name
+    if dataclasses.is_dataclass(cls):
+        return _serialize_dataclass
+    if issubclass(cls, dict):
+        return _serialize_dict
+    if issubclass(cls, list):
+        return _serialize_list
+    if issubclass(cls, (set, frozenset, tuple)):
+        return _serialize_iterable
+    return str
+
+
+def _identity(data):
+    return data
+
+
+def _isoformat(data):
+    return data.isoformat()
+
+
+def _enum_name(data):
+    return data.name
+
+
+def _serialize_dataclass(data):
+    # Field by field rather than dataclasses.asdict, which deep-copies every value first.
+    return {field.name: serialize(getattr(data, field.name)) for field in dataclasses.fields(data)}
+
+
+def _serialize_dict(data: dict):
+    result = None
+    for key, value in data.items():
+        cls = type(value)
+        if cls in _NATIVE:
+            continue
+        converted = _converter_for(cls)(value)
+        if converted is not value:
+            if result is None:
+                result = dict(data)
+            result[key] = converted
+    return data if result is None else result
+
+
+def _serialize_list(data: list):
+    result = None
+    for index, value in enumerate(data):
+        cls = type(value)
+        if cls in _NATIVE:
+            continue
+        converted = _converter_for(cls)(value)
+        if converted is not value:
+            if result is None:
+                result = list(data)
+            result[index] = converted
+    return data if result is None else result
+
+
+def _serialize_iterable(data):
+    return [serialize(item) for item in data]
+
+
+def _encode(data: Any) -> bytes:
+    if orjson is not None:
+        try:
+            return orjson.dumps(data, default=str, option=orjson.OPT_NON_STR_KEYS)
+        except TypeError:  # e.g. integers beyond 64 bits, which json handles
+            pass
+    return json.dumps(data, default=str).encode()
+
+
+def dumps(data: Any) -> bytes:
+    """Serialize and encode `data` as UTF-8 JSON bytes, with orjson when it is installed."""
+    return _encode(serialize(data))
+
+
+def loads(data: Union[bytes, str]) -> Any:
+    """Decode JSON produced by dumps()."""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+class SocketJSON:
+    """json-module stand-in for socket.io packet encoding: orjson when available, else json."""
+
+    @staticmethod
+    def dumps(data, *args, **kwargs) -> str:
+        if orjson is None:
+            return json.dumps(data, *args, **kwargs)
+        return _encode(data).decode()
+
+    @staticmethod
+    def loads(data, *args, **kwargs):
+        return json.loads(data, *args, **kwargs)
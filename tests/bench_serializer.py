@@ -0,0 +1,102 @@
+import dataclasses
+import datetime
+import enum
+import json
+import random
+import time
+import uuid
+
+from matrx_connect.socket.utils.serialization import dumps, orjson, serialize
+from matrx_utils import vcprint
+
+ROUNDS = 200
+
+
+def legacy_serialize(data):
+    """The per-handler _serialize every stream handler carried before the shared serializer."""
+    if data is None or isinstance(data, (bool, int, float, str)):
+        return data
+    elif isinstance(data, (datetime.datetime, datetime.date)):
+        return data.isoformat()
+    elif isinstance(data, uuid.UUID):
+        return str(data)
+    elif isinstance(data, enum.Enum):
+        return data.name
+    elif dataclasses.is_dataclass(data) and not isinstance(data, type):
+        return legacy_serialize(dataclasses.asdict(data))
+    elif isinstance(data, (set, tuple)):
+        return [legacy_serialize(item) for item in data]
+    elif isinstance(data, dict):
+        return {key: legacy_serialize(value) for key, value in data.items()}
+    elif isinstance(data, list):
+        return [legacy_serialize(item) for item in data]
+    elif hasattr(data, "__str__"):
+        return str(data)
+    return data
+
+
+class Status(enum.Enum):
+    ACTIVE = 1
+    ARCHIVED = 2
+
+
+@dataclasses.dataclass
+class Row:
+    id: uuid.UUID
+    name: str
+    price: float
+    status: Status
+    updated: datetime.datetime
+    tags: list
+
+
+def embedding_payload():
+    return {"model": "text-embedding-3-small", "embedding": [random.uniform(-1, 1) for _ in range(1536)], "usage": {"tokens": 412}}
+
+
+def native_table_payload():
+    return {
+        "rows": [{"id": i, "name": f"item-{i}", "price": round(random.uniform(1, 500), 2), "in_stock": i % 3 != 0, "tags": ["a", "b", "c"][: i % 4]} for i in range(500)],
+        "total": 500,
+    }
+
+
+def dataclass_table_payload():
+    now = datetime.datetime.now()
+    return {
+        "rows": [Row(uuid.uuid4(), f"item-{i}", random.uniform(1, 500), Status.ACTIVE, now, ["a", "b"]) for i in range(500)],
+        "total": 500,
+    }
+
+
+PAYLOADS = {"embedding": embedding_payload, "native table": native_table_payload, "dataclass table": dataclass_table_payload}
+
+
+def measure(fn, payload):
+    started = time.perf_counter()
+    for _ in range(ROUNDS):
+        fn(payload)
+    return (time.perf_counter() - started) / ROUNDS * 1e6
+
+
+def main():
+    random.seed(7)
+    if orjson is None:
+        vcprint("orjson is not installed; encoding uses the standard library json (pip install orjson)", color="yellow")
+
+    for name, build in PAYLOADS.items():
+        payload = build()
+        assert json.dumps(serialize(payload)) == json.dumps(legacy_serialize(payload))
+        results = {
+            "legacy serialize": measure(legacy_serialize, payload),
+            "serialize": measure(serialize, payload),
+            "legacy + json.dumps": measure(lambda p: json.dumps(legacy_serialize(p)).encode(), payload),
+            "dumps": measure(dumps, payload),
+        }
+        for label, micros in results.items():
+            baseline = results["legacy serialize"] if "+" not in label and label != "dumps" else results["legacy + json.dumps"]
+            vcprint(f"{name:<16} {label:<20} {micros:>10.1f} us  ({baseline / micros:>5.1f}x)", color="blue")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,95 @@
+import asyncio
+import random
+import statistics
+import time
+
+from matrx_connect.core.scheduler import TaskScheduler
+from matrx_connect.core.task_queue import Task
+from matrx_utils import vcprint
+
+WORKERS = 100
+IDLE_SECONDS = 3.0
+TASKS = 200
+BACKGROUND_RATIO = 0.2
+
+
+class PollingQueues:
+    """The pre-scheduler dequeue loop: two PriorityQueues polled with one-second timeouts."""
+
+    def __init__(self):
+        self.queue = asyncio.PriorityQueue()
+        self.background_queue = asyncio.PriorityQueue()
+
+    def put_nowait(self, task, background=False):
+        (self.background_queue if background else self.queue).put_nowait(task)
+
+    async def get(self):
+        while True:
+            try:
+                return await asyncio.wait_for(self.queue.get(), timeout=1.0)
+            except asyncio.TimeoutError:
+                try:
+                    return await asyncio.wait_for(self.background_queue.get(), timeout=1.0)
+                except asyncio.TimeoutError:
+                    continue
+
+
+async def run(queues):
+    latencies = {"foreground": [], "background": []}
+    done = asyncio.Event()
+    remaining = TASKS
+
+    async def worker():
+        nonlocal remaining
+        while True:
+            task = await queues.get()
+            latencies[task.data["kind"]].append(time.perf_counter() - task.data["enqueued"])
+            remaining -= 1
+            if remaining == 0:
+                done.set()
+
+    workers = [asyncio.create_task(worker()) for _ in range(WORKERS)]
+
+    await asyncio.sleep(0.1)
+    cpu_start = time.process_time()
+    await asyncio.sleep(IDLE_SECONDS)
+    idle_cpu = time.process_time() - cpu_start
+
+    rng = random.Random(7)
+    for _ in range(TASKS):
+        background = rng.random() < BACKGROUND_RATIO
+        kind = "background" if background else "foreground"
+        task = Task(priority=100 if background else 10, data={"kind": kind, "enqueued": time.perf_counter()})
+        queues.put_nowait(task, background=background)
+        await asyncio.sleep(rng.uniform(0, 0.02))
+
+    await done.wait()
+    for w in workers:
+        w.cancel()
+    await asyncio.gather(*workers, return_exceptions=True)
+    return idle_cpu, latencies
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct))]
+
+
+def report(name, idle_cpu, latencies):
+    vcprint(f"{name}: idle CPU over {IDLE_SECONDS:.0f}s with {WORKERS} workers = {idle_cpu * 1000:.1f} ms", color="blue")
+    for kind, values in latencies.items():
+        if not values:
+            continue
+        vcprint(
+            f"  {kind:<10} n={len(values):<4} p50={statistics.median(values) * 1000:8.2f} ms  p99={percentile(values, 0.99) * 1000:8.2f} ms",
+            color="blue",
+        )
+
+
+async def main():
+    report("polling", *await run(PollingQueues()))
+    report("scheduler", *await run(TaskScheduler(maxsize=0, background_maxsize=0)))
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
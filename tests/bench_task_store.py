@@ -0,0 +1,68 @@
+import asyncio
+import os
+import tempfile
+import time
+
+from matrx_connect.core.task_queue import Task, TaskQueue
+from matrx_connect.core.task_store import SQLiteTaskStore
+from matrx_utils import vcprint
+
+TASKS = 20000
+WORKERS = 50
+
+
+async def noop(data):
+    await asyncio.sleep(0)
+
+
+async def run(store=None):
+    queue = TaskQueue(None, short_running_workers=WORKERS, lane_maxsize=0, min_workers=WORKERS, autoscale=False, store=store)
+    queue.admission.max_in_flight = 0
+    await queue.start()
+
+    started = time.perf_counter()
+    for i in range(TASKS):
+        await queue.add_task(Task(callback=noop, data={"i": i}))
+    accepted = time.perf_counter() - started
+
+    while queue.lanes["short"].dequeued < TASKS or queue.user_tasks:
+        await asyncio.sleep(0.001)
+    elapsed = time.perf_counter() - started
+    stats = queue.store.stats()
+    await queue.shutdown()
+    return accepted, elapsed, stats
+
+
+async def recovery_check(path):
+    """Tasks accepted but never completed come back on the next start."""
+    store = SQLiteTaskStore(path)
+    queue = TaskQueue(None, autoscale=False, min_workers=0, short_running_workers=0, store=store)
+    await queue.start()
+    for i in range(100):
+        await queue.add_task(Task(callback=noop, data={"i": i}))
+    await store.flush()
+    await queue.shutdown()
+
+    queue = TaskQueue(None, autoscale=False, min_workers=0, short_running_workers=0, store=SQLiteTaskStore(path))
+    await queue.start()
+    recovered = queue.lanes["short"].scheduler.qsize()
+    await queue.shutdown()
+    return recovered
+
+
+def report(name, accepted, elapsed, stats):
+    vcprint(
+        f"{name:<10} enqueue {TASKS / accepted:>9.0f} tasks/s  end-to-end {TASKS / elapsed:>9.0f} tasks/s  store: {stats}",
+        color="blue",
+    )
+
+
+async def main():
+    with tempfile.TemporaryDirectory() as directory:
+        report("memory", *await run())
+        report("sqlite", *await run(SQLiteTaskStore(os.path.join(directory, "bench.db"))))
+        vcprint(f"recovered {await recovery_check(os.path.join(directory, 'recovery.db'))}/100 unfinished tasks", color="blue")
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
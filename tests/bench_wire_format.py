@@ -0,0 +1,90 @@
+import json
+import random
+import time
+
+from matrx_connect.socket.response.wire import FORMATS
+from matrx_utils import vcprint
+
+FRAMES = 2000
+EVENT = "response_listener_3f2a9c"
+
+
+def embedding_payload():
+    return {"data": {"model": "text-embedding-3-small", "embedding": [random.uniform(-1, 1) for _ in range(1536)], "usage": {"tokens": 412}}}
+
+
+def table_payload():
+    return {
+        "data": {
+            "rows": [
+                {"id": i, "name": f"item-{i}", "price": round(random.uniform(1, 500), 2), "in_stock": i % 3 != 0, "tags": ["a", "b", "c"][: i % 4]}
+                for i in range(200)
+            ],
+            "total": 200,
+            "page": 1,
+        }
+    }
+
+
+def search_payload():
+    return {
+        "data": {
+            "query": "graceful shutdown asyncio",
+            "results": [
+                {
+                    "url": f"https://example.com/article/{i}",
+                    "title": f"Result {i}",
+                    "snippet": "Lorem ipsum dolor sit amet, consectetur adipiscing elit. " * 3,
+                    "score": random.random(),
+                    "meta": {"published": "2024-05-01T12:00:00", "author": {"name": "A. Writer", "id": i * 17}},
+                }
+                for i in range(20)
+            ],
+        }
+    }
+
+
+def status_payload():
+    return {"info": {"status": "processing", "system_message": "Fetched page 3 of 10", "metadata": {"step": 3, "of": 10}}}
+
+
+PAYLOADS = {"embedding": embedding_payload, "table": table_payload, "search": search_payload, "status": status_payload}
+
+
+def socket_json(payload):
+    # What socket.io does with an object frame: the packet body is json.dumps([event, data]).
+    return json.dumps([EVENT, payload], separators=(",", ":")).encode()
+
+
+def measure(encode, frames):
+    started = time.perf_counter()
+    size = 0
+    for frame in frames:
+        size += len(encode(frame))
+    elapsed = time.perf_counter() - started
+    return elapsed / len(frames) * 1e6, size / len(frames)
+
+
+def main():
+    random.seed(7)
+    encoders = {"json (socket)": socket_json, "json (sse)": FORMATS["json"].http_frame}
+    if "msgpack" in FORMATS:
+        encoders["msgpack"] = FORMATS["msgpack"].encode
+    else:
+        vcprint("msgpack is not installed; only JSON is measured (pip install msgpack)", color="yellow")
+
+    for name, build in PAYLOADS.items():
+        frames = [build() for _ in range(FRAMES if name != "embedding" else FRAMES // 10)]
+        baseline = None
+        for encoder_name, encode in encoders.items():
+            micros, size = measure(encode, frames)
+            baseline = baseline or (micros, size)
+            vcprint(
+                f"{name:<10} {encoder_name:<14} {micros:>9.1f} us/frame  {size:>10.0f} bytes/frame  "
+                f"({baseline[0] / micros:>4.1f}x faster, {size / baseline[1]:>4.0%} of socket JSON size)",
+                color="blue",
+            )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,111 @@
+from collections import Counter
+
+import pytest
+
+from matrx_connect.core.scheduler import FairQueue
+
+
+class Item:
+    def __init__(self, user_id, priority=10, enqueued_at=100.0, name=None):
+        self.user_id = user_id
+        self.priority = priority
+        self.enqueued_at = enqueued_at
+        self.name = name
+
+
+def pop_all(queue, count):
+    popped = []
+    for _ in range(count):
+        item = queue.pop()
+        queue.running[item.user_id] -= 1  # Finish it straight away so limits don't interfere
+        popped.append(item)
+    return popped
+
+
+def test_dispatch_share_follows_user_weights():
+    queue = FairQueue(weights={"heavy": 2.0, "light": 1.0})
+    for _ in range(100):
+        queue.push(Item("heavy"))
+        queue.push(Item("light"))
+        queue.push(Item("default"))
+
+    shares = Counter(item.user_id for item in pop_all(queue, 120))
+
+    assert shares == {"heavy": 60, "light": 30, "default": 30}
+
+
+def test_a_user_with_a_deep_backlog_does_not_starve_others():
+    queue = FairQueue()
+    for _ in range(500):
+        queue.push(Item("flood"))
+    queue.push(Item("late"))
+
+    first = [item.user_id for item in pop_all(queue, 2)]
+
+    assert "late" in first
+
+
+def test_fractional_weights_accumulate_credit():
+    queue = FairQueue(weights={"slow": 0.5})
+    for _ in range(40):
+        queue.push(Item("slow"))
+        queue.push(Item("fast"))
+
+    shares = Counter(item.user_id for item in pop_all(queue, 30))
+
+    assert shares == {"fast": 20, "slow": 10}
+
+
+def test_priority_orders_a_users_own_tasks():
+    queue = FairQueue()
+    for priority in (5, 1, 9, 3):
+        queue.push(Item("u", priority=priority, name=priority))
+
+    assert [item.name for item in pop_all(queue, 4)] == [1, 3, 5, 9]
+
+
+def test_aging_lets_old_low_priority_work_overtake_new_urgent_work():
+    queue = FairQueue(aging_rate=1.0)
+    queue.push(Item("u", priority=10, enqueued_at=100.0, name="old"))
+    queue.push(Item("u", priority=1, enqueued_at=120.0, name="new"))  # 9 points more urgent, 20s younger
+
+    assert [item.name for item in pop_all(queue, 2)] == ["old", "new"]
+
+
+def test_without_aging_priority_wins():
+    queue = FairQueue(aging_rate=0.0)
+    queue.push(Item("u", priority=10, enqueued_at=100.0, name="old"))
+    queue.push(Item("u", priority=1, enqueued_at=120.0, name="new"))
+
+    assert [item.name for item in pop_all(queue, 2)] == ["new", "old"]
+
+
+def test_users_at_their_limit_are_parked_until_unparked():
+    queue = FairQueue(limits=Counter({"u": 1}))
+    queue.push(Item("u", name="a"))
+    queue.push(Item("u", name="b"))
+    queue.push(Item("other", name="c"))
+
+    assert queue.pop().name == "a"  # u is now running its limit
+    assert queue.pop().name == "c"
+    with pytest.raises(IndexError):
+        queue.pop()
+
+    queue.running["u"] -= 1
+    assert queue.unpark("u")
+    assert queue.pop().name == "b"
+
+
+def test_removed_tasks_are_never_dispatched():
+    queue = FairQueue()
+    keep, drop = Item("u", name="keep"), Item("u", name="drop")
+    only = Item("solo", name="only")
+    for item in (drop, keep, only):
+        queue.push(item)
+
+    assert queue.remove(drop)
+    assert queue.remove(only)
+    assert not queue.remove(only)
+    assert len(queue) == 1
+    assert [item.name for item in pop_all(queue, 1)] == ["keep"]
+    assert len(queue) == 0 and not queue.ready()
@@ -0,0 +1,126 @@
+import asyncio
+
+import pytest
+
+from matrx_connect.socket.response import replay
+from matrx_connect.socket.response.replay import ReplayBuffer, forget_stream, register_stream, resume_stream
+
+
+class RecordingSio:
+    def __init__(self):
+        self.sent = []
+
+    async def emit(self, event, data, to=None, namespace=None):
+        self.sent.append((event, data, to))
+
+
+@pytest.fixture
+def sio(monkeypatch):
+    sio = RecordingSio()
+    monkeypatch.setattr(replay, "sio", sio)
+    return sio
+
+
+@pytest.fixture
+def stream():
+    stream = register_stream("stream-1", "sid-owner", "/UserSession", "owner")
+    yield stream
+    forget_stream("stream-1")
+
+
+def test_text_runs_are_compacted_under_their_last_seq():
+    buffer = ReplayBuffer()
+    for payload in ("Hel", "lo", {"info": "tool"}, " wor", "ld"):
+        buffer.record(payload)
+
+    assert buffer.seq == 5
+    assert len(buffer._entries) == 3  # Two text runs and the info frame
+    assert buffer.frames_after(0) == [(2, "Hello"), (3, {"info": "tool"}), (5, " world")]
+
+
+def test_frames_after_part_of_a_text_run_replay_only_the_rest():
+    buffer = ReplayBuffer()
+    for chunk in ("a", "b", "c", "d"):
+        buffer.record(chunk)
+
+    assert buffer.frames_after(2) == [(4, "cd")]
+    assert buffer.frames_after(4) == []
+
+
+def test_recorded_frames_are_snapshots():
+    buffer = ReplayBuffer()
+    payload = {"data": {"rows": [1]}}
+    buffer.record(payload)
+    payload["data"]["rows"].append(2)  # The service mutates and re-sends the same object
+    buffer.record(payload)
+
+    assert buffer.frames_after(0) == [(1, {"data": {"rows": [1]}}), (2, {"data": {"rows": [1, 2]}})]
+
+
+def test_unknown_positions_are_gaps():
+    buffer = ReplayBuffer()
+    for chunk in ("a", "b"):
+        buffer.record(chunk)
+
+    assert buffer.frames_after(-1) is None
+    assert buffer.frames_after(3) is None  # Never sent
+
+
+def test_dropped_frames_are_reported_as_a_gap():
+    buffer = ReplayBuffer(max_frames=3)
+    for n in range(5):
+        buffer.record({"n": n})
+
+    assert buffer.first_seq == 3
+    assert buffer.frames_after(1) is None  # Frame 2 is gone
+    assert buffer.frames_after(2) == [(3, {"n": 2}), (4, {"n": 3}), (5, {"n": 4})]
+
+
+def test_size_bound_counts_every_frame():
+    buffer = ReplayBuffer(max_bytes=200)
+    for _ in range(10):
+        buffer.record({"blob": "x" * 40})
+    buffer.record("é" * 20)  # 40 bytes of text
+
+    assert buffer.size <= 200
+    assert buffer.frames_after(buffer.first_seq - 1) is not None
+    assert buffer.frames_after(0) is None
+
+
+def test_owner_resumes_on_its_new_connection(sio, stream):
+    stream.buffer.record("partial ")
+    stream.buffer.record({"data": {"step": 1}})
+
+    reply = asyncio.run(resume_stream("stream-1", "sid-new", 0, "owner"))
+
+    assert reply["status"] == "resumed"
+    assert reply["last_seq"] == 2
+    assert sio.sent == [("stream-1", ("partial ", 1), "sid-new"), ("stream-1", ({"data": {"step": 1}}, 2), "sid-new")]
+    assert stream.sid == "sid-new"
+
+
+def test_other_users_cannot_resume_a_stream(sio, stream):
+    stream.buffer.record("secret")
+
+    for user_id in ("intruder", None, ""):
+        reply = asyncio.run(resume_stream("stream-1", "sid-intruder", 0, user_id))
+        assert reply == {"status": "not_found", "response_listener_event": "stream-1"}
+    assert sio.sent == []
+    assert stream.sid == "sid-owner"
+
+
+def test_another_user_cannot_take_over_a_stream_name(stream):
+    assert register_stream("stream-1", "sid-intruder", "/UserSession", "intruder") is None
+    assert register_stream("stream-1", "sid-owner", "/UserSession", "owner") is stream
+
+
+def test_resume_past_the_buffer_is_a_gap(sio, stream):
+    stream.buffer.max_frames = 2
+    for n in range(4):
+        stream.buffer.record({"n": n})
+
+    reply = asyncio.run(resume_stream("stream-1", "sid-new", 0, "owner"))
+
+    assert reply["status"] == "gap"
+    assert (reply["first_seq"], reply["last_seq"]) == (3, 4)
+    assert sio.sent == []
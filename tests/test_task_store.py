@@ -0,0 +1,99 @@
+import asyncio
+
+from matrx_connect.core.task_queue import Task, TaskQueue
+from matrx_connect.core.task_store import SQLiteTaskStore
+
+
+def make_task(priority=10, **kwargs):
+    return Task(service_name="REPORTS", user_id="u", priority=priority, data=[{"task": "build"}], **kwargs)
+
+
+async def accept(path, tasks, acked=(), background=()):
+    """One run of a node: accept `tasks`, finish `acked`, then stop without finishing the rest."""
+    store = SQLiteTaskStore(path)
+    assert await store.open() == []
+    for task in tasks:
+        assert store.add(task, background=task in background)
+    await store.flush()
+    for task in acked:
+        store.ack(task)
+    await store.close()
+
+
+def test_unfinished_tasks_survive_a_restart(tmp_path):
+    path = str(tmp_path / "tasks.db")
+    done, urgent, later, slow = make_task(), make_task(priority=1), make_task(priority=20), make_task()
+
+    async def scenario():
+        await accept(path, [done, urgent, later, slow], acked=[done], background=[slow])
+        store = SQLiteTaskStore(path)
+        records = await store.open()
+        await store.close()
+        return records
+
+    records = asyncio.run(scenario())
+
+    assert [record["task_id"] for record in records] == [urgent.task_id, slow.task_id, later.task_id]  # Priority order
+    by_id = {record["task_id"]: record for record in records}
+    assert by_id[slow.task_id]["background"] is True
+    assert by_id[urgent.task_id]["service_name"] == "REPORTS"
+    assert by_id[urgent.task_id]["data"] == [{"task": "build"}]
+
+
+def test_tasks_acked_before_they_were_written_never_come_back(tmp_path):
+    path = str(tmp_path / "tasks.db")
+    quick = make_task()
+
+    async def scenario():
+        store = SQLiteTaskStore(path)
+        await store.open()
+        store.add(quick)
+        store.ack(quick)  # Finished before the flusher ran
+        await store.close()
+        reopened = SQLiteTaskStore(path)
+        records = await reopened.open()
+        await reopened.close()
+        return records, store.written
+
+    records, written = asyncio.run(scenario())
+
+    assert records == []
+    assert written == 0
+
+
+def test_tasks_that_cannot_be_rebuilt_are_not_persisted(tmp_path):
+    path = str(tmp_path / "tasks.db")
+
+    async def scenario():
+        store = SQLiteTaskStore(path)
+        await store.open()
+        added = [
+            store.add(make_task(sid="sid-1")),  # Its socket is gone after a restart
+            store.add(make_task(stream_handler=object())),
+            store.add(Task(user_id="u", callback=lambda data: data)),
+        ]
+        await store.close()
+        return added
+
+    assert asyncio.run(scenario()) == [False, False, False]
+
+
+def test_a_restarted_queue_re_enqueues_unfinished_tasks(tmp_path):
+    path = str(tmp_path / "tasks.db")
+    done, pending = make_task(), make_task(priority=3)
+
+    async def scenario():
+        await accept(path, [done, pending], acked=[done])
+        queue = TaskQueue(None, store=SQLiteTaskStore(path), autoscale=False, runtime_estimates_path=str(tmp_path / "estimates.json"))
+        await queue._recover()
+        queued = [task for lane in queue.lanes.values() for task in lane.scheduler.drain()]
+        await queue.store.close()
+        return queue, queued
+
+    queue, queued = asyncio.run(scenario())
+
+    assert [task.task_id for task in queued] == [pending.task_id]
+    recovered = queued[0]
+    assert (recovered.service_name, recovered.priority, recovered.submit_time) == ("REPORTS", 3, pending.submit_time)
+    assert recovered.persisted
+    assert queue.find_task(pending.task_id) is recovered
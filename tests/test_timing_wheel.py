@@ -0,0 +1,120 @@
+import random
+
+import pytest
+
+from matrx_connect.core import timing_wheel
+from matrx_connect.core.timing_wheel import TimingWheel
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(timing_wheel, "time", clock)
+    return clock
+
+
+def run_until(wheel, clock, end, step):
+    """Advance the wheel in `step` increments up to `end`, returning {timer: [fire times]}."""
+    fired = {}
+    while clock.now < end:
+        clock.now = round(clock.now + step, 6)
+        for timer in wheel.advance():
+            fired.setdefault(timer, []).append(clock.now)
+    return fired
+
+
+def test_one_shot_timers_fire_once_and_never_early_across_levels(clock):
+    # 4 slots per level and 3 levels: spans of 4, 16 and 64 ticks, beyond that timers park at the top.
+    wheel = TimingWheel(tick=1.0, wheel_size=4, levels=3)
+    rng = random.Random(7)
+    start = clock.now
+    delays = [rng.uniform(0, 150) for _ in range(300)] + [0, 1, 3, 4, 15, 16, 63, 64, 65, 128]
+    timers = {wheel.schedule(delay): delay for delay in delays}
+    assert len(wheel) == len(timers)
+
+    fired = run_until(wheel, clock, start + 200, 1.0)
+
+    assert set(fired) == set(timers)  # Nothing missed
+    for timer, delay in timers.items():
+        assert len(fired[timer]) == 1  # Nothing fired twice
+        at = fired[timer][0]
+        assert at >= start + delay  # Never early
+        assert at < start + delay + 2  # Within a tick of its time (plus the step that noticed it)
+    assert len(wheel) == 0
+
+
+def test_timers_added_mid_revolution_fire_on_time(clock):
+    wheel = TimingWheel(tick=1.0, wheel_size=4, levels=3)
+    start = clock.now
+    expected, fired = {}, {}
+    for step in range(80):
+        clock.now = start + step
+        for timer in wheel.advance():
+            fired.setdefault(timer, []).append(clock.now)
+        if step < 40 and step % 3 == 0:
+            delay = 20 - step % 7
+            expected[wheel.schedule(delay)] = clock.now + delay
+
+    assert set(fired) == set(expected)
+    for timer, due in expected.items():
+        assert fired[timer] == [due]
+
+
+def test_cancelled_timers_never_fire(clock):
+    wheel = TimingWheel(tick=1.0, wheel_size=4, levels=3)
+    keep = wheel.schedule(30)
+    dropped = [wheel.schedule(delay) for delay in (2, 10, 30, 90)]
+    for timer in dropped:
+        assert timer.cancel()
+    assert len(wheel) == 1
+
+    fired = run_until(wheel, clock, clock.now + 120, 1.0)
+
+    assert list(fired) == [keep]
+    assert not keep.cancel()  # Already fired
+
+
+def test_periodic_timer_fires_once_per_interval(clock):
+    wheel = TimingWheel(tick=0.5, wheel_size=4, levels=3)
+    start = clock.now
+    timer = wheel.schedule(2.0, interval=2.0)
+
+    fired = run_until(wheel, clock, start + 20, 0.5)
+
+    assert fired[timer] == [start + 2.0 * n for n in range(1, 11)]
+    assert timer.fired == 10
+    timer.cancel()
+    assert run_until(wheel, clock, clock.now + 10, 0.5) == {}
+
+
+def test_periodic_timer_skips_runs_missed_while_blocked(clock):
+    wheel = TimingWheel(tick=1.0, wheel_size=4, levels=3)
+    timer = wheel.schedule(1.0, interval=1.0)
+
+    clock.now += 10  # The loop was blocked for ten intervals
+    assert wheel.advance() == [timer]
+    assert wheel.advance() == []  # The missed runs are not bunched up
+    clock.now += 1
+    assert wheel.advance() == [timer]
+
+
+def test_next_delay_is_never_later_than_the_earliest_timer(clock):
+    wheel = TimingWheel(tick=1.0, wheel_size=4, levels=3)
+    assert wheel.next_delay() is None
+    rng = random.Random(11)
+    timers = [wheel.schedule(rng.uniform(1, 150)) for _ in range(50)]
+    while len(wheel):
+        delay = wheel.next_delay()
+        earliest = min(wheel.when(timer) for timer in timers if not timer.fired)
+        assert clock.now + delay <= earliest + 1e-9
+        clock.now += max(delay, wheel.tick)
+        wheel.advance()
+    assert wheel.next_delay() is None